@@ -0,0 +1,29 @@
+"""Add batch date indexes for keyset pagination
+
+Revision ID: 4b7d2e91c3a0
+Revises: 35e68ecb561a
+Create Date: 2026-10-18 09:12:40.318204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4b7d2e91c3a0'
+down_revision: Union[str, Sequence[str], None] = '35e68ecb561a'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(op.f('ix_batches_created_at'), 'batches', ['created_at'], unique=False)
+    op.create_index(op.f('ix_batches_payment_date'), 'batches', ['payment_date'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_batches_payment_date'), table_name='batches')
+    op.drop_index(op.f('ix_batches_created_at'), table_name='batches')
@@ -0,0 +1,45 @@
+"""Add denormalized batch aggregates
+
+Revision ID: 8e15c0a7f9d2
+Revises: 4b7d2e91c3a0
+Create Date: 2026-10-18 10:02:11.574120
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8e15c0a7f9d2'
+down_revision: Union[str, Sequence[str], None] = '4b7d2e91c3a0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('batches', sa.Column('invoice_count', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('batches', sa.Column('total_amount', sa.Float(), server_default='0', nullable=False))
+    op.add_column('batches', sa.Column('issues_count', sa.Integer(), server_default='0', nullable=False))
+
+    # Backfill from the existing invoices
+    op.execute(
+        """
+        UPDATE batches SET
+            invoice_count = (SELECT COUNT(*) FROM invoices WHERE invoices.batch_id = batches.id),
+            total_amount = (SELECT COALESCE(SUM(importe), 0) FROM invoices WHERE invoices.batch_id = batches.id),
+            issues_count = (
+                SELECT COUNT(*) FROM invoices
+                WHERE invoices.batch_id = batches.id AND invoices.status != 'VALID'
+            )
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('batches', 'issues_count')
+    op.drop_column('batches', 'total_amount')
+    op.drop_column('batches', 'invoice_count')
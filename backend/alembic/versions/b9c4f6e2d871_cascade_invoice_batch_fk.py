@@ -0,0 +1,44 @@
+"""Cascade invoice deletes from batches
+
+Revision ID: b9c4f6e2d871
+Revises: 8e15c0a7f9d2
+Create Date: 2026-10-18 10:48:27.901355
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b9c4f6e2d871'
+down_revision: Union[str, Sequence[str], None] = '8e15c0a7f9d2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# SQLite creates the FK unnamed; batch mode needs a name to drop it
+SQLITE_NAMING_CONVENTION = {"fk": "fk_%(table_name)s_%(column_0_name)s_%(referred_table_name)s"}
+SQLITE_FK_NAME = 'fk_invoices_batch_id_batches'
+POSTGRES_FK_NAME = 'invoices_batch_id_fkey'
+
+
+def _replace_batch_fk(ondelete) -> None:
+    if op.get_bind().dialect.name == 'sqlite':
+        with op.batch_alter_table('invoices', naming_convention=SQLITE_NAMING_CONVENTION, recreate='always') as batch_op:
+            batch_op.drop_constraint(SQLITE_FK_NAME, type_='foreignkey')
+            batch_op.create_foreign_key(SQLITE_FK_NAME, 'batches', ['batch_id'], ['id'], ondelete=ondelete)
+    else:
+        op.drop_constraint(POSTGRES_FK_NAME, 'invoices', type_='foreignkey')
+        op.create_foreign_key(POSTGRES_FK_NAME, 'invoices', 'batches', ['batch_id'], ['id'], ondelete=ondelete)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    _replace_batch_fk('CASCADE')
+    op.create_index(op.f('ix_invoices_batch_id'), 'invoices', ['batch_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_invoices_batch_id'), table_name='invoices')
+    _replace_batch_fk(None)
@@ -0,0 +1,84 @@
+"""Add daily invoice rollup tables
+
+Revision ID: d3a8f1b5e6c4
+Revises: b9c4f6e2d871
+Create Date: 2026-10-18 12:40:05.118734
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd3a8f1b5e6c4'
+down_revision: Union[str, Sequence[str], None] = 'b9c4f6e2d871'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INVOICE_STATUSES = ('VALID', 'WARNING', 'ERROR')
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # The invoicestatus type already exists in PostgreSQL (invoices.status)
+    status_type = sa.Enum(*INVOICE_STATUSES, name='invoicestatus').with_variant(
+        postgresql.ENUM(*INVOICE_STATUSES, name='invoicestatus', create_type=False), 'postgresql'
+    )
+    op.create_table(
+        'invoice_daily_status',
+        sa.Column('due_date', sa.Date(), nullable=False),
+        sa.Column('status', status_type, nullable=False),
+        sa.Column('invoice_count', sa.Integer(), nullable=False),
+        sa.Column('total_amount', sa.Float(), nullable=False),
+        sa.PrimaryKeyConstraint('due_date', 'status'),
+    )
+    op.create_table(
+        'invoice_daily_provider',
+        sa.Column('due_date', sa.Date(), nullable=False),
+        sa.Column('cif', sa.String(), nullable=False),
+        sa.Column('name', sa.String(), nullable=True),
+        sa.Column('invoice_count', sa.Integer(), nullable=False),
+        sa.Column('total_amount', sa.Float(), nullable=False),
+        sa.Column('error_count', sa.Integer(), nullable=False),
+        sa.Column('error_amount', sa.Float(), nullable=False),
+        sa.PrimaryKeyConstraint('due_date', 'cif'),
+    )
+    op.create_index('ix_invoice_daily_provider_cif_due_date', 'invoice_daily_provider', ['cif', 'due_date'], unique=False)
+
+    # Backfill from the existing invoices
+    op.execute(
+        """
+        INSERT INTO invoice_daily_status (due_date, status, invoice_count, total_amount)
+        SELECT DATE(fecha_vencimiento), status, COUNT(*), COALESCE(SUM(importe), 0)
+        FROM invoices
+        WHERE fecha_vencimiento IS NOT NULL
+        GROUP BY DATE(fecha_vencimiento), status
+        """
+    )
+    op.execute(
+        """
+        INSERT INTO invoice_daily_provider
+            (due_date, cif, name, invoice_count, total_amount, error_count, error_amount)
+        SELECT
+            DATE(fecha_vencimiento),
+            COALESCE(cif, ''),
+            MAX(nombre),
+            COUNT(*),
+            COALESCE(SUM(importe), 0),
+            SUM(CASE WHEN status = 'ERROR' THEN 1 ELSE 0 END),
+            COALESCE(SUM(CASE WHEN status = 'ERROR' THEN importe ELSE 0 END), 0)
+        FROM invoices
+        WHERE fecha_vencimiento IS NOT NULL
+        GROUP BY DATE(fecha_vencimiento), COALESCE(cif, '')
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_invoice_daily_provider_cif_due_date', table_name='invoice_daily_provider')
+    op.drop_table('invoice_daily_provider')
+    op.drop_table('invoice_daily_status')
@@ -0,0 +1,89 @@
+"""Add provider_summary table
+
+Revision ID: e7b2c4d9a1f3
+Revises: d3a8f1b5e6c4
+Create Date: 2026-10-18 23:35:12.406218
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e7b2c4d9a1f3'
+down_revision: Union[str, Sequence[str], None] = 'd3a8f1b5e6c4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'provider_summary',
+        sa.Column('cif', sa.String(), nullable=False),
+        sa.Column('name', sa.String(), nullable=True),
+        sa.Column('invoice_count', sa.Integer(), nullable=False),
+        sa.Column('total_amount', sa.Float(), nullable=False),
+        sa.Column('average_amount', sa.Float(), nullable=False),
+        sa.Column('first_due_date', sa.DateTime(), nullable=True),
+        sa.Column('last_due_date', sa.DateTime(), nullable=True),
+        sa.Column('last_payment_date', sa.DateTime(), nullable=True),
+        sa.Column('duplicate_count', sa.Integer(), nullable=False),
+        sa.Column('next_due_date', sa.DateTime(), nullable=True),
+        sa.Column('overdue_count', sa.Integer(), nullable=False),
+        sa.Column('upcoming_count', sa.Integer(), nullable=False),
+        sa.Column('upcoming_amount', sa.Float(), nullable=False),
+        sa.Column('as_of', sa.Date(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('cif'),
+    )
+    op.create_index('ix_provider_summary_total_amount', 'provider_summary', ['total_amount'], unique=False)
+    op.create_index('ix_provider_summary_as_of', 'provider_summary', ['as_of'], unique=False)
+
+    # Backfill from the existing invoices. The fields relative to today are
+    # left empty with an old as_of: the periodic refresh fills them in.
+    op.execute(
+        """
+        INSERT INTO provider_summary
+            (cif, name, invoice_count, total_amount, average_amount, first_due_date, last_due_date,
+             last_payment_date, duplicate_count, next_due_date, overdue_count, upcoming_count,
+             upcoming_amount, as_of, updated_at)
+        SELECT
+            i.cif,
+            MAX(i.nombre),
+            COUNT(*),
+            COALESCE(SUM(i.importe), 0),
+            COALESCE(AVG(i.importe), 0),
+            MIN(i.fecha_vencimiento),
+            MAX(i.fecha_vencimiento),
+            MAX(b.payment_date),
+            SUM(CASE WHEN d.occurrences > 1 THEN 1 ELSE 0 END),
+            NULL, 0, 0, 0,
+            '1970-01-01',
+            CURRENT_TIMESTAMP
+        FROM invoices i
+        JOIN (
+            SELECT id, COUNT(*) OVER (
+                PARTITION BY
+                    COALESCE(UPPER(TRIM(cif)), ''),
+                    COALESCE(REPLACE(UPPER(TRIM(factura)), ' ', ''), ''),
+                    ROUND(CAST(COALESCE(importe, 0) AS NUMERIC), 2),
+                    COALESCE(CAST(DATE(fecha_vencimiento) AS VARCHAR), '')
+            ) AS occurrences
+            FROM invoices
+            WHERE cif IS NOT NULL AND cif <> ''
+        ) d ON d.id = i.id
+        LEFT JOIN batches b ON b.id = i.batch_id
+        WHERE i.cif IS NOT NULL AND i.cif <> ''
+        GROUP BY i.cif
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_provider_summary_as_of', table_name='provider_summary')
+    op.drop_index('ix_provider_summary_total_amount', table_name='provider_summary')
+    op.drop_table('provider_summary')
@@ -0,0 +1,27 @@
+"""Add providers.updated_at index for the directory ETag
+
+Revision ID: f1d6a3c8b2e7
+Revises: e7b2c4d9a1f3
+Create Date: 2026-10-18 23:58:04.117392
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f1d6a3c8b2e7'
+down_revision: Union[str, Sequence[str], None] = 'e7b2c4d9a1f3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(op.f('ix_providers_updated_at'), 'providers', ['updated_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_providers_updated_at'), table_name='providers')
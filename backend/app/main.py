@@ -9,7 +9,8 @@ from sentry_sdk.integrations.fastapi import FastApiIntegration
 from sentry_sdk.integrations.sqlalchemy import SqlalchemyIntegration
 import os
 from .routers import auth_router, import_router, batch_router, settings_router, providers_router, logs_router, search_router, reports_router, health_router
-from .database import engine, Base, get_db
+from .database import engine, Base, get_db, SessionLocal
+from .services.provider_summary_service import ProviderSummaryRefresher
 from sqlalchemy.orm import Session
 from sqlalchemy import text
 import logging
@@ -63,7 +64,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
-    expose_headers=["Content-Disposition"],
+    expose_headers=["Content-Disposition", "X-Next-Cursor", "ETag"],
 )
 
 app.include_router(auth_router)
@@ -79,6 +80,20 @@ app.include_router(health_router)
 # Add rate limiter state
 app.state.limiter = limiter
 
+# Pasada periódica que renueva los campos relativos a hoy de provider_summary
+# (PROVIDER_SUMMARY_REFRESH_SECONDS=0 la desactiva)
+provider_summary_refresher = ProviderSummaryRefresher(
+    SessionLocal, float(os.getenv("PROVIDER_SUMMARY_REFRESH_SECONDS", "900"))
+)
+
+@app.on_event("startup")
+def start_provider_summary_refresher():
+    provider_summary_refresher.start()
+
+@app.on_event("shutdown")
+def stop_provider_summary_refresher():
+    provider_summary_refresher.stop()
+
 @app.exception_handler(RateLimitExceeded)
 async def rate_limit_handler(request: Request, exc: RateLimitExceeded):
     return JSONResponse(
@@ -1,4 +1,7 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Enum as SqEnum, Boolean
+from sqlalchemy import (
+    Column, Integer, String, Float, Date, DateTime, ForeignKey, Enum as SqEnum, Boolean, Index,
+    case, event, func, inspect, select, update,
+)
 from sqlalchemy.orm import relationship
 import enum
 from datetime import datetime
@@ -18,20 +21,27 @@ class Batch(Base):
     __tablename__ = "batches"
 
     id = Column(Integer, primary_key=True, index=True)
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
     name = Column(String, index=True)
     file_hash = Column(String, index=True, nullable=True)
-    payment_date = Column(DateTime, nullable=True)
+    payment_date = Column(DateTime, nullable=True, index=True)
     status = Column(SqEnum(BatchStatus), default=BatchStatus.DRAFT)
     uploaded_to_bank = Column(Boolean, default=False)
+
+    # Agregados desnormalizados (mantenidos en escritura por los eventos de Invoice
+    # y por las rutas masivas de batch_service)
+    invoice_count = Column(Integer, default=0, server_default="0", nullable=False)
+    total_amount = Column(Float, default=0.0, server_default="0", nullable=False)
+    issues_count = Column(Integer, default=0, server_default="0", nullable=False)
     
-    invoices = relationship("Invoice", back_populates="batch")
+    # Las facturas se borran en la BD (ON DELETE CASCADE), sin cargarlas
+    invoices = relationship("Invoice", back_populates="batch", cascade="all, delete", passive_deletes=True)
 
 class Invoice(Base):
     __tablename__ = "invoices"
 
     id = Column(Integer, primary_key=True, index=True)
-    batch_id = Column(Integer, ForeignKey("batches.id"), nullable=True)
+    batch_id = Column(Integer, ForeignKey("batches.id", ondelete="CASCADE"), nullable=True, index=True)
     
     # Raw Excel Columns
     cif = Column(String, index=True)
@@ -53,6 +63,116 @@ class Invoice(Base):
 
     batch = relationship("Batch", back_populates="invoices")
 
+
+def batch_aggregates_statement(batch_ids=None):
+    """UPDATE que recalcula los agregados de los lotes indicados (o de todos) desde invoices."""
+    def _scalar(expression):
+        return select(expression).where(Invoice.batch_id == Batch.id).scalar_subquery()
+
+    stmt = update(Batch).values(
+        invoice_count=_scalar(func.count(Invoice.id)),
+        total_amount=_scalar(func.coalesce(func.sum(Invoice.importe), 0.0)),
+        issues_count=_scalar(
+            func.coalesce(func.sum(case((Invoice.status != InvoiceStatus.VALID, 1), else_=0)), 0)
+        ),
+    )
+    if batch_ids is not None:
+        stmt = stmt.where(Batch.id.in_(list(batch_ids)))
+    return stmt.execution_options(synchronize_session=False)
+
+
+def _invoice_aggregate_delta(invoice, sign: int) -> dict:
+    is_issue = invoice.status is not None and InvoiceStatus(invoice.status) != InvoiceStatus.VALID
+    return {
+        "invoice_count": Batch.invoice_count + sign,
+        "total_amount": Batch.total_amount + sign * float(invoice.importe or 0.0),
+        "issues_count": Batch.issues_count + (sign if is_issue else 0),
+    }
+
+
+# Las altas/bajas de facturas por ORM ajustan los agregados del lote con un delta.
+# Las rutas masivas (INSERT/DELETE por lotes) no disparan estos eventos y
+# actualizan los agregados explícitamente.
+@event.listens_for(Invoice, "after_insert")
+def _invoice_inserted(mapper, connection, target):
+    if target.batch_id is not None:
+        connection.execute(
+            update(Batch).where(Batch.id == target.batch_id).values(**_invoice_aggregate_delta(target, 1))
+        )
+
+
+@event.listens_for(Invoice, "after_delete")
+def _invoice_deleted(mapper, connection, target):
+    if target.batch_id is not None:
+        connection.execute(
+            update(Batch).where(Batch.id == target.batch_id).values(**_invoice_aggregate_delta(target, -1))
+        )
+
+
+@event.listens_for(Invoice, "after_update")
+def _invoice_updated(mapper, connection, target):
+    state = inspect(target)
+    if not any(state.attrs[name].history.has_changes() for name in ("batch_id", "importe", "status")):
+        return
+    history = state.attrs.batch_id.history
+    batch_ids = {target.batch_id, *history.deleted} - {None}
+    if batch_ids:
+        connection.execute(batch_aggregates_statement(batch_ids))
+
+class InvoiceDailyStatus(Base):
+    """Rollup de facturas por día de vencimiento y estado (ver rollup_service)."""
+    __tablename__ = "invoice_daily_status"
+
+    due_date = Column(Date, primary_key=True)
+    status = Column(SqEnum(InvoiceStatus), primary_key=True)
+    invoice_count = Column(Integer, default=0, nullable=False)
+    total_amount = Column(Float, default=0.0, nullable=False)
+
+class InvoiceDailyProvider(Base):
+    """Rollup de facturas por día de vencimiento y CIF (cadena vacía si no hay CIF)."""
+    __tablename__ = "invoice_daily_provider"
+
+    due_date = Column(Date, primary_key=True)
+    cif = Column(String, primary_key=True)
+    name = Column(String, nullable=True) # Último nombre visto en factura
+    invoice_count = Column(Integer, default=0, nullable=False)
+    total_amount = Column(Float, default=0.0, nullable=False)
+    # Parte en estado ERROR (la tesorería la excluye)
+    error_count = Column(Integer, default=0, nullable=False)
+    error_amount = Column(Float, default=0.0, nullable=False)
+
+    __table_args__ = (Index("ix_invoice_daily_provider_cif_due_date", "cif", "due_date"),)
+
+class ProviderSummary(Base):
+    """
+    Resumen por CIF mantenido al crear/borrar lotes (ver provider_summary_service).
+    Los campos relativos a hoy (vencidas, próximos 30 días, siguiente
+    vencimiento) valen para el día as_of y los renueva una pasada periódica.
+    """
+    __tablename__ = "provider_summary"
+
+    cif = Column(String, primary_key=True)
+    name = Column(String, nullable=True) # Nombre en factura (la ficha de Provider tiene prioridad)
+    invoice_count = Column(Integer, default=0, nullable=False)
+    total_amount = Column(Float, default=0.0, nullable=False)
+    average_amount = Column(Float, default=0.0, nullable=False)
+    first_due_date = Column(DateTime, nullable=True)
+    last_due_date = Column(DateTime, nullable=True)
+    last_payment_date = Column(DateTime, nullable=True)
+    duplicate_count = Column(Integer, default=0, nullable=False)
+    # Relativos a as_of
+    next_due_date = Column(DateTime, nullable=True)
+    overdue_count = Column(Integer, default=0, nullable=False)
+    upcoming_count = Column(Integer, default=0, nullable=False)
+    upcoming_amount = Column(Float, default=0.0, nullable=False)
+    as_of = Column(Date, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        Index("ix_provider_summary_total_amount", "total_amount"),
+        Index("ix_provider_summary_as_of", "as_of"),
+    )
+
 class Settings(Base):
     __tablename__ = "settings"
 
@@ -88,8 +208,8 @@ class Provider(Base):
     country = Column(String, nullable=True)
     swift = Column(String, nullable=True)
     
-    # Metadata
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # Metadata (indexado: max(updated_at) es la versión/ETag del directorio)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
 
 class ImportLog(Base):
     __tablename__ = "import_logs"
@@ -1,16 +1,42 @@
-from fastapi import APIRouter, Depends, HTTPException, Response
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from ..routers.auth_router import get_current_user
-from sqlalchemy.orm import Session
-from sqlalchemy import func
-from typing import List, Optional
+from sqlalchemy.orm import Session, raiseload
+from sqlalchemy import and_, func, or_
+from typing import List, Literal, Optional
 from ..database import get_db
-from ..models import Batch, Invoice, BatchStatus, Provider
-from ..schemas import Batch as BatchSchema, InvoiceCreate, BatchBase
-from ..services.duplicate_service import summarize_duplicate_groups
+from ..models import Batch, Invoice, BatchStatus, InvoiceStatus, Provider
+from ..schemas import Batch as BatchSchema, BatchInvoice, BatchSummary, InvoiceCreate, BatchBase, PaginatedBatchInvoices
+from ..schemas import WhatIfMove, WhatIfSessionCreate
+from ..services.duplicate_service import has_duplicate_clause
 from ..services.provider_service import upsert_providers_by_cif, normalize_cif
+from ..services.batch_service import (
+    aggregate_invoice_rows,
+    build_batch_rows,
+    bulk_insert_invoices,
+    delete_batch_with_invoices,
+)
+from ..services.provider_summary_service import refresh_provider_summaries
+from ..services.rollup_service import add_invoices_to_rollups
+from ..services.analytics_service import build_dashboard_stats
+from ..services.treasury_service import (
+    daily_totals,
+    evaluate_grid,
+    load_due_series,
+    load_provider_series,
+    monte_carlo_projection,
+    parameter_axis,
+    top_providers_by_bucket,
+    treasury_projection,
+    week_buckets,
+)
+from ..services.what_if_service import WhatIfStore, load_what_if_session
 from ..services.export_service import generate_bankinter_excel
+from ..services.export_cache import ExportArchiver, ExportCache, export_content_version
 from ..utils.log_files import append_log_line
+from ..utils.pagination import TotalCache, encode_cursor, decode_cursor, day_range, estimate_table_rows
 from datetime import datetime, date, timedelta
+import numpy as np
+import os
 
 router = APIRouter(
     prefix="/batches", 
@@ -18,99 +44,16 @@ router = APIRouter(
     dependencies=[Depends(get_current_user)]
 )
 
+# Totales de listados por combinación de filtros (total_mode="cached")
+batch_total_cache = TotalCache(ttl_seconds=30)
+
+# Ficheros de confirming ya generados y su copia a export_path
+export_cache = ExportCache()
+export_archiver = ExportArchiver()
+
 @router.get("/stats")
 def get_dashboard_stats(db: Session = Depends(get_db)):
-    # 1. Basic Counters
-    total_batches = db.query(Batch).count()
-    total_amount = db.query(func.sum(Invoice.importe)).scalar() or 0.0
-    issues_count = db.query(Invoice).filter(Invoice.status != "VALID").count()
-    
-    # 2. Status Distribution (for Pie Chart)
-    # We want: VALID vs ISSUES (Warning/Error)
-    valid_count = db.query(Invoice).filter(Invoice.status == "VALID").count()
-    # issues_count already calculated above
-    
-    status_distribution = [
-        {"name": "Válidas", "value": valid_count, "color": "#22c55e"}, # green-500
-        {"name": "Incidencias", "value": issues_count, "color": "#f97316"}, # orange-500
-    ]
-
-    # 3. Monthly Volume (Last 6 months) (for Bar Chart)
-    # This is a bit complex in pure SQL abstractly, let's pull all batches and aggregate in python 
-    # (assuming we don't have millions of batches yet, otherwise use SQL grouping)
-    # For a confirming app, volume is usually manageable.
-    
-    from datetime import timedelta
-    six_months_ago = datetime.utcnow() - timedelta(days=180)
-    
-    # Get invoices with their batch creation date? Or just batch totals?
-    # Better to sum invoice amounts by batch date.
-    # Query: Join Invoice -> Batch, filter Batch.created_at > six_months_ago
-    
-    results = db.query(
-        Batch.created_at, 
-        func.sum(Invoice.importe)
-    ).join(Invoice).filter(
-        Batch.created_at >= six_months_ago
-    ).group_by(Batch.created_at).all()
-    
-    # Aggregate by Month-Year in Python
-    monthly_map = {}
-    current = datetime.utcnow()
-    
-    # Initialize last 6 months with 0
-    for i in range(5, -1, -1):
-        d = current - timedelta(days=i*30) # approx
-        key = d.strftime("%Y-%m")
-        label = d.strftime("%b") # Jan, Feb..
-        monthly_map[key] = {"name": label, "full_date": key, "amount": 0.0}
-        
-    for created_at, amount in results:
-        if not created_at: continue
-        key = created_at.strftime("%Y-%m")
-        if key in monthly_map and amount:
-            monthly_map[key]["amount"] += amount
-            
-    # Sort and convert to list
-    # Sort and convert to list
-    monthly_volume = sorted(monthly_map.values(), key=lambda x: x["full_date"])
-
-    duplicate_groups = summarize_duplicate_groups(db.query(Invoice).all())
-
-    # 4. Cash Flow Projection (Next 4 Weeks)
-    today_date = date.today()
-    # Normalize to start of week (Monday) or just use relative windows?
-    # Let's use relative windows: Week 1, Week 2, Week 3, Week 4 from TODAY.
-    
-    cash_flow = []
-    for i in range(4):
-        start_range = today_date + timedelta(days=i*7)
-        end_range = start_range + timedelta(days=6)
-        
-        # Query sum of invoices due in this range
-        week_total = db.query(func.sum(Invoice.importe)).filter(
-            Invoice.fecha_vencimiento >= start_range,
-            Invoice.fecha_vencimiento <= end_range,
-            # Invoice.status == "VALID" # Should we filter by status? Maybe only Valid ones.
-        ).scalar() or 0.0
-        
-        label = f"{start_range.strftime('%d %b')} - {end_range.strftime('%d %b')}"
-        cash_flow.append({
-            "name": f"Semana {i+1}", 
-            "range": label,
-            "amount": week_total,
-            "full_date": start_range.strftime("%Y-%m-%d") # for sorting if needed
-        })
-
-    return {
-        "processed_batches": total_batches,
-        "total_amount": total_amount,
-        "issues_count": issues_count,
-        "duplicate_invoices_count": sum(group["occurrences"] for group in duplicate_groups),
-        "status_distribution": status_distribution,
-        "monthly_volume": monthly_volume,
-        "cash_flow_projection": cash_flow
-    }
+    return build_dashboard_stats(db, date.today())
 
 
 @router.get("/treasury-simulator")
@@ -120,152 +63,230 @@ def get_treasury_simulator(
     horizon_weeks: int = 8,
     payment_delay_days: int = 0,
     stress_pct: float = 12.5,
+    monte_carlo: bool = False,
+    scenarios: int = 10000,
+    seed: int = Query(42, ge=0),
     db: Session = Depends(get_db),
 ):
-    horizon_weeks = max(4, min(horizon_weeks, 16))
+    # En modo Monte Carlo el horizonte llega hasta un año
+    horizon_weeks = max(4, min(horizon_weeks, 52 if monte_carlo else 16))
     payment_delay_days = max(0, min(payment_delay_days, 45))
     stress_pct = max(0.0, min(stress_pct, 50.0))
 
     today = date.today()
-    invoices = (
-        db.query(Invoice, Provider.name)
-        .outerjoin(Provider, Provider.cif == Invoice.cif)
-        .filter(Invoice.fecha_vencimiento != None)
-        .filter(Invoice.status != "ERROR")
-        .all()
+    # Vencimientos (sin ERROR) limitados en SQL a la ventana que puede caer
+    # dentro del horizonte con o sin retraso, cargados en arrays
+    due_series = load_due_series(
+        db, today, today - timedelta(days=payment_delay_days), today + timedelta(days=horizon_weeks * 7 - 1)
     )
+    result = treasury_projection(
+        db, today, opening_balance, reserve_balance, horizon_weeks, payment_delay_days, stress_pct, due_series
+    )
+    weekly_projection = result["weeks"]
+
+    if monte_carlo:
+        # Escenarios muestreados: retraso uniforme hasta payment_delay_days y
+        # shock semanal de importe con desviación stress_pct
+        scenarios = max(100, min(scenarios, 50000))
+        bands = monte_carlo_projection(
+            due_series["day_offsets"],
+            due_series["amounts"],
+            horizon_weeks,
+            opening_balance,
+            reserve_balance,
+            payment_delay_days,
+            stress_pct,
+            scenarios,
+            seed,
+        )
+        result["monte_carlo"] = {
+            "scenarios": scenarios,
+            "seed": seed,
+            "shortfall_probability": round(bands["shortfall_probability"], 4),
+            "reserve_breach_probability": round(bands["reserve_breach_probability"], 4),
+            "weeks": [
+                {
+                    "label": week["label"],
+                    "range": week["range"],
+                    "p5_balance": round(float(bands["p5"][index]), 2),
+                    "p50_balance": round(float(bands["p50"][index]), 2),
+                    "p95_balance": round(float(bands["p95"][index]), 2),
+                    "shortfall_probability": round(float(bands["weekly_shortfall_probability"][index]), 4),
+                    "reserve_breach_probability": round(float(bands["weekly_reserve_breach_probability"][index]), 4),
+                }
+                for index, week in enumerate(weekly_projection)
+            ],
+        }
 
-    def build_provider_breakdown(start_range: date, end_range: date, shifted: bool = False):
-        provider_totals = {}
-        for invoice, provider_name in invoices:
-            if not invoice.fecha_vencimiento:
-                continue
-            due_date = invoice.fecha_vencimiento.date()
-            if shifted:
-                due_date = due_date + timedelta(days=payment_delay_days)
-            if start_range <= due_date <= end_range:
-                key = invoice.cif or "SIN-CIF"
-                if key not in provider_totals:
-                    provider_totals[key] = {
-                        "cif": invoice.cif,
-                        "name": provider_name or invoice.nombre or "Proveedor sin nombre",
-                        "amount": 0.0,
-                        "invoices": 0,
-                    }
-                provider_totals[key]["amount"] += float(invoice.importe or 0.0)
-                provider_totals[key]["invoices"] += 1
-        ranked = sorted(provider_totals.values(), key=lambda item: item["amount"], reverse=True)
-        return ranked[:3]
-
-    scheduled_balance = opening_balance
-    delayed_balance = opening_balance
-    stressed_balance = opening_balance
-    stress_multiplier = 1 + (stress_pct / 100)
-    weekly_projection = []
+    return result
+
+@router.get("/treasury-simulator/grid")
+def get_treasury_simulator_grid(
+    horizon_weeks: int = 8,
+    delay_min: int = 0,
+    delay_max: int = 45,
+    delay_step: int = 1,
+    stress_min: float = 0.0,
+    stress_max: float = 50.0,
+    stress_step: float = 2.5,
+    db: Session = Depends(get_db),
+):
+    """
+    Evalúa el simulador para todas las combinaciones de retraso y estrés con
+    una sola carga de datos. La respuesta es compacta: series semanales
+    factorizadas por parámetro (el saldo de cualquier combinación es saldo
+    inicial - suma acumulada), sin depender del saldo inicial ni de la reserva,
+    para que la UI mueva todos los controles sin volver a llamar al servidor.
+    """
+    horizon_weeks = max(4, min(horizon_weeks, 16))
+    delays = parameter_axis(delay_min, delay_max, delay_step, 0, 45).astype(int)
+    stresses = parameter_axis(stress_min, stress_max, stress_step, 0.0, 50.0)
+
+    today = date.today()
+    horizon_end = today + timedelta(days=horizon_weeks * 7 - 1)
+    next_30_days = today + timedelta(days=30)
 
+    due_series = load_due_series(db, today, today - timedelta(days=int(delays.max())), horizon_end)
+    provider_series = load_provider_series(db, today, today, max(horizon_end, next_30_days))
+    weekly_providers = top_providers_by_bucket(
+        provider_series, week_buckets(provider_series["day_offsets"], horizon_weeks), horizon_weeks, limit=3
+    )
+    exposure_days = provider_series["day_offsets"]
+    exposure_buckets = np.where((exposure_days >= 0) & (exposure_days <= 30), 0, -1)
+
+    grid = evaluate_grid(due_series["day_offsets"], due_series["amounts"], horizon_weeks, delays, stresses)
+
+    weeks = []
     for index in range(horizon_weeks):
         week_start = today + timedelta(days=index * 7)
         week_end = week_start + timedelta(days=6)
-
-        scheduled_amount = 0.0
-        delayed_amount = 0.0
-        for invoice, _provider_name in invoices:
-            if not invoice.fecha_vencimiento:
-                continue
-            due_date = invoice.fecha_vencimiento.date()
-            if week_start <= due_date <= week_end:
-                scheduled_amount += float(invoice.importe or 0.0)
-
-            shifted_due_date = due_date + timedelta(days=payment_delay_days)
-            if week_start <= shifted_due_date <= week_end:
-                delayed_amount += float(invoice.importe or 0.0)
-
-        stressed_amount = scheduled_amount * stress_multiplier
-        scheduled_balance -= scheduled_amount
-        delayed_balance -= delayed_amount
-        stressed_balance -= stressed_amount
-
-        weekly_projection.append(
+        weeks.append(
             {
                 "label": f"S{index + 1}",
                 "range": f"{week_start.strftime('%d/%m')} - {week_end.strftime('%d/%m')}",
-                "scheduled_amount": round(scheduled_amount, 2),
-                "delayed_amount": round(delayed_amount, 2),
-                "stressed_amount": round(stressed_amount, 2),
-                "scheduled_balance": round(scheduled_balance, 2),
-                "delayed_balance": round(delayed_balance, 2),
-                "stressed_balance": round(stressed_balance, 2),
-                "available_after_reserve": round(scheduled_balance - reserve_balance, 2),
-                "providers": build_provider_breakdown(week_start, week_end),
+                "providers": weekly_providers[index],
             }
         )
 
-    next_30_days = today + timedelta(days=30)
-    exposure_by_provider = {}
-    for invoice, provider_name in invoices:
-        if not invoice.fecha_vencimiento:
-            continue
-        due_date = invoice.fecha_vencimiento.date()
-        if due_date < today or due_date > next_30_days:
-            continue
-        key = invoice.cif or "SIN-CIF"
-        if key not in exposure_by_provider:
-            exposure_by_provider[key] = {
-                "cif": invoice.cif,
-                "name": provider_name or invoice.nombre or "Proveedor sin nombre",
-                "amount": 0.0,
-                "invoices": 0,
-            }
-        exposure_by_provider[key]["amount"] += float(invoice.importe or 0.0)
-        exposure_by_provider[key]["invoices"] += 1
+    return {
+        "horizon_weeks": horizon_weeks,
+        "axes": {
+            "payment_delay_days": delays.tolist(),
+            "stress_pct": stresses.tolist(),
+        },
+        "weeks": weeks,
+        "top_exposures": top_providers_by_bucket(provider_series, exposure_buckets, 1, limit=5)[0],
+        "scheduled_amounts": np.round(grid["scheduled_amounts"], 2).tolist(),
+        "delayed_amounts": np.round(grid["delayed_amounts"], 2).tolist(),
+        "stressed_amounts": np.round(grid["stressed_amounts"], 2).tolist(),
+    }
 
-    top_exposures = sorted(exposure_by_provider.values(), key=lambda item: item["amount"], reverse=True)[:5]
-    upcoming_total = round(sum(item["amount"] for item in top_exposures), 2)
+@router.get("/treasury-simulator/daily")
+def get_treasury_daily_projection(
+    opening_balance: float = 150000,
+    reserve_balance: float = 30000,
+    horizon_days: int = 365,
+    payment_delay_days: int = 0,
+    stress_pct: float = 12.5,
+    db: Session = Depends(get_db),
+):
+    """
+    Proyección de caja con granularidad diaria y horizonte de hasta dos años,
+    a partir de la serie diaria del rollup (una fila por día, no por factura).
+    Se devuelve en columnas: fechas y series alineadas por índice.
+    """
+    horizon_days = max(7, min(horizon_days, 730))
+    payment_delay_days = max(0, min(payment_delay_days, 45))
+    stress_pct = max(0.0, min(stress_pct, 50.0))
 
-    alerts = []
-    first_shortfall_week = next((week for week in weekly_projection if week["scheduled_balance"] < 0), None)
-    first_reserve_breach = next((week for week in weekly_projection if week["available_after_reserve"] < 0), None)
-    if first_shortfall_week:
-        alerts.append(
-            {
-                "type": "critical",
-                "message": f"El saldo cae por debajo de cero en {first_shortfall_week['range']}.",
-            }
-        )
-    if first_reserve_breach:
-        alerts.append(
-            {
-                "type": "warning",
-                "message": f"La reserva mínima se compromete en {first_reserve_breach['range']}.",
-            }
-        )
-    if top_exposures:
-        largest_exposure = top_exposures[0]
-        if upcoming_total and largest_exposure["amount"] / upcoming_total > 0.35:
-            alerts.append(
-                {
-                    "type": "info",
-                    "message": f"Alta concentración de pagos en {largest_exposure['name']} durante los próximos 30 días.",
-                }
-            )
+    today = date.today()
+    due_series = load_due_series(
+        db, today, today - timedelta(days=payment_delay_days), today + timedelta(days=horizon_days - 1)
+    )
+    scheduled = daily_totals(due_series["day_offsets"], due_series["amounts"], horizon_days)
+    delayed = daily_totals(due_series["day_offsets"], due_series["amounts"], horizon_days, payment_delay_days)
+    stressed = scheduled * (1 + stress_pct / 100)
 
+    scheduled_balance = opening_balance - np.cumsum(scheduled)
+    delayed_balance = opening_balance - np.cumsum(delayed)
+    stressed_balance = opening_balance - np.cumsum(stressed)
+
+    def first_day(mask: np.ndarray):
+        return (today + timedelta(days=int(mask.argmax()))).isoformat() if mask.any() else None
+
+    lowest = int(scheduled_balance.argmin())
     return {
         "opening_balance": opening_balance,
         "reserve_balance": reserve_balance,
         "payment_delay_days": payment_delay_days,
         "stress_pct": stress_pct,
-        "weeks": weekly_projection,
+        "start_date": today.isoformat(),
+        "dates": [(today + timedelta(days=offset)).isoformat() for offset in range(horizon_days)],
+        "scheduled_amounts": np.round(scheduled, 2).tolist(),
+        "delayed_amounts": np.round(delayed, 2).tolist(),
+        "scheduled_balance": np.round(scheduled_balance, 2).tolist(),
+        "delayed_balance": np.round(delayed_balance, 2).tolist(),
+        "stressed_balance": np.round(stressed_balance, 2).tolist(),
         "summary": {
-            "scheduled_total": round(sum(week["scheduled_amount"] for week in weekly_projection), 2),
-            "delayed_total": round(sum(week["delayed_amount"] for week in weekly_projection), 2),
-            "stressed_total": round(sum(week["stressed_amount"] for week in weekly_projection), 2),
-            "final_balance": round(weekly_projection[-1]["scheduled_balance"] if weekly_projection else opening_balance, 2),
-            "peak_week": max(weekly_projection, key=lambda week: week["scheduled_amount"], default=None),
+            "scheduled_total": round(float(scheduled.sum()), 2),
+            "delayed_total": round(float(delayed.sum()), 2),
+            "stressed_total": round(float(stressed.sum()), 2),
+            "final_balance": round(float(scheduled_balance[-1]), 2),
+            "lowest_balance": round(float(scheduled_balance[lowest]), 2),
+            "lowest_balance_date": (today + timedelta(days=lowest)).isoformat(),
+            "first_shortfall_date": first_day(scheduled_balance < 0),
+            "first_reserve_breach_date": first_day(scheduled_balance < reserve_balance),
         },
-        "top_exposures": top_exposures,
-        "alerts": alerts,
     }
 
+# Sesiones what-if en memoria (proyección agrupada por semana)
+what_if_sessions = WhatIfStore(ttl_seconds=1800)
+
+def _get_what_if_session(session_id: str):
+    session = what_if_sessions.get(session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="What-if session not found or expired")
+    return session
+
+@router.post("/treasury-simulator/what-if", status_code=201)
+def create_what_if_session(params: WhatIfSessionCreate, db: Session = Depends(get_db)):
+    horizon_weeks = max(4, min(params.horizon_weeks, 16))
+    session = load_what_if_session(db, date.today(), horizon_weeks, params.opening_balance, params.reserve_balance)
+    session_id = what_if_sessions.add(session)
+    return {"session_id": session_id, **session.projection()}
+
+@router.get("/treasury-simulator/what-if/{session_id}")
+def get_what_if_session(session_id: str):
+    session = _get_what_if_session(session_id)
+    with session.lock:
+        return {"session_id": session_id, **session.projection()}
+
+@router.post("/treasury-simulator/what-if/{session_id}/moves")
+def move_what_if(session_id: str, move: WhatIfMove):
+    """
+    Aplica un movimiento como delta sobre las semanas de origen y destino.
+    Devuelve los saldos de todas las semanas y el desglose de proveedores
+    sólo de las semanas modificadas.
+    """
+    session = _get_what_if_session(session_id)
+    with session.lock:
+        try:
+            if move.invoice_id is not None:
+                changed = session.move_invoice(move.invoice_id, move.to_week)
+            else:
+                changed = session.move_provider(move.cif, move.from_week, move.to_week)
+        except KeyError:
+            raise HTTPException(status_code=404, detail="Invoice or provider not found in this week")
+        except ValueError as exc:
+            raise HTTPException(status_code=400, detail=str(exc))
+        return {"changed_weeks": changed, **session.projection(provider_weeks=changed)}
+
+@router.delete("/treasury-simulator/what-if/{session_id}", status_code=204)
+def delete_what_if_session(session_id: str):
+    if not what_if_sessions.remove(session_id):
+        raise HTTPException(status_code=404, detail="What-if session not found or expired")
+    return None
+
 class BatchInput(BatchBase):
     invoices: List[InvoiceCreate]
     payment_date: Optional[date] = None
@@ -277,63 +298,51 @@ def create_batch(batch_in: BatchInput, db: Session = Depends(get_db)):
         global_due_date = datetime.combine(batch_in.payment_date, datetime.min.time())
 
     try:
+        # Una sola pasada sobre el payload: filas de facturas + datos de proveedores
+        invoice_rows, providers_data = build_batch_rows(batch_in.invoices, global_due_date)
+
         db_batch = Batch(
             name=batch_in.name,
             file_hash=batch_in.file_hash,
             payment_date=global_due_date,
             status=BatchStatus.GENERATED,
-            created_at=datetime.utcnow()
+            uploaded_to_bank=False,
+            created_at=datetime.utcnow(),
+            **aggregate_invoice_rows(invoice_rows),
         )
         db.add(db_batch)
         db.flush()
 
-        # Recopilar datos de proveedores del lote (deduplicar por CIF)
-        providers_data = []
-        for inv_data in batch_in.invoices:
-            data = inv_data.model_dump()
-            if data.get('cif'):
-                providers_data.append({
-                    'cif': normalize_cif(data['cif']),
-                    'name': data.get('nombre'),
-                    'email': data.get('email'),
-                    'address': data.get('direccion'),
-                    'city': data.get('poblacion'),
-                    'zip_code': data.get('cp'),
-                    'country': data.get('pais'),
-                    'phone': data.pop('phone', None),
-                    'iban': data.get('cuenta')
-                })
-        
         # UPSERT de proveedores (deduplicado e insertado/actualizado en lote)
-        providers_map = upsert_providers_by_cif(db, providers_data)
-        
-        # Ahora crear las facturas/transferencias
-        for inv_data in batch_in.invoices:
-            data = inv_data.model_dump()
-            provider_phone = data.pop('phone', None)
-            data.pop('duplicate_status', None)
-            data.pop('duplicate_message', None)
-            data.pop('duplicate_count', None)
-            
-            invoice_status = data.pop('status', 'VALID') or 'VALID'
-            
-            if global_due_date:
-                data['fecha_vencimiento'] = global_due_date
-            
-            # Normalizar CIF en la factura también
-            if data.get('cif'):
-                data['cif'] = normalize_cif(data['cif'])
-            
-            db_inv = Invoice(
-                **data,
-                batch_id=db_batch.id,
-                status=invoice_status,
-            )
-            db.add(db_inv)
+        upsert_providers_by_cif(db, providers_data)
+
+        # Inserción masiva de las facturas/transferencias (sin objetos ORM por fila)
+        invoice_ids = bulk_insert_invoices(db, db_batch.id, invoice_rows)
+        add_invoices_to_rollups(db, invoice_rows)
+        refresh_provider_summaries(db, (row.get("cif") for row in invoice_rows))
+
+        # Construimos la respuesta con lo que ya tenemos en memoria para evitar
+        # el refresh y la recarga perezosa de todas las facturas tras el commit
+        response = {
+            "id": db_batch.id,
+            "name": db_batch.name,
+            "file_hash": db_batch.file_hash,
+            "created_at": db_batch.created_at,
+            "payment_date": db_batch.payment_date,
+            "status": db_batch.status.value,
+            "uploaded_to_bank": False,
+            "total_amount": db_batch.total_amount,
+            "invoice_count": db_batch.invoice_count,
+            "issues_count": db_batch.issues_count,
+            "invoices": [
+                {**row, "id": invoice_id, "status": row["status"].value}
+                for row, invoice_id in zip(invoice_rows, invoice_ids)
+            ],
+        }
 
         db.commit()
-        db.refresh(db_batch)
-        return db_batch
+        batch_total_cache.clear()
+        return response
     except Exception:
         db.rollback()
         raise
@@ -347,6 +356,10 @@ def list_batches(
     search: Optional[str] = None,
     start_date: Optional[date] = None,
     end_date: Optional[date] = None,
+    payment_date_start: Optional[date] = None,
+    payment_date_end: Optional[date] = None,
+    cursor: Optional[str] = None,
+    total_mode: Literal["exact", "cached", "estimated", "none"] = "exact",
     db: Session = Depends(get_db)
 ):
     query = db.query(Batch)
@@ -358,94 +371,201 @@ def list_batches(
              query = query.filter(Batch.id == int(search))
         else:
              query = query.filter(Batch.name.ilike(f"%{search}%"))
-    
-    if start_date:
-        query = query.filter(func.date(Batch.created_at) >= start_date)
-    
-    if end_date:
-        query = query.filter(func.date(Batch.created_at) <= end_date)
 
-    total = query.count()
-    batches = query.order_by(Batch.created_at.desc()).offset(skip).limit(limit).all()
-    
-    # Compute totals
-    for b in batches:
-        b.total_amount = sum(inv.importe for inv in b.invoices if inv.importe)
+    # Rangos sobre la columna sin envolverla en func.date() para que use su índice
+    created_from, created_to = day_range(start_date, end_date)
+    if created_from:
+        query = query.filter(Batch.created_at >= created_from)
+    if created_to:
+        query = query.filter(Batch.created_at < created_to)
+
+    payment_from, payment_to = day_range(payment_date_start, payment_date_end)
+    if payment_from:
+        query = query.filter(Batch.payment_date >= payment_from)
+    if payment_to:
+        query = query.filter(Batch.payment_date < payment_to)
+
+    filters_key = (search, start_date, end_date, payment_date_start, payment_date_end)
+    if total_mode == "exact":
+        total = query.count()
+    elif total_mode == "cached":
+        total = batch_total_cache.get_or_compute(filters_key, query.count)
+    elif total_mode == "estimated":
+        total = estimate_table_rows(db, "batches") if not any(filters_key) else None
+        if total is None:
+            total = batch_total_cache.get_or_compute(filters_key, query.count)
+    else:
+        total = None
+
+    # Paginación por cursor (keyset) sobre (created_at, id): páginas profundas
+    # cuestan lo mismo que la primera. Sin cursor se mantiene skip/limit.
+    if cursor:
+        cursor_created_at, cursor_id = decode_cursor(cursor, datetime, int)
+        query = query.filter(
+            or_(
+                Batch.created_at < cursor_created_at,
+                and_(Batch.created_at == cursor_created_at, Batch.id < cursor_id),
+            )
+        )
+        skip = 0
+
+    # Totales leídos de los agregados desnormalizados del lote (sin tocar invoices)
+    batches = (
+        query.order_by(Batch.created_at.desc(), Batch.id.desc())
+        .offset(skip)
+        .limit(limit)
+        .all()
+    )
 
-    return {"items": batches, "total": total}
+    next_cursor = None
+    if batches and len(batches) == limit and batches[-1].created_at is not None:
+        next_cursor = encode_cursor(batches[-1].created_at, batches[-1].id)
 
-@router.get("/{batch_id}", response_model=BatchSchema)
+    return {"items": batches, "total": total, "next_cursor": next_cursor}
+
+@router.get("/{batch_id}", response_model=BatchSummary)
 def get_batch(batch_id: int, db: Session = Depends(get_db)):
+    # Cabecera del lote: sólo datos resumen, las facturas van en /{batch_id}/invoices
     batch = db.query(Batch).filter(Batch.id == batch_id).first()
     if not batch:
         raise HTTPException(status_code=404, detail="Batch not found")
     return batch
 
+# Claves de ordenación del detalle: (expresión sin NULLs, tipo del valor en el cursor)
+BATCH_INVOICE_SORTS = {
+    "id": (Invoice.id, int),
+    "importe": (func.coalesce(Invoice.importe, 0.0), float),
+    "fecha_vencimiento": (func.coalesce(Invoice.fecha_vencimiento, datetime(1900, 1, 1)), datetime),
+    "cif": (func.coalesce(Invoice.cif, ""), str),
+    "nombre": (func.coalesce(Invoice.nombre, ""), str),
+    "factura": (func.coalesce(Invoice.factura, ""), str),
+}
+
+@router.get("/{batch_id}/invoices", response_model=PaginatedBatchInvoices)
+def list_batch_invoices(
+    batch_id: int,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    sort: Literal["id", "importe", "fecha_vencimiento", "cif", "nombre", "factura"] = "id",
+    order: Literal["asc", "desc"] = "asc",
+    status: Optional[InvoiceStatus] = None,
+    cif: Optional[str] = None,
+    duplicate: Optional[bool] = None,
+    db: Session = Depends(get_db)
+):
+    limit = max(1, min(limit, 1000))
+    batch = db.query(Batch).filter(Batch.id == batch_id).first()
+    if not batch:
+        raise HTTPException(status_code=404, detail="Batch not found")
+
+    sort_expression, sort_type = BATCH_INVOICE_SORTS[sort]
+    is_duplicate = has_duplicate_clause(Invoice)
+    query = db.query(Invoice, is_duplicate.label("is_duplicate"), sort_expression.label("sort_key")).filter(
+        Invoice.batch_id == batch_id
+    )
+
+    if status is not None:
+        query = query.filter(Invoice.status == status)
+    if cif:
+        query = query.filter(Invoice.cif.startswith(normalize_cif(cif), autoescape=True))
+    if duplicate is not None:
+        query = query.filter(is_duplicate if duplicate else ~is_duplicate)
+
+    filtered = status is not None or bool(cif) or duplicate is not None
+    total = query.count() if filtered else batch.invoice_count
+
+    # Keyset sobre (clave de orden, id)
+    if cursor:
+        last_value, last_id = decode_cursor(cursor, sort_type, int)
+        if order == "asc":
+            query = query.filter(or_(sort_expression > last_value, and_(sort_expression == last_value, Invoice.id > last_id)))
+        else:
+            query = query.filter(or_(sort_expression < last_value, and_(sort_expression == last_value, Invoice.id < last_id)))
+
+    if order == "asc":
+        ordering = (sort_expression.asc(), Invoice.id.asc())
+    else:
+        ordering = (sort_expression.desc(), Invoice.id.desc())
+    rows = (
+        query.options(raiseload(Invoice.batch))
+        .order_by(*ordering)
+        .limit(limit)
+        .all()
+    )
+
+    items = []
+    for invoice, flagged, _sort_key in rows:
+        item = BatchInvoice.model_validate(invoice)
+        item.is_duplicate = bool(flagged)
+        items.append(item)
+
+    next_cursor = None
+    if len(rows) == limit:
+        last_invoice, _flagged, last_sort_key = rows[-1]
+        next_cursor = encode_cursor(last_sort_key, last_invoice.id)
+
+    return {"items": items, "total": total, "next_cursor": next_cursor}
+
 @router.get("/{batch_id}/export")
 def export_batch(batch_id: int, db: Session = Depends(get_db)):
     import traceback
     try:
-        import traceback
         batch = db.query(Batch).filter(Batch.id == batch_id).first()
         if not batch:
             raise HTTPException(status_code=404, detail="Batch not found")
-        
-        # Generate Excel
-        try:
-            file_content = generate_bankinter_excel(batch.invoices, db)
-        except Exception as e:
-            append_log_line("export_error.log", f"\n[ERROR GENERATING EXCEL]: {str(e)}\n{traceback.format_exc()}\n")
-            raise HTTPException(status_code=500, detail=f"Error generando Excel: {str(e)}")
-        
-        # Filename: [CreationDate]_CONFIRMING_[DueDate] (ISO format for better sorting)
-        creation_date_str = batch.created_at.strftime('%Y-%m-%d') if batch.created_at else datetime.now().strftime('%Y-%m-%d')
-        due_date_str = batch.payment_date.strftime('%Y-%m-%d') if batch.payment_date else "SinVencimiento"
-        filename = f"{creation_date_str}_CONFIRMING_{due_date_str}.xlsx"
-        
-# Check for export path in settings
+
         from ..models import Settings
         settings_obj = db.query(Settings).first()
-        
-        append_log_line("debug_export.log", f"\n--- EXPORT REQUEST {datetime.now()} ---\n")
-        append_log_line("debug_export.log", f"Settings found: {settings_obj is not None}\n")
-        if settings_obj:
-            export_path = settings_obj.export_path
-            append_log_line("debug_export.log", f"Export Path in DB: '{export_path}'\n")
-
-        if settings_obj and settings_obj.export_path and settings_obj.export_path.strip():
-            import os
+        version = export_content_version(batch, settings_obj.numero_cuenta_cargo if settings_obj else "")
+
+        # Generate Excel (o reutiliza el de la misma versión)
+        artifact = export_cache.get(batch_id, version)
+        cache_status = "HIT" if artifact else "MISS"
+        if artifact is None:
             try:
-                # Ensure directory exists
-                target_dir = settings_obj.export_path.strip()
-                append_log_line("debug_export.log", f"Target Dir: '{target_dir}'\n")
-                
-                os.makedirs(target_dir, exist_ok=True)
-                full_path = os.path.join(target_dir, filename)
-                
-                append_log_line("debug_export.log", f"Writing to: '{full_path}'\n")
-                
-                with open(full_path, "wb") as f:
-                    f.write(file_content) # file_content is bytes
-                    
-                append_log_line("debug_export.log", "SUCCESS: File written.\n")
-                    
-                # No need to seek for bytes
+                # Las facturas se leen por bloques y se escriben en streaming
+                invoices = (
+                    db.query(Invoice)
+                    .filter(Invoice.batch_id == batch_id)
+                    .order_by(Invoice.id)
+                    .yield_per(1000)
+                )
+                artifact = export_cache.put(batch_id, version, generate_bankinter_excel(invoices, db))
             except Exception as e:
-                append_log_line("debug_export.log", f"ERROR: {str(e)}\n{traceback.format_exc()}\n")
-                
-                # Also log to main error log
-                append_log_line("export_error.log", f"\n[ERROR SAVING LOCAL]: {str(e)}\n{traceback.format_exc()}\n")
+                append_log_line("export_error.log", f"\n[ERROR GENERATING EXCEL]: {str(e)}\n{traceback.format_exc()}\n")
+                raise HTTPException(status_code=500, detail=f"Error generando Excel: {str(e)}")
+
+        # Filename: [CreationDate]_CONFIRMING_[DueDate] (ISO format for better sorting)
+        creation_date_str = batch.created_at.strftime('%Y-%m-%d') if batch.created_at else datetime.now().strftime('%Y-%m-%d')
+        due_date_str = batch.payment_date.strftime('%Y-%m-%d') if batch.payment_date else "SinVencimiento"
+        filename = f"{creation_date_str}_CONFIRMING_{due_date_str}.xlsx"
+
+        # Copia a la carpeta de exportación en segundo plano (temporal + rename)
+        target_dir = settings_obj.export_path.strip() if settings_obj and settings_obj.export_path else ""
+        if not target_dir:
+            archive_note = "SKIP: No export path configured."
+        elif os.path.join(target_dir, filename) in artifact.archived_paths:
+            archive_note = "SKIP: already archived."
         else:
-             append_log_line("debug_export.log", "SKIP: No export path configured.\n")
-        
+            export_archiver.submit(artifact, target_dir, filename)
+            archive_note = f"QUEUED: '{target_dir}'"
+        append_log_line(
+            "debug_export.log",
+            f"{datetime.now()} batch {batch_id} v{version} cache {cache_status}, {archive_note}\n",
+        )
+
         # Update status
         batch.status = BatchStatus.SENT
         db.commit()
-        
+
         return Response(
-            content=file_content,
+            content=artifact.content,
             media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-            headers={"Content-Disposition": f"attachment; filename={filename}"}
+            headers={
+                "Content-Disposition": f"attachment; filename={filename}",
+                "X-Export-Version": version,
+                "X-Export-Cache": cache_status,
+            }
         )
     except HTTPException:
         raise
@@ -453,7 +573,7 @@ def export_batch(batch_id: int, db: Session = Depends(get_db)):
         append_log_line("export_error.log", f"\n[CRITICAL EXPORT ERROR]: {str(e)}\n{traceback.format_exc()}\n")
         raise HTTPException(status_code=500, detail=f"Internal Server Error: {str(e)}")
 
-@router.patch("/{batch_id}/toggle-upload", response_model=BatchSchema)
+@router.patch("/{batch_id}/toggle-upload", response_model=BatchSummary)
 def toggle_batch_upload_status(batch_id: int, db: Session = Depends(get_db)):
     batch = db.query(Batch).filter(Batch.id == batch_id).first()
     if not batch:
@@ -466,20 +586,16 @@ def toggle_batch_upload_status(batch_id: int, db: Session = Depends(get_db)):
 
 @router.delete("/{batch_id}", status_code=204)
 def delete_batch(batch_id: int, db: Session = Depends(get_db)):
-    batch = db.query(Batch).filter(Batch.id == batch_id).first()
-    if not batch:
+    # Un solo DELETE: las facturas se eliminan por ON DELETE CASCADE en la BD
+    if not delete_batch_with_invoices(db, batch_id):
         raise HTTPException(status_code=404, detail="Batch not found")
-    
-    # Cascade delete invoices manually if needed (safest)
-    if batch.invoices:
-        for invoice in batch.invoices:
-            db.delete(invoice)
-            
-    db.delete(batch)
+
     db.commit()
+    batch_total_cache.clear()
+    export_cache.invalidate(batch_id)
     return None
 
-from ..services.pdf_service import generate_batch_pdf
+from ..services.pdf_service import LARGE_BATCH_PDF_ROWS, generate_batch_pdf, generate_large_batch_pdf
 
 @router.get("/{batch_id}/export-pdf")
 def export_batch_pdf(batch_id: int, db: Session = Depends(get_db)):
@@ -487,7 +603,17 @@ def export_batch_pdf(batch_id: int, db: Session = Depends(get_db)):
     if not batch:
         raise HTTPException(status_code=404, detail="Batch not found")
     
-    pdf_content = generate_batch_pdf(batch)
+    if (batch.invoice_count or 0) > LARGE_BATCH_PDF_ROWS:
+        # Remesas grandes: facturas en streaming y dibujo directo en el canvas
+        invoices = (
+            db.query(Invoice)
+            .filter(Invoice.batch_id == batch_id)
+            .order_by(Invoice.id)
+            .yield_per(1000)
+        )
+        pdf_content = generate_large_batch_pdf(batch, invoices)
+    else:
+        pdf_content = generate_batch_pdf(batch)
     
     filename = f"Orden_Remesa_{batch.id}.pdf"
     
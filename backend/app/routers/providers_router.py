@@ -1,13 +1,17 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Query, Request, Response
+from fastapi.responses import JSONResponse
 from ..routers.auth_router import get_current_user
+from sqlalchemy import func, or_
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 from ..database import get_db
 from ..models import Provider
 from ..schemas import Provider as ProviderSchema, ProviderCreate
-import pandas as pd
-import io
-from datetime import datetime, timedelta
+from ..services.provider_service import chunked, upsert_provider_master
+import hashlib
+import itertools
+import openpyxl
+from datetime import datetime
 
 router = APIRouter(
     prefix="/providers", 
@@ -73,109 +77,243 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Filas en las que se busca la cabecera (CIF/NIF) del maestro
+HEADER_SCAN_ROWS = 50
+# Errores por fila que se devuelven (y se registran) como máximo
+MAX_REPORTED_ERRORS = 10
+
+# Columna estándar -> campo de Provider
+PROVIDER_MASTER_FIELDS = {
+    'NAME': 'name', 'EMAIL': 'email', 'ADDRESS': 'address', 'CITY': 'city', 'ZIP': 'zip_code',
+    'IBAN': 'iban', 'PHONE': 'phone', 'COUNTRY': 'country', 'SWIFT': 'swift',
+}
+
+
+def _is_header_row(values) -> bool:
+    # Cabecera = fila con "CIF"/"NIF" (también "N.I.F." sin puntos)
+    for val in values:
+        val = str(val).upper().strip() if val is not None else ""
+        if val in ["CIF", "NIF", "N.I.F.", "N.I.F"] or val.replace(".", "") in ["CIF", "NIF"]:
+            return True
+    return False
+
+
+def _cell_text(value) -> Optional[str]:
+    if value is None:
+        return None
+    text = str(value).strip()
+    return text or None
+
+
+def read_provider_master(source):
+    """
+    Lee el maestro en streaming (openpyxl read-only): busca la cabecera en las
+    primeras HEADER_SCAN_ROWS filas, resuelve las columnas una vez y devuelve
+    (columnas detectadas, mapeo, generador de (nº de fila Excel, datos)).
+    Sin cabecera reconocible se toma la primera fila, como hacía pandas.
+    """
+    workbook = openpyxl.load_workbook(source, read_only=True, data_only=True)
+    rows = workbook.active.iter_rows(values_only=True)
+
+    scanned = []
+    header = None
+    for values in rows:
+        scanned.append(values)
+        if _is_header_row(values):
+            header = values
+            logger.info(f"Header found at row {len(scanned)}")
+            break
+        if len(scanned) >= HEADER_SCAN_ROWS:
+            break
+
+    if header is None:
+        logger.error(f"Header row (CIF/NIF) NOT found in the first {HEADER_SCAN_ROWS} rows.")
+        if not scanned:
+            workbook.close()
+            return [], {}, iter(())
+        header = scanned[0]
+        pending = scanned[1:]
+        first_row_number = 2
+    else:
+        pending = []
+        first_row_number = len(scanned) + 1
+
+    columns = [str(value).upper().strip() if value is not None else "" for value in header]
+    col_map = normalize_columns(columns)
+    indexes = {std: columns.index(column) for std, column in col_map.items()}
+
+    def records():
+        try:
+            for row_number, values in enumerate(itertools.chain(pending, rows), start=first_row_number):
+                yield row_number, {
+                    std: values[index] if index < len(values) else None for std, index in indexes.items()
+                }
+        finally:
+            workbook.close()
+
+    return columns, col_map, records()
+
+
 @router.post("/upload", status_code=201)
-async def upload_providers(file: UploadFile = File(...), db: Session = Depends(get_db)):
+def upload_providers(file: UploadFile = File(...), db: Session = Depends(get_db)):
     logger.info(f"Starting upload for file: {file.filename}")
-    content = await file.read()
-    
-    # First pass: read as headerless to find the header row
     try:
-        df_scan = pd.read_excel(io.BytesIO(content), header=None, engine='openpyxl')
-        logger.info(f"File read successfully. Rows: {len(df_scan)}")
+        columns, col_map, records = read_provider_master(file.file)
     except Exception as e:
         logger.error(f"Error reading Excel: {str(e)}")
         raise HTTPException(status_code=400, detail=f"Invalid Excel file: {str(e)}")
 
-    # Find header row
-    header_index = -1
-    for idx, row in df_scan.iterrows():
-        # Convert row to list of strings
-        # We also check for "N.I.F." specifically or just "NIF" after stripping punctuation
-        row_str = [str(val).upper().strip() for val in row.values]
-        
-        # Check if row contains key identifiers
-        # We check both exact string and a "clean" version (dots removed) to catch N.I.F. as NIF
-        found = False
-        for val in row_str:
-            clean_val = val.replace(".", "")
-            if val in ["CIF", "NIF", "N.I.F.", "N.I.F"] or clean_val in ["CIF", "NIF"]:
-                found = True
-                break
-        
-        if found:
-            header_index = idx
-            logger.info(f"Header found at index {idx}: {row_str}")
-            break
-            
-    if header_index == -1:
-        logger.error("Header row (CIF/NIF) NOT found in the first rows.")
-        # Fallback: reload with default header=0
-        try:
-            df = pd.read_excel(io.BytesIO(content), engine='openpyxl')
-        except:
-             raise HTTPException(status_code=400, detail="Could not detect header row (CIF/NIF not found)")
-    else:
-        # Reload with correct header
-        df = pd.read_excel(io.BytesIO(content), header=header_index, engine='openpyxl')
-
-    # Normalize headers
-    df.columns = [str(c).upper().strip() for c in df.columns]
-    print(f"DEBUG: Columns detected: {list(df.columns)}", flush=True)
-    
-    col_map = normalize_columns(df.columns)
-    print(f"DEBUG: Column Mapping Result: {col_map}", flush=True)
-
+    logger.info(f"Columns detected: {columns} -> {col_map}")
     if 'CIF' not in col_map:
         logger.error(f"Missing CIF in mapping. Mapping: {col_map}")
-        raise HTTPException(status_code=400, detail=f"Column 'CIF' key not found. Found: {list(df.columns)}")
+        raise HTTPException(status_code=400, detail=f"Column 'CIF' key not found. Found: {columns}")
 
     count = 0
     errors = []
-
-    for idx, row in df.iterrows():
+    error_count = 0
+
+    def report(message: str):
+        nonlocal error_count
+        error_count += 1
+        if len(errors) < MAX_REPORTED_ERRORS:
+            logger.warning(message)
+            errors.append(message)
+
+    def provider_rows():
+        for row_number, record in records:
+            try:
+                cif = _cell_text(record.get('CIF'))
+                if not cif:
+                    continue
+                yield row_number, {
+                    'cif': cif,
+                    **{field: _cell_text(record.get(std)) for std, field in PROVIDER_MASTER_FIELDS.items()},
+                }
+            except Exception as e:
+                report(f"Row {row_number} error: {str(e)}")
+
+    # UPSERT nativo por bloques, con commit por bloque
+    for chunk in chunked(provider_rows()):
         try:
-            val_cif = row.get(col_map.get('CIF'))
-            if pd.isna(val_cif): continue
-            
-            cif = str(val_cif).strip()
-            
-            # Upsert logic
-            provider = db.query(Provider).filter(Provider.cif == cif).first()
-            if not provider:
-                provider = Provider(cif=cif)
-                db.add(provider)
-            
-            # Helper to safely get string
-            def get_s(key):
-                real_col = col_map.get(key)
-                if not real_col: return None
-                val = row.get(real_col)
-                return str(val).strip() if pd.notna(val) else None
-
-            provider.name = get_s('NAME') or provider.name
-            provider.email = get_s('EMAIL')
-            provider.address = get_s('ADDRESS')
-            provider.city = get_s('CITY')
-            provider.zip_code = get_s('ZIP')
-            provider.iban = get_s('IBAN')
-            provider.phone = get_s('PHONE')
-            provider.country = get_s('COUNTRY')
-            provider.swift = get_s('SWIFT')
-            
-            count += 1
+            count += upsert_provider_master(db, [row for _row_number, row in chunk])
+            db.commit()
         except Exception as e:
-            err_msg = f"Row {idx} error: {str(e)}"
-            logger.warning(err_msg)
-            errors.append(err_msg)
+            db.rollback()
+            report(f"Rows {chunk[0][0]}-{chunk[-1][0]} error: {str(e)}")
 
-    db.commit()
-    logger.info(f"Upload finished. Processed: {count}, Errors: {len(errors)}")
-    return {"message": f"Processed {count} providers", "errors": errors[:10]}
+    logger.info(f"Upload finished. Processed: {count}, Errors: {error_count}")
+    return {"message": f"Processed {count} providers", "errors": errors, "error_count": error_count}
+
+# Columnas que puede pedir el listado (?fields=cif,name,...); por defecto todas
+PROVIDER_LIST_FIELDS = (
+    "cif", "name", "email", "address", "city", "zip_code", "iban", "phone", "country", "swift", "updated_at",
+)
 
-@router.get("/", response_model=List[ProviderSchema])
-def list_providers(skip: int = 0, limit: int = 10000, db: Session = Depends(get_db)):
-    providers = db.query(Provider).order_by(Provider.cif).offset(skip).limit(limit).all()
-    return providers
+
+def _list_fields(fields: Optional[str]) -> list[str]:
+    if not fields:
+        return list(PROVIDER_LIST_FIELDS)
+    requested = [field.strip() for field in fields.split(",") if field.strip()]
+    unknown = sorted(set(requested) - set(PROVIDER_LIST_FIELDS))
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown provider fields: {', '.join(unknown)}")
+    # El CIF siempre va: es la clave del keyset y de las filas en el cliente
+    return ["cif", *dict.fromkeys(field for field in requested if field != "cif")]
+
+
+def _json_value(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+# Documentación OpenAPI del listado: filas dispersas (sólo los campos de ?fields=)
+PROVIDER_LIST_RESPONSES = {
+    200: {
+        "description": "Proveedores ordenados por CIF; cada fila trae `cif` y los campos pedidos en `fields`",
+        "content": {
+            "application/json": {
+                "schema": {
+                    "type": "array",
+                    "items": {
+                        "type": "object",
+                        "required": ["cif"],
+                        "properties": {
+                            field: ProviderSchema.model_json_schema()["properties"][field]
+                            for field in PROVIDER_LIST_FIELDS
+                        },
+                    },
+                }
+            }
+        },
+        "headers": {
+            "X-Next-Cursor": {
+                "description": "CIF de la última fila si la página está llena: pásalo en `after` para la siguiente",
+                "schema": {"type": "string"},
+            },
+            "ETag": {"description": "Versión del directorio para If-None-Match", "schema": {"type": "string"}},
+        },
+    },
+    304: {"description": "Not Modified: el ETag de If-None-Match sigue vigente"},
+}
+
+
+@router.get("/", response_model=None, responses=PROVIDER_LIST_RESPONSES)
+def list_providers(
+    request: Request,
+    skip: int = 0,
+    limit: int = Query(10000, ge=1, le=10000),
+    after: Optional[str] = Query(
+        None, description="Keyset: devuelve los proveedores con CIF mayor que este (el X-Next-Cursor anterior)"
+    ),
+    fields: Optional[str] = Query(
+        None, description=f"Campos separados por comas ({', '.join(PROVIDER_LIST_FIELDS)}); por defecto todos"
+    ),
+    q: Optional[str] = None,
+    country: Optional[str] = None,
+    city: Optional[str] = None,
+    missing_iban: bool = False,
+    db: Session = Depends(get_db)
+):
+    """
+    Directorio de proveedores como proyección de columnas (sin objetos ORM ni
+    validación Pydantic por fila), con filtros en servidor y keyset por CIF.
+
+    La respuesta lleva un ETag calculado con count(*) y max(updated_at) de
+    providers (índice de updated_at) más los parámetros de la consulta: si el
+    cliente manda el mismo If-None-Match se contesta 304 sin leer las filas.
+    """
+    columns = _list_fields(fields)
+
+    version = db.query(func.count(Provider.cif), func.max(Provider.updated_at)).one()
+    params = (columns, skip, limit, after, q, country, city, missing_iban)
+    digest = hashlib.sha256(repr((tuple(version), params)).encode("utf-8")).hexdigest()[:16]
+    etag = f'W/"{digest}"'
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag in {tag.strip() for tag in request.headers.get("if-none-match", "").split(",")}:
+        return Response(status_code=304, headers=headers)
+
+    query = db.query(*(getattr(Provider, column) for column in columns)).order_by(Provider.cif)
+    if q:
+        pattern = f"%{q.strip()}%"
+        query = query.filter(or_(Provider.name.ilike(pattern), Provider.cif.ilike(pattern)))
+    if country:
+        query = query.filter(func.lower(Provider.country) == country.strip().lower())
+    if city:
+        query = query.filter(func.lower(Provider.city) == city.strip().lower())
+    if missing_iban:
+        query = query.filter(or_(Provider.iban.is_(None), Provider.iban == ""))
+    if after is not None:
+        # Keyset sobre la clave primaria: sin OFFSET, usa el índice de cif
+        query = query.filter(Provider.cif > after)
+    else:
+        query = query.offset(skip)
+    rows = query.limit(limit).all()
+
+    if rows and len(rows) == limit:
+        headers["X-Next-Cursor"] = rows[-1].cif
+    return JSONResponse(
+        [{column: _json_value(value) for column, value in zip(columns, row)} for row in rows],
+        headers=headers,
+    )
 
 # CRUD Endpoints
 
@@ -226,9 +364,15 @@ def delete_provider(cif: str, db: Session = Depends(get_db)):
 
 from pydantic import BaseModel
 from typing import Optional
-from ..models import Invoice, Batch
-from sqlalchemy import func
-from ..services.duplicate_service import summarize_duplicate_groups, build_duplicate_key
+from typing import Literal
+from datetime import date
+from ..models import Invoice, Batch, ProviderSummary
+from sqlalchemy import and_
+from ..services.analytics_service import load_duplicate_groups
+from ..services.duplicate_service import duplicate_occurrences_subquery
+from ..services.provider_summary_service import refresh_time_relative
+from ..utils.sql_dates import month_key, shift_months
+from ..utils.pagination import day_range, decode_cursor, encode_cursor
 
 
 class Insight(BaseModel):
@@ -267,6 +411,13 @@ class ProviderInvoiceItem(BaseModel):
     duplicate_message: Optional[str] = None
 
 
+class PaginatedProviderInvoices(BaseModel):
+    items: List[ProviderInvoiceItem]
+    # Sólo en la primera página (sin cursor)
+    total: Optional[int] = None
+    next_cursor: Optional[str] = None
+
+
 class ProviderStats(BaseModel):
     cif: str
     name: str
@@ -296,81 +447,60 @@ class ProviderStats(BaseModel):
 @router.get("/{cif}/stats", response_model=ProviderStats)
 def get_provider_stats(cif: str, db: Session = Depends(get_db)):
     provider = db.query(Provider).filter(Provider.cif == cif).first()
-    latest_invoice = db.query(Invoice).filter(Invoice.cif == cif).order_by(Invoice.id.desc()).first()
+    # Métricas acumuladas desde provider_summary (mantenido al crear/borrar lotes)
+    summary = db.get(ProviderSummary, cif)
 
-    if not latest_invoice and not provider:
+    if not summary and not provider:
         raise HTTPException(status_code=404, detail="Proveedor no encontrado")
 
-    provider_name = provider.name if provider is not None else None
-    name = provider_name or (latest_invoice.nombre if latest_invoice else "Desconocido")
-    provider_invoices = db.query(Invoice).filter(Invoice.cif == cif).order_by(Invoice.id.desc()).all()
-
-    stats = db.query(
-        func.sum(Invoice.importe),
-        func.count(Invoice.id),
-        func.avg(Invoice.importe)
-    ).filter(Invoice.cif == cif).first()
-
-    total_amount = (stats[0] if stats else 0.0) or 0.0
-    total_invoices = (stats[1] if stats else 0) or 0
-    avg_amount = (stats[2] if stats else 0.0) or 0.0
-
-    last_batch = db.query(Batch).join(Invoice).filter(Invoice.cif == cif).filter(Batch.payment_date != None).order_by(Batch.payment_date.desc()).first()
-    last_payment = last_batch.payment_date.strftime("%Y-%m-%d") if last_batch and last_batch.payment_date else None
-
-    today = datetime.now().date()
-    next_30_days = today + timedelta(days=30)
-    next_due_invoice = (
-        db.query(Invoice)
-        .filter(Invoice.cif == cif, Invoice.fecha_vencimiento != None, func.date(Invoice.fecha_vencimiento) >= today)
-        .order_by(Invoice.fecha_vencimiento.asc())
-        .first()
+    today = date.today()
+    if summary is not None and summary.as_of < today:
+        # La pasada periódica aún no ha renovado los campos relativos a hoy
+        refresh_time_relative(db, [cif], today)
+        db.commit()
+
+    # La última factura sólo hace falta para completar lo que no tenga la ficha
+    latest_invoice = (
+        db.query(Invoice).filter(Invoice.cif == cif).order_by(Invoice.id.desc()).first() if provider is None else None
     )
-    next_due_date = next_due_invoice.fecha_vencimiento.strftime("%Y-%m-%d") if next_due_invoice and next_due_invoice.fecha_vencimiento else None
-
-    upcoming_stats = db.query(
-        func.sum(Invoice.importe),
-        func.count(Invoice.id),
-    ).filter(
-        Invoice.cif == cif,
-        Invoice.fecha_vencimiento != None,
-        func.date(Invoice.fecha_vencimiento) >= today,
-        func.date(Invoice.fecha_vencimiento) <= next_30_days,
-    ).first()
-    upcoming_due_amount = (upcoming_stats[0] if upcoming_stats else 0.0) or 0.0
-    upcoming_invoices_count = (upcoming_stats[1] if upcoming_stats else 0) or 0
-
-    overdue_invoices_count = db.query(Invoice).filter(
-        Invoice.cif == cif,
-        Invoice.fecha_vencimiento != None,
-        func.date(Invoice.fecha_vencimiento) < today,
-    ).count()
-
-    duplicate_groups = summarize_duplicate_groups(provider_invoices)
-    duplicate_invoices_count = sum(group["occurrences"] for group in duplicate_groups)
-
-    six_months_ago = datetime.utcnow() - timedelta(days=180)
-    monthly_raw = (
-        db.query(Batch.created_at, func.sum(Invoice.importe), func.count(Invoice.id))
-        .join(Invoice)
-        .filter(Invoice.cif == cif, Batch.created_at >= six_months_ago)
-        .group_by(Batch.created_at)
-        .all()
+    provider_name = provider.name if provider is not None else None
+    name = provider_name or (summary.name if summary and summary.name else None) or (
+        latest_invoice.nombre if latest_invoice else "Desconocido"
     )
-    monthly_map = {}
-    current = datetime.utcnow()
-    for i in range(5, -1, -1):
-        month_date = current - timedelta(days=i * 30)
-        month_key = month_date.strftime("%Y-%m")
-        monthly_map[month_key] = {"label": month_date.strftime("%b"), "amount": 0.0, "invoices": 0}
-
-    for created_at, amount, count in monthly_raw:
-        if not created_at:
-            continue
-        month_key = created_at.strftime("%Y-%m")
-        if month_key in monthly_map:
-            monthly_map[month_key]["amount"] += float(amount or 0.0)
-            monthly_map[month_key]["invoices"] += int(count or 0)
+
+    total_invoices = summary.invoice_count if summary else 0
+    total_amount = float(summary.total_amount) if summary else 0.0
+    avg_amount = float(summary.average_amount) if summary else 0.0
+    last_payment = summary.last_payment_date.strftime("%Y-%m-%d") if summary and summary.last_payment_date else None
+    next_due_date = summary.next_due_date.strftime("%Y-%m-%d") if summary and summary.next_due_date else None
+    upcoming_due_amount = float(summary.upcoming_amount) if summary else 0.0
+    upcoming_invoices_count = summary.upcoming_count if summary else 0
+    overdue_invoices_count = summary.overdue_count if summary else 0
+
+    # Grupos de duplicados sólo si el resumen dice que los hay
+    duplicate_groups = load_duplicate_groups(db, Invoice.cif == cif) if summary and summary.duplicate_count else []
+    duplicate_invoices_count = summary.duplicate_count if summary else 0
+
+    # Volumen por mes natural de proceso del lote (últimos 6 meses)
+    first_month = shift_months(today, -5)
+    month = month_key(db, Batch.created_at)
+    monthly_rows = {
+        key: (amount, count)
+        for key, amount, count in (
+            db.query(month, func.sum(Invoice.importe), func.count(Invoice.id))
+            .join(Batch, Batch.id == Invoice.batch_id)
+            .filter(Invoice.cif == cif, Batch.created_at >= datetime.combine(first_month, datetime.min.time()))
+            .group_by(month)
+            .all()
+        )
+    }
+    monthly_volume = []
+    for offset in range(6):
+        month_start = shift_months(first_month, offset)
+        amount, count = monthly_rows.get(month_start.strftime("%Y-%m"), (0.0, 0))
+        monthly_volume.append(
+            {"label": month_start.strftime("%b"), "amount": float(amount or 0.0), "invoices": int(count or 0)}
+        )
 
     insights = []
     if total_amount > 50000:
@@ -419,37 +549,101 @@ def get_provider_stats(cif: str, db: Session = Depends(get_db)):
         "overdue_invoices_count": overdue_invoices_count,
         "duplicate_invoices_count": duplicate_invoices_count,
         "duplicate_groups": duplicate_groups,
-        "monthly_volume": list(monthly_map.values()),
+        "monthly_volume": monthly_volume,
         "insights": insights
     }
 
 
+PROVIDER_INVOICE_SORTS = {
+    "id": (Invoice.id, int),
+    "importe": (func.coalesce(Invoice.importe, 0.0), float),
+    "fecha_vencimiento": (func.coalesce(Invoice.fecha_vencimiento, datetime(1900, 1, 1)), datetime),
+}
+
+
+def provider_invoice_rows(db: Session, cif: str, *columns):
+    """
+    Histórico de un proveedor como filas ligeras: la remesa viene en un LEFT
+    JOIN (sin lazy loads) y la marca de duplicado de una única ventana sobre
+    la clave de duplicado de todas sus facturas (calculada antes de paginar).
+    """
+    occurrences = duplicate_occurrences_subquery(Invoice.cif == cif)
+    return (
+        db.query(
+            Invoice.id,
+            Invoice.cif,
+            Invoice.nombre,
+            Invoice.factura,
+            Invoice.importe,
+            Invoice.fecha_vencimiento,
+            Invoice.status,
+            Invoice.batch_id,
+            Batch.name.label("batch_name"),
+            Batch.payment_date,
+            (occurrences.c.occurrences > 1).label("is_duplicate"),
+            *columns,
+        )
+        .outerjoin(Batch, Batch.id == Invoice.batch_id)
+        .join(occurrences, occurrences.c.id == Invoice.id)
+        .filter(Invoice.cif == cif)
+    )
+
+
+def _provider_invoice_item(row) -> dict:
+    return {
+        "id": row.id,
+        "cif": row.cif,
+        "nombre": row.nombre,
+        "factura": row.factura,
+        "importe": row.importe or 0.0,
+        "fecha_vencimiento": row.fecha_vencimiento,
+        "status": row.status,
+        "batch_id": row.batch_id,
+        "batch_name": row.batch_name,
+        "payment_date": row.payment_date,
+        "duplicate_status": "HISTORICAL" if row.is_duplicate else None,
+        "duplicate_message": "Coincide con otra factura histórica del mismo proveedor" if row.is_duplicate else None,
+    }
+
+
 @router.get("/{cif}/invoices", response_model=List[ProviderInvoiceItem])
 def get_provider_invoices(cif: str, db: Session = Depends(get_db)):
-    invoices = db.query(Invoice).filter(Invoice.cif == cif).order_by(Invoice.id.desc()).all()
-    duplicate_counts = {}
-    for invoice in invoices:
-        key = build_duplicate_key(invoice)
-        duplicate_counts[key] = duplicate_counts.get(key, 0) + 1
-
-    response = []
-    for invoice in invoices:
-        key = build_duplicate_key(invoice)
-        is_duplicate = duplicate_counts.get(key, 0) > 1
-        response.append(
-            {
-                "id": invoice.id,
-                "cif": invoice.cif,
-                "nombre": invoice.nombre,
-                "factura": invoice.factura,
-                "importe": invoice.importe or 0.0,
-                "fecha_vencimiento": invoice.fecha_vencimiento,
-                "status": invoice.status,
-                "batch_id": invoice.batch_id,
-                "batch_name": invoice.batch.name if invoice.batch else None,
-                "payment_date": invoice.batch.payment_date if invoice.batch else None,
-                "duplicate_status": "HISTORICAL" if is_duplicate else None,
-                "duplicate_message": "Coincide con otra factura histórica del mismo proveedor" if is_duplicate else None,
-            }
-        )
-    return response
+    rows = provider_invoice_rows(db, cif).order_by(Invoice.id.desc()).all()
+    return [_provider_invoice_item(row) for row in rows]
+
+
+@router.get("/{cif}/invoices/page", response_model=PaginatedProviderInvoices)
+def list_provider_invoices(
+    cif: str,
+    limit: int = 50,
+    cursor: Optional[str] = None,
+    sort: Literal["id", "importe", "fecha_vencimiento"] = "id",
+    order: Literal["asc", "desc"] = "desc",
+    due_from: Optional[date] = None,
+    db: Session = Depends(get_db),
+):
+    limit = max(1, min(limit, 500))
+    sort_expression, sort_type = PROVIDER_INVOICE_SORTS[sort]
+    filters = [Invoice.cif == cif]
+    if due_from is not None:
+        filters.append(Invoice.fecha_vencimiento >= day_range(due_from, None)[0])
+    # El total no necesita la remesa ni la ventana de duplicados
+    total = db.query(func.count(Invoice.id)).filter(*filters).scalar() if not cursor else None
+    query = provider_invoice_rows(db, cif, sort_expression.label("sort_key")).filter(*filters[1:])
+
+    # Keyset sobre (clave de orden, id)
+    if cursor:
+        last_value, last_id = decode_cursor(cursor, sort_type, int)
+        if order == "asc":
+            query = query.filter(or_(sort_expression > last_value, and_(sort_expression == last_value, Invoice.id > last_id)))
+        else:
+            query = query.filter(or_(sort_expression < last_value, and_(sort_expression == last_value, Invoice.id < last_id)))
+
+    if order == "asc":
+        ordering = (sort_expression.asc(), Invoice.id.asc())
+    else:
+        ordering = (sort_expression.desc(), Invoice.id.desc())
+    rows = query.order_by(*ordering).limit(limit).all()
+
+    next_cursor = encode_cursor(rows[-1].sort_key, rows[-1].id) if len(rows) == limit else None
+    return {"items": [_provider_invoice_item(row) for row in rows], "total": total, "next_cursor": next_cursor}
@@ -1,13 +1,10 @@
 from fastapi import APIRouter, Depends, Query, Response, HTTPException
 from ..routers.auth_router import get_current_user
 from sqlalchemy.orm import Session
-from sqlalchemy import func
-from datetime import date, datetime, timedelta
-import calendar
+from datetime import datetime
 from ..database import get_db
-from ..models import Invoice, Batch
 from ..services.pdf_service import generate_monthly_report_pdf
-from ..services.duplicate_service import summarize_duplicate_groups
+from ..services.report_service import MONTH_NAMES, monthly_report_stats
 
 router = APIRouter(
     prefix="/reports", 
@@ -15,10 +12,6 @@ router = APIRouter(
     dependencies=[Depends(get_current_user)]
 )
 
-MONTH_NAMES = [
-    "", "Enero", "Febrero", "Marzo", "Abril", "Mayo", "Junio",
-    "Julio", "Agosto", "Septiembre", "Octubre", "Noviembre", "Diciembre"
-]
 
 @router.get("/monthly-pdf")
 def get_monthly_pdf(
@@ -26,69 +19,8 @@ def get_monthly_pdf(
     year: int = Query(...), 
     db: Session = Depends(get_db)
 ):
-    # Calculate Date Range
-    _, last_day = calendar.monthrange(year, month)
-    start_date = date(year, month, 1)
-    end_date = date(year, month, last_day)
-    
-    # Query Data (Invoices due in this month)
-    # We filter by 'VALID' status usually, but maybe show all? Let's show VALID/PAID.
-    # In Confirming context, maybe everything SENT + GENERATED? 
-    # Let's filter Invoice.fecha_vencimiento inside range.
-    
-    invoices_query = db.query(Invoice).filter(
-        Invoice.fecha_vencimiento >= start_date,
-        Invoice.fecha_vencimiento <= end_date
-    )
-    
-    invoices = invoices_query.all()
-    
-    # Aggregations
-    total_amount = sum(inv.importe for inv in invoices)
-    total_count = len(invoices)
-    active_providers = len(set(inv.cif for inv in invoices))
-    
-    # Top Providers
-    # Group by Provider Name (or CIF)
-    provider_map = {}
-    for inv in invoices:
-        key = inv.nombre # Group by Name for display
-        provider_map[key] = provider_map.get(key, 0) + inv.importe
-        
-    sorted_providers = sorted(provider_map.items(), key=lambda item: item[1], reverse=True)[:5]
-    top_providers_list = [{"name": name, "amount": amt} for name, amt in sorted_providers]
-    
-    # Weekly Breakdown
-    # Group by week number relative to year or month?
-    # Simple bucket: Week 1 (Day 1-7), Week 2 (8-14)...
-    weekly_breakdown = []
-    current_week_start = start_date
-    
-    while current_week_start <= end_date:
-        next_week_start = current_week_start + timedelta(days=7)
-        # End of this week chunk is min(next_week_start - 1, end_date)
-        chunk_end = min(next_week_start - timedelta(days=1), end_date)
-        
-        # Sum
-        week_total = sum(
-            inv.importe for inv in invoices 
-            if inv.fecha_vencimiento and current_week_start <= inv.fecha_vencimiento.date() <= chunk_end
-        )
-        
-        label = f"Semana {current_week_start.day}-{chunk_end.day}"
-        weekly_breakdown.append({"week": label, "amount": week_total})
-        
-        current_week_start = next_week_start
-
-    stats = {
-        "month": MONTH_NAMES[month],
-        "year": year,
-        "total_amount": total_amount,
-        "total_invoices": total_count,
-        "active_providers": active_providers,
-        "top_providers": top_providers_list,
-        "weekly_breakdown": weekly_breakdown
-    }
+    # KPIs, top 5 y semanas agregados en SQL sobre los rollups diarios
+    stats = monthly_report_stats(db, year, month)
     
     pdf_content = generate_monthly_report_pdf(stats)
     
@@ -100,93 +32,14 @@ def get_monthly_pdf(
         headers={"Content-Disposition": f"attachment; filename={filename}"}
     )
 
-from ..services.excel_export_service import generate_excel_from_df, generate_dashboard_excel
-from ..routers.batch_router import get_dashboard_stats, get_treasury_simulator
-# Creating a dedicated helper for params might be better. 
-# For now, let's replicate logic or import function if safe.
-# batch_router imports database, models... reports_router does too. 
-# It's better to move logic to a service if shared. 
-# But for speed, let's re-implement query logic or move `get_dashboard_stats` to a service.
-
-# Let's import get_dashboard_stats. 
-# batch_router.py -> (depends on models, db)
-# reports_router.py -> (depends on models, db)
-# Circular import? 
-# batch_router imports nothing from reports_router. So it should be fine.
+from ..services.excel_export_service import generate_excel_from_df, generate_excel_from_rows, generate_dashboard_excel
+from ..services.analytics_service import build_analytics_snapshot
 
 @router.get("/excel/dashboard")
 def export_dashboard_excel(db: Session = Depends(get_db)):
-    stats = get_dashboard_stats(db)
-    treasury = get_treasury_simulator(db=db)
-
-    top_providers = []
-    top_provider_rows = (
-        db.query(
-            Invoice.cif,
-            func.max(Invoice.nombre),
-            func.count(Invoice.id),
-            func.sum(Invoice.importe),
-            func.min(Invoice.fecha_vencimiento),
-            func.max(Invoice.fecha_vencimiento),
-        )
-        .group_by(Invoice.cif)
-        .order_by(func.sum(Invoice.importe).desc())
-        .limit(10)
-        .all()
-    )
-    for cif, name, invoice_count, total_amount, first_due_date, last_due_date in top_provider_rows:
-        top_providers.append(
-            {
-                "cif": cif,
-                "name": name or cif,
-                "invoice_count": invoice_count or 0,
-                "total_amount": float(total_amount or 0.0),
-                "first_due_date": first_due_date.strftime("%d/%m/%Y") if first_due_date else "-",
-                "last_due_date": last_due_date.strftime("%d/%m/%Y") if last_due_date else "-",
-            }
-        )
-
-    recent_batches = []
-    recent_batch_rows = (
-        db.query(
-            Batch.id,
-            Batch.name,
-            Batch.status,
-            Batch.created_at,
-            Batch.payment_date,
-            func.count(Invoice.id),
-            func.sum(Invoice.importe),
-        )
-        .outerjoin(Invoice, Invoice.batch_id == Batch.id)
-        .group_by(Batch.id)
-        .order_by(Batch.created_at.desc())
-        .limit(10)
-        .all()
-    )
-    for batch_id, name, status, created_at, payment_date, invoice_count, total_amount in recent_batch_rows:
-        recent_batches.append(
-            {
-                "id": batch_id,
-                "name": name,
-                "status": status.value if hasattr(status, "value") else str(status),
-                "created_at": created_at.strftime("%d/%m/%Y") if created_at else "-",
-                "payment_date": payment_date.strftime("%d/%m/%Y") if payment_date else "-",
-                "invoice_count": invoice_count or 0,
-                "total_amount": float(total_amount or 0.0),
-            }
-        )
-
-    duplicate_groups = summarize_duplicate_groups(db.query(Invoice).all())
-
-    excel_content = generate_dashboard_excel(
-        {
-            "stats": stats,
-            "treasury": treasury,
-            "top_providers": top_providers,
-            "recent_batches": recent_batches,
-            "duplicate_groups": duplicate_groups,
-        }
-    )
+    # Un único snapshot (estadísticas, tesorería, proveedores, lotes y
+    # duplicados) alimenta todas las hojas del libro
+    excel_content = generate_dashboard_excel(build_analytics_snapshot(db))
     
     filename = f"Dashboard_Confirming_{datetime.now().strftime('%Y%m%d')}.xlsx"
     
@@ -196,30 +49,43 @@ def export_dashboard_excel(db: Session = Depends(get_db)):
         headers={"Content-Disposition": f"attachment; filename={filename}"}
     )
 
+def _provider_exists(db: Session, cif: str) -> bool:
+    from ..models import Invoice, Provider
+
+    return bool(
+        db.query(Provider.cif).filter(Provider.cif == cif).first()
+        or db.query(Invoice.id).filter(Invoice.cif == cif).first()
+    )
+
+
 @router.get("/excel/provider/{cif}")
 def export_provider_excel(cif: str, db: Session = Depends(get_db)):
-    from ..routers.providers_router import get_provider_stats, get_provider_invoices
-    import pandas as pd
-    
-    # Get Data
-    stats = get_provider_stats(cif, db)
-    invoices = get_provider_invoices(cif, db)
-    
-    # Convert Invoices to DataFrame
-    data = []
-    for inv in invoices:
-        data.append({
-            "Nº Factura": inv.factura,
-            "Importe (€)": inv.importe,
-            "Vencimiento": inv.fecha_vencimiento.strftime("%d/%m/%Y"),
-            "Remesa": f"#{inv.batch_id}" if inv.batch_id else "-",
-            "Estado": inv.status
-        })
-        
-    df = pd.DataFrame(data)
-    
-    # Generate
-    excel_content = generate_excel_from_df(df, sheet_name=f"Facturas {cif}")
+    from ..models import Invoice
+    from ..routers.providers_router import provider_invoice_rows
+
+    if not _provider_exists(db, cif):
+        raise HTTPException(status_code=404, detail="Proveedor no encontrado")
+
+    # Filas ligeras (remesa por JOIN) leídas por bloques y escritas en streaming
+    rows = (
+        provider_invoice_rows(db, cif)
+        .order_by(Invoice.id.desc())
+        .yield_per(1000)
+    )
+    excel_content = generate_excel_from_rows(
+        ["Nº Factura", "Importe (€)", "Vencimiento", "Remesa", "Estado"],
+        (
+            [
+                row.factura,
+                row.importe,
+                row.fecha_vencimiento.strftime("%d/%m/%Y") if row.fecha_vencimiento else "-",
+                f"#{row.batch_id}" if row.batch_id else "-",
+                row.status.value if hasattr(row.status, "value") else row.status,
+            ]
+            for row in rows
+        ),
+        sheet_name=f"Facturas {cif}",
+    )
     
     filename = f"Informe_Proveedor_{cif}.xlsx"
     
@@ -229,12 +95,6 @@ def export_provider_excel(cif: str, db: Session = Depends(get_db)):
         headers={"Content-Disposition": f"attachment; filename={filename}"}
     )
 
-    return Response(
-        content=excel_content,
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        headers={"Content-Disposition": f"attachment; filename={filename}"}
-    )
-
 @router.get("/excel/batch/{id}")
 def export_batch_excel(id: int, db: Session = Depends(get_db)):
     from ..models import Batch
@@ -266,3 +126,120 @@ def export_batch_excel(id: int, db: Session = Depends(get_db)):
         media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
         headers={"Content-Disposition": f"attachment; filename={filename}"}
     )
+
+
+# --- Informes en segundo plano -------------------------------------------------
+# POST /reports/jobs encola el informe; se consulta con GET /reports/jobs/{id}
+# (o se sigue con /events, Server-Sent Events) y se descarga con /download.
+
+import asyncio
+import json
+import os
+from fastapi.responses import FileResponse, StreamingResponse
+from ..schemas import ReportJobCreate
+from ..services.report_service import report_data_version
+from ..services.report_jobs import (
+    DONE,
+    PENDING,
+    ArtifactStore,
+    ReportJobManager,
+    ReportQueueFull,
+    default_artifact_dir,
+    job_status_payload,
+)
+
+REPORT_RENDERERS = {
+    "monthly_pdf": lambda db, params: get_monthly_pdf(params["month"], params["year"], db),
+    "dashboard_excel": lambda db, params: export_dashboard_excel(db),
+    "provider_excel": lambda db, params: export_provider_excel(params["cif"], db),
+    "batch_excel": lambda db, params: export_batch_excel(params["batch_id"], db),
+}
+
+
+def render_report(kind: str, params: dict) -> tuple[bytes, str, str]:
+    """Se ejecuta en el pool de procesos con su propia sesión de BD."""
+    from ..database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        response = REPORT_RENDERERS[kind](db, params)
+    except HTTPException as e:
+        # HTTPException no se puede devolver entre procesos: se envía sólo el mensaje
+        raise RuntimeError(str(e.detail)) from None
+    finally:
+        db.close()
+    filename = response.headers["content-disposition"].split("filename=", 1)[1]
+    return response.body, filename, response.media_type
+
+
+# Tiempo máximo que /events mantiene abierto el stream esperando a un trabajo
+REPORT_STREAM_TIMEOUT = float(os.getenv("REPORT_STREAM_TIMEOUT", "300"))
+
+report_jobs = ReportJobManager(
+    render_report,
+    ArtifactStore(default_artifact_dir(), ttl_seconds=float(os.getenv("REPORT_ARTIFACT_TTL", "3600"))),
+    max_workers=int(os.getenv("REPORT_WORKERS", "2")),
+)
+
+
+def _get_job(job_id: str):
+    job = report_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Trabajo no encontrado")
+    return job
+
+
+def _check_report_target(db: Session, kind: str, params: dict) -> None:
+    """404 antes de encolar si la remesa o el proveedor no existen (como los endpoints síncronos)."""
+    from ..models import Batch
+
+    if kind == "batch_excel" and not db.query(Batch.id).filter(Batch.id == params["batch_id"]).first():
+        raise HTTPException(status_code=404, detail="Batch not found")
+    if kind == "provider_excel" and not _provider_exists(db, params["cif"]):
+        raise HTTPException(status_code=404, detail="Proveedor no encontrado")
+
+
+@router.post("/jobs", status_code=202)
+def submit_report_job(payload: ReportJobCreate, db: Session = Depends(get_db)):
+    params = payload.report_params()
+    _check_report_target(db, payload.kind, params)
+    try:
+        job = report_jobs.submit(payload.kind, params, report_data_version(db, payload.kind, params))
+    except ReportQueueFull:
+        raise HTTPException(status_code=429, detail="Demasiados informes en cola, inténtalo más tarde")
+    return job_status_payload(job)
+
+
+@router.get("/jobs/{job_id}")
+def get_report_job(job_id: str):
+    return job_status_payload(_get_job(job_id))
+
+
+@router.get("/jobs/{job_id}/events")
+async def stream_report_job(job_id: str):
+    job = _get_job(job_id)
+
+    async def events():
+        # Un evento al suscribirse y otro al terminar (o un evento timeout si
+        # el trabajo no acaba en REPORT_STREAM_TIMEOUT segundos)
+        yield f"data: {json.dumps(job_status_payload(job))}\n\n"
+        finished = await asyncio.to_thread(report_jobs.wait, job, REPORT_STREAM_TIMEOUT)
+        if not finished:
+            yield f"event: timeout\ndata: {json.dumps(job_status_payload(job))}\n\n"
+            return
+        yield f"data: {json.dumps(job_status_payload(job))}\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+
+@router.get("/jobs/{job_id}/download")
+def download_report_job(job_id: str):
+    job = _get_job(job_id)
+    if job.status == PENDING:
+        raise HTTPException(status_code=409, detail="El informe todavía se está generando")
+    if job.status != DONE:
+        raise HTTPException(status_code=409, detail=f"El informe falló: {job.error}")
+    artifact = report_jobs.artifact(job)
+    if artifact is None:
+        raise HTTPException(status_code=410, detail="El informe ha caducado, vuelve a solicitarlo")
+    return FileResponse(artifact.path, media_type=artifact.media_type, filename=artifact.filename)
@@ -41,14 +41,11 @@ def global_search(q: str = Query(..., min_length=2), db: Session = Depends(get_d
 
     batches = batches_query.limit(limit).all()
     for b in batches:
-        # Calculate total (Batch model doesn't have total_amount column)
-        total_amount = sum(inv.importe for inv in b.invoices) if b.invoices else 0.0
-        
         results.append({
             "type": "batch",
             "id": str(b.id),
             "title": f"Remesa #{b.id}: {b.name}",
-            "subtitle": f"{total_amount:,.2f}€ • {b.created_at.strftime('%d/%m/%Y')}",
+            "subtitle": f"{b.total_amount or 0.0:,.2f}€ • {b.created_at.strftime('%d/%m/%Y')}",
             "url": f"/history?batchId={b.id}"
         })
 
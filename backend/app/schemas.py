@@ -1,5 +1,5 @@
-from pydantic import BaseModel, EmailStr, field_validator
-from typing import Optional, List
+from pydantic import BaseModel, EmailStr, Field, field_validator, model_validator
+from typing import Literal, Optional, List
 from datetime import datetime
 from enum import Enum
 
@@ -49,6 +49,8 @@ class Batch(BatchBase):
     status: str
     uploaded_to_bank: bool = False
     total_amount: Optional[float] = 0.0
+    invoice_count: int = 0
+    issues_count: int = 0
     invoices: List[Invoice] = []
 
     class Config:
@@ -95,9 +97,77 @@ class Provider(ProviderBase):
     class Config:
         from_attributes = True
 
-class PaginatedBatches(BaseModel):
-    items: List[Batch]
+class BatchSummary(BatchBase):
+    id: int
+    created_at: datetime
+    payment_date: Optional[datetime] = None
+    status: str
+    uploaded_to_bank: bool = False
+    total_amount: float = 0.0
+    invoice_count: int = 0
+    issues_count: int = 0
+
+    class Config:
+        from_attributes = True
+
+class BatchInvoice(Invoice):
+    is_duplicate: bool = False
+
+class PaginatedBatchInvoices(BaseModel):
+    items: List[BatchInvoice]
     total: int
+    next_cursor: Optional[str] = None
+
+class PaginatedBatches(BaseModel):
+    items: List[BatchSummary]
+    total: Optional[int] = None
+    next_cursor: Optional[str] = None
+
+# Treasury what-if Schemas
+class WhatIfSessionCreate(BaseModel):
+    opening_balance: float = 150000
+    reserve_balance: float = 30000
+    horizon_weeks: int = 8
+
+class WhatIfMove(BaseModel):
+    # Una factura concreta (invoice_id) o todo un proveedor en una semana (cif + from_week)
+    invoice_id: Optional[int] = None
+    cif: Optional[str] = None
+    from_week: Optional[int] = None
+    to_week: int
+
+    @model_validator(mode="after")
+    def check_target(self):
+        if (self.invoice_id is None) == (self.from_week is None):
+            raise ValueError("Indica invoice_id o bien cif y from_week")
+        return self
+
+# Report job Schemas
+# Parámetros obligatorios de cada tipo de informe
+REPORT_JOB_PARAMS = {
+    "monthly_pdf": ("month", "year"),
+    "dashboard_excel": (),
+    "provider_excel": ("cif",),
+    "batch_excel": ("batch_id",),
+}
+
+class ReportJobCreate(BaseModel):
+    kind: Literal["monthly_pdf", "dashboard_excel", "provider_excel", "batch_excel"]
+    month: Optional[int] = Field(default=None, ge=1, le=12)
+    year: Optional[int] = None
+    cif: Optional[str] = None
+    batch_id: Optional[int] = None
+
+    @model_validator(mode="after")
+    def check_params(self):
+        missing = [name for name in REPORT_JOB_PARAMS[self.kind] if getattr(self, name) is None]
+        if missing:
+            raise ValueError(f"Faltan parámetros para {self.kind}: {', '.join(missing)}")
+        return self
+
+    def report_params(self) -> dict:
+        """Sólo los parámetros que usa el tipo de informe (forman parte de la clave de deduplicación)."""
+        return {name: getattr(self, name) for name in REPORT_JOB_PARAMS[self.kind]}
 
 # Authentication Schemas
 class Token(BaseModel):
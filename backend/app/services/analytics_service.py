@@ -0,0 +1,184 @@
+"""
+Snapshot analítico compartido por el dashboard (JSON) y su exportación Excel.
+
+Cada bloque se calcula una sola vez por petición y casi todo sale de
+agregados (lotes, rollups diarios y provider_summary). La única consulta que
+recorre invoices es la de duplicados: las repeticiones de cada clave se
+cuentan en SQL y sólo se traen las facturas de los grupos repetidos. El nº
+de facturas duplicadas del resumen se deriva de esos grupos en lugar de
+repetir el recorrido.
+"""
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from ..models import Batch, Invoice, ProviderSummary
+from ..utils.sql_dates import month_key, shift_months
+from .duplicate_service import (
+    duplicate_invoices_count_subquery,
+    duplicate_occurrences_subquery,
+    summarize_duplicate_groups,
+)
+from .rollup_service import daily_due_totals
+from .treasury_service import treasury_projection
+
+
+def build_dashboard_stats(db: Session, today: date, duplicate_invoices_count: int | None = None) -> dict:
+    """KPIs, volumen mensual y previsión a 4 semanas del dashboard."""
+    week_starts = [today + timedelta(days=i * 7) for i in range(4)]
+
+    # 1. KPIs desde los agregados de cada lote; sólo los duplicados necesitan
+    #    recorrer invoices (y no hace falta si el llamante ya los tiene)
+    kpi_columns = [
+        func.count(Batch.id),
+        func.coalesce(func.sum(Batch.total_amount), 0.0),
+        func.coalesce(func.sum(Batch.invoice_count), 0),
+        func.coalesce(func.sum(Batch.issues_count), 0),
+    ]
+    if duplicate_invoices_count is None:
+        total_batches, total_amount, invoice_count, issues_count, duplicate_invoices_count = db.query(
+            *kpi_columns, duplicate_invoices_count_subquery()
+        ).one()
+    else:
+        total_batches, total_amount, invoice_count, issues_count = db.query(*kpi_columns).one()
+    valid_count = invoice_count - issues_count
+
+    status_distribution = [
+        {"name": "Válidas", "value": valid_count, "color": "#22c55e"}, # green-500
+        {"name": "Incidencias", "value": issues_count, "color": "#f97316"}, # orange-500
+    ]
+
+    # 2. Volumen por mes natural (últimos 6 meses) agrupado en SQL sobre los
+    #    totales ya agregados de cada lote
+    first_month = shift_months(today, -5)
+    month = month_key(db, Batch.created_at)
+    monthly_rows = dict(
+        db.query(month, func.sum(Batch.total_amount))
+        .filter(Batch.created_at >= datetime.combine(first_month, datetime.min.time()))
+        .group_by(month)
+        .all()
+    )
+
+    monthly_volume = []
+    for offset in range(6):
+        month_start = shift_months(first_month, offset)
+        key = month_start.strftime("%Y-%m")
+        monthly_volume.append(
+            {"name": month_start.strftime("%b"), "full_date": key, "amount": float(monthly_rows.get(key) or 0.0)}
+        )
+
+    # 3. Cash Flow Projection (Next 4 Weeks) desde el rollup diario de vencimientos
+    daily_totals = daily_due_totals(db, week_starts[0], week_starts[-1] + timedelta(days=6))
+    cash_flow = []
+    for i, start_range in enumerate(week_starts):
+        end_range = start_range + timedelta(days=6)
+        week_total = sum(amount for due_date, _count, amount in daily_totals if start_range <= due_date <= end_range)
+        label = f"{start_range.strftime('%d %b')} - {end_range.strftime('%d %b')}"
+        cash_flow.append({
+            "name": f"Semana {i+1}",
+            "range": label,
+            "amount": float(week_total or 0.0),
+            "full_date": start_range.strftime("%Y-%m-%d") # for sorting if needed
+        })
+
+    return {
+        "processed_batches": total_batches,
+        "total_amount": float(total_amount or 0.0),
+        "issues_count": issues_count,
+        "duplicate_invoices_count": int(duplicate_invoices_count or 0),
+        "status_distribution": status_distribution,
+        "monthly_volume": monthly_volume,
+        "cash_flow_projection": cash_flow
+    }
+
+
+def load_duplicate_groups(db: Session, *filters) -> list[dict]:
+    """
+    Grupos de facturas duplicadas (opcionalmente restringidos por `filters`).
+    Las repeticiones de cada clave se cuentan en SQL con una ventana y sólo
+    las facturas de claves repetidas llegan a Python.
+    """
+    occurrences = duplicate_occurrences_subquery(*filters)
+    members = (
+        db.query(Invoice.id, Invoice.batch_id, Invoice.cif, Invoice.factura, Invoice.importe, Invoice.fecha_vencimiento)
+        .join(occurrences, occurrences.c.id == Invoice.id)
+        .filter(occurrences.c.occurrences > 1)
+        .all()
+    )
+    return summarize_duplicate_groups(members)
+
+
+def load_top_providers(db: Session, limit: int = 10) -> list[dict]:
+    """Ranking por importe leído directamente de provider_summary (índice por total_amount)."""
+    rows = (
+        db.query(
+            ProviderSummary.cif,
+            ProviderSummary.name,
+            ProviderSummary.invoice_count,
+            ProviderSummary.total_amount,
+            ProviderSummary.first_due_date,
+            ProviderSummary.last_due_date,
+        )
+        .order_by(ProviderSummary.total_amount.desc(), ProviderSummary.cif)
+        .limit(limit)
+        .all()
+    )
+    return [
+        {
+            "cif": cif,
+            "name": name or cif,
+            "invoice_count": invoice_count or 0,
+            "total_amount": float(total_amount or 0.0),
+            "first_due_date": first_due_date.strftime("%d/%m/%Y") if first_due_date else "-",
+            "last_due_date": last_due_date.strftime("%d/%m/%Y") if last_due_date else "-",
+        }
+        for cif, name, invoice_count, total_amount, first_due_date, last_due_date in rows
+    ]
+
+
+def load_recent_batches(db: Session, limit: int = 10) -> list[dict]:
+    rows = (
+        db.query(
+            Batch.id,
+            Batch.name,
+            Batch.status,
+            Batch.created_at,
+            Batch.payment_date,
+            Batch.invoice_count,
+            Batch.total_amount,
+        )
+        .order_by(Batch.created_at.desc())
+        .limit(limit)
+        .all()
+    )
+    return [
+        {
+            "id": batch_id,
+            "name": name,
+            "status": status.value if hasattr(status, "value") else str(status),
+            "created_at": created_at.strftime("%d/%m/%Y") if created_at else "-",
+            "payment_date": payment_date.strftime("%d/%m/%Y") if payment_date else "-",
+            "invoice_count": invoice_count or 0,
+            "total_amount": float(total_amount or 0.0),
+        }
+        for batch_id, name, status, created_at, payment_date, invoice_count, total_amount in rows
+    ]
+
+
+def build_analytics_snapshot(db: Session, today: date | None = None) -> dict:
+    """
+    Todos los bloques del dashboard exportable: estadísticas, escenario base
+    de tesorería, top proveedores, lotes recientes y grupos duplicados.
+    """
+    today = today or date.today()
+    duplicate_groups = load_duplicate_groups(db)
+    duplicate_invoices_count = sum(group["occurrences"] for group in duplicate_groups)
+    return {
+        "stats": build_dashboard_stats(db, today, duplicate_invoices_count),
+        # Mismos valores por defecto que GET /batches/treasury-simulator
+        "treasury": treasury_projection(db, today, 150000, 30000, 8, 0, 12.5),
+        "top_providers": load_top_providers(db),
+        "recent_batches": load_recent_batches(db),
+        "duplicate_groups": duplicate_groups,
+    }
@@ -0,0 +1,147 @@
+from datetime import datetime
+from typing import Any, Iterable
+
+from sqlalchemy import case, delete, func, insert, or_
+from sqlalchemy.orm import Session
+
+from ..models import Batch, Invoice, InvoiceStatus, batch_aggregates_statement
+from .provider_service import normalize_cif
+from .provider_summary_service import batch_provider_cifs, refresh_provider_summaries
+from .rollup_service import remove_batch_from_rollups
+
+# Campos del payload que no se persisten en la tabla invoices
+NON_PERSISTED_FIELDS = ("phone", "duplicate_status", "duplicate_message", "duplicate_count", "status")
+
+
+def build_batch_rows(invoices: Iterable[Any], global_due_date: datetime | None = None) -> tuple[list[dict], list[dict]]:
+    """
+    Recorre el payload una sola vez y devuelve:
+    - las filas listas para insertar en invoices (sin batch_id)
+    - los datos de proveedores para el UPSERT por CIF
+    """
+    invoice_rows = []
+    providers_data = []
+    for inv_data in invoices:
+        data = inv_data.model_dump() if hasattr(inv_data, "model_dump") else dict(inv_data)
+        provider_phone = data.get("phone")
+        invoice_status = data.get("status") or InvoiceStatus.VALID.value
+        for field in NON_PERSISTED_FIELDS:
+            data.pop(field, None)
+
+        if data.get("cif"):
+            data["cif"] = normalize_cif(data["cif"])
+            providers_data.append({
+                "cif": data["cif"],
+                "name": data.get("nombre"),
+                "email": data.get("email"),
+                "address": data.get("direccion"),
+                "city": data.get("poblacion"),
+                "zip_code": data.get("cp"),
+                "country": data.get("pais"),
+                "phone": provider_phone,
+                "iban": data.get("cuenta"),
+            })
+
+        if global_due_date:
+            data["fecha_vencimiento"] = global_due_date
+
+        data["status"] = InvoiceStatus(invoice_status)
+        data.setdefault("validation_message", None)
+        invoice_rows.append(data)
+
+    return invoice_rows, providers_data
+
+
+def bulk_insert_invoices(db: Session, batch_id: int, invoice_rows: list[dict]) -> list[int]:
+    """
+    Inserta las facturas de un lote con un único INSERT ejecutado en modo
+    executemany (insertmanyvalues en SQLite/PostgreSQL), sin instanciar objetos ORM.
+    Devuelve los ids generados en el mismo orden que invoice_rows.
+    """
+    if not invoice_rows:
+        return []
+
+    for row in invoice_rows:
+        row["batch_id"] = batch_id
+
+    stmt = insert(Invoice).returning(Invoice.id, sort_by_parameter_order=True)
+    return list(db.scalars(stmt, invoice_rows))
+
+
+def delete_batch_with_invoices(db: Session, batch_id: int) -> bool:
+    """
+    Borra un lote con una única sentencia; sus facturas caen por el
+    ON DELETE CASCADE de invoices.batch_id. En la misma transacción descuenta
+    su aportación de los rollups diarios y recalcula el resumen de sus
+    proveedores. Devuelve False si no existía.
+    """
+    remove_batch_from_rollups(db, batch_id)
+    cifs = batch_provider_cifs(db, batch_id)
+    result = db.execute(
+        delete(Batch).where(Batch.id == batch_id).execution_options(synchronize_session=False)
+    )
+    refresh_provider_summaries(db, cifs)
+    return result.rowcount > 0
+
+
+def aggregate_invoice_rows(invoice_rows: list[dict]) -> dict:
+    """Agregados de lote (nº de facturas, importe, incidencias) calculados en memoria."""
+    return {
+        "invoice_count": len(invoice_rows),
+        "total_amount": float(sum(row.get("importe") or 0.0 for row in invoice_rows)),
+        "issues_count": sum(1 for row in invoice_rows if InvoiceStatus(row["status"]) != InvoiceStatus.VALID),
+    }
+
+
+def rebuild_batch_aggregates(db: Session, batch_ids: Iterable[int] | None = None) -> None:
+    """Recalcula desde invoices los agregados de los lotes indicados (o de todos)."""
+    db.execute(batch_aggregates_statement(batch_ids))
+
+
+def find_inconsistent_batches(db: Session, tolerance: float = 0.005) -> list[dict]:
+    """
+    Compara los agregados almacenados en batches con los calculados desde invoices.
+    Devuelve una entrada por lote desalineado.
+    """
+    actual = (
+        db.query(
+            Invoice.batch_id.label("batch_id"),
+            func.count(Invoice.id).label("invoice_count"),
+            func.coalesce(func.sum(Invoice.importe), 0.0).label("total_amount"),
+            func.sum(case((Invoice.status != InvoiceStatus.VALID, 1), else_=0)).label("issues_count"),
+        )
+        .group_by(Invoice.batch_id)
+        .subquery()
+    )
+    actual_count = func.coalesce(actual.c.invoice_count, 0)
+    actual_total = func.coalesce(actual.c.total_amount, 0.0)
+    actual_issues = func.coalesce(actual.c.issues_count, 0)
+    rows = (
+        db.query(
+            Batch.id,
+            Batch.invoice_count,
+            Batch.total_amount,
+            Batch.issues_count,
+            actual_count,
+            actual_total,
+            actual_issues,
+        )
+        .outerjoin(actual, actual.c.batch_id == Batch.id)
+        .filter(
+            or_(
+                Batch.invoice_count != actual_count,
+                Batch.issues_count != actual_issues,
+                func.abs(Batch.total_amount - actual_total) > tolerance,
+            )
+        )
+        .order_by(Batch.id)
+        .all()
+    )
+    return [
+        {
+            "batch_id": batch_id,
+            "stored": {"invoice_count": stored_count, "total_amount": stored_total, "issues_count": stored_issues},
+            "actual": {"invoice_count": count, "total_amount": float(total), "issues_count": issues},
+        }
+        for batch_id, stored_count, stored_total, stored_issues, count, total, issues in rows
+    ]
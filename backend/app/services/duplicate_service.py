@@ -2,7 +2,8 @@ from collections import defaultdict
 from datetime import date, datetime
 from typing import Any, Iterable
 
-from sqlalchemy.orm import Session
+from sqlalchemy import Numeric, String, cast, exists, func, select
+from sqlalchemy.orm import Session, aliased
 
 from ..models import Invoice
 
@@ -47,6 +48,60 @@ def build_duplicate_key(item: Any) -> tuple[str, str, float, str]:
     )
 
 
+def duplicate_key_columns(model: Any = Invoice) -> tuple:
+    """Equivalente SQL de build_duplicate_key (cif, factura, importe, vencimiento normalizados)."""
+    return (
+        func.coalesce(func.upper(func.trim(model.cif)), ""),
+        func.coalesce(func.replace(func.upper(func.trim(model.factura)), " ", ""), ""),
+        func.round(cast(func.coalesce(model.importe, 0), Numeric), 2),
+        func.coalesce(cast(func.date(model.fecha_vencimiento), String), ""),
+    )
+
+
+def has_duplicate_clause(model: Any = Invoice):
+    """
+    EXISTS que indica si otra factura almacenada comparte la clave de duplicado.
+    Compara el CIF tal cual (se guarda normalizado) para aprovechar su índice.
+    """
+    other = aliased(Invoice)
+    own_key = duplicate_key_columns(model)
+    other_key = duplicate_key_columns(other)
+    return exists().where(
+        other.id != model.id,
+        other.cif == model.cif,
+        *(other_part == own_part for other_part, own_part in zip(other_key[1:], own_key[1:])),
+    )
+
+
+def duplicate_invoices_count_subquery(*filters):
+    """
+    Subconsulta escalar con el nº de facturas que pertenecen a algún grupo
+    duplicado (equivale a sumar 'occurrences' de summarize_duplicate_groups).
+    """
+    groups = (
+        select(func.count(Invoice.id).label("occurrences"))
+        .where(*filters)
+        .group_by(*duplicate_key_columns())
+        .having(func.count(Invoice.id) > 1)
+        .subquery()
+    )
+    return select(func.coalesce(func.sum(groups.c.occurrences), 0)).scalar_subquery()
+
+
+def duplicate_occurrences(model: Any = Invoice):
+    """
+    Nº de facturas que comparten la clave de duplicado de cada fila
+    (COUNT(*) OVER (PARTITION BY clave)): una sola pasada ordenada, sin
+    autojoin por expresiones que el planner no puede indexar.
+    """
+    return func.count(model.id).over(partition_by=duplicate_key_columns(model))
+
+
+def duplicate_occurrences_subquery(*filters):
+    """Subconsulta (id, occurrences) de las facturas que cumplen `filters`."""
+    return select(Invoice.id, duplicate_occurrences().label("occurrences")).where(*filters).subquery()
+
+
 def summarize_duplicate_groups(items: Iterable[Any]) -> list[dict[str, Any]]:
     grouped: dict[tuple[str, str, float, str], list[Any]] = defaultdict(list)
     for item in items:
@@ -1,5 +1,6 @@
 import io
 from datetime import datetime
+from typing import Iterable
 
 import pandas as pd
 from openpyxl import Workbook
@@ -68,6 +69,29 @@ def generate_excel_from_df(df: pd.DataFrame, sheet_name: str = "Sheet1") -> byte
     return buffer.read()
 
 
+def generate_excel_from_rows(headers: list[str], rows: Iterable[list], sheet_name: str = "Sheet1") -> bytes:
+    """
+    Variante en streaming de generate_excel_from_df (libro write-only): las
+    filas se escriben según llegan, así que `rows` puede venir de una query
+    con yield_per. El ancho de columna sale de la cabecera (no se recorren
+    los datos dos veces). Las celdas usan el estilo por defecto del libro
+    (Calibri 11, sin bordes), así que se añaden como listas de valores.
+    """
+    workbook = Workbook(write_only=True)
+    ws = workbook.create_sheet(sheet_name)
+    ws.sheet_view.showGridLines = False
+    for index, header in enumerate(headers, start=1):
+        ws.column_dimensions[get_column_letter(index)].width = min(max(len(header) + 2, 14), 32)
+
+    ws.append(headers)
+    for row in rows:
+        ws.append(row)
+
+    buffer = io.BytesIO()
+    workbook.save(buffer)
+    return buffer.getvalue()
+
+
 def _set_cell(cell, value, *, font=BODY_FONT, fill=None, alignment=None, border=THIN_BORDER, number_format=None):
     cell.value = value
     cell.font = font
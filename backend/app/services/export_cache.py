@@ -0,0 +1,153 @@
+"""
+Caché de ficheros de confirming generados y archivado en segundo plano.
+
+Un export se identifica por (id de lote, versión de contenido). La versión
+resume todo lo que cambia el fichero: las facturas de un lote sólo se crean
+con él y se borran con él, así que basta con sus agregados y la fecha de
+creación, más la cuenta de cargo de Settings. Repetir la descarga sirve los
+bytes cacheados y la copia a export_path la hace un hilo aparte escribiendo
+un temporal en la carpeta destino y renombrándolo (os.replace es atómico),
+de modo que la latencia de la descarga no depende de la unidad de red.
+"""
+import hashlib
+import logging
+import os
+import queue
+import tempfile
+import threading
+import traceback
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime
+
+from ..utils.log_files import append_log_line
+
+logger = logging.getLogger(__name__)
+
+
+def export_content_version(batch, payer_iban: str | None) -> str:
+    """Huella del contenido del fichero de un lote."""
+    parts = (
+        batch.created_at.isoformat() if batch.created_at else "",
+        str(batch.invoice_count or 0),
+        repr(round(float(batch.total_amount or 0.0), 2)),
+        payer_iban or "",
+    )
+    return hashlib.sha256("|".join(parts).encode("utf-8")).hexdigest()[:16]
+
+
+@dataclass
+class ExportArtifact:
+    batch_id: int
+    version: str
+    content: bytes
+    # Rutas a las que ya se ha archivado esta versión
+    archived_paths: set[str] = field(default_factory=set)
+
+
+class ExportCache:
+    """LRU en memoria limitada por número de entradas y por bytes totales."""
+
+    def __init__(self, max_entries: int = 32, max_bytes: int = 64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[tuple[int, str], ExportArtifact] = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, batch_id: int, version: str) -> ExportArtifact | None:
+        with self._lock:
+            artifact = self._entries.get((batch_id, version))
+            if artifact is not None:
+                self._entries.move_to_end((batch_id, version))
+            return artifact
+
+    def put(self, batch_id: int, version: str, content: bytes) -> ExportArtifact:
+        artifact = ExportArtifact(batch_id, version, content)
+        with self._lock:
+            # Una versión nueva deja obsoletas las anteriores del mismo lote
+            self._discard(batch_id)
+            if len(content) > self.max_bytes:
+                return artifact
+            self._entries[(batch_id, version)] = artifact
+            self._size += len(content)
+            while len(self._entries) > self.max_entries or self._size > self.max_bytes:
+                _key, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted.content)
+        return artifact
+
+    def invalidate(self, batch_id: int):
+        with self._lock:
+            self._discard(batch_id)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def _discard(self, batch_id: int):
+        for key in [key for key in self._entries if key[0] == batch_id]:
+            self._size -= len(self._entries.pop(key).content)
+
+
+def write_atomic(target_dir: str, filename: str, content: bytes) -> str:
+    """Escribe en un temporal de la carpeta destino y lo renombra al nombre final."""
+    os.makedirs(target_dir, exist_ok=True)
+    full_path = os.path.join(target_dir, filename)
+    fd, tmp_path = tempfile.mkstemp(dir=target_dir, prefix=f".{filename}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as handle:
+            handle.write(content)
+            handle.flush()
+            os.fsync(handle.fileno())
+        os.replace(tmp_path, full_path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+    return full_path
+
+
+class ExportArchiver:
+    """Hilo único que copia los exports a export_path en orden de llegada."""
+
+    def __init__(self):
+        self._queue: queue.Queue = queue.Queue()
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+
+    def submit(self, artifact: ExportArtifact, target_dir: str, filename: str):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="export-archiver", daemon=True)
+                self._thread.start()
+        self._queue.put((artifact, target_dir, filename))
+
+    def wait(self):
+        """Bloquea hasta que se han procesado todos los archivados pendientes."""
+        self._queue.join()
+
+    def _run(self):
+        while True:
+            artifact, target_dir, filename = self._queue.get()
+            try:
+                self._archive(artifact, target_dir, filename)
+            finally:
+                self._queue.task_done()
+
+    def _archive(self, artifact: ExportArtifact, target_dir: str, filename: str):
+        try:
+            full_path = write_atomic(target_dir, filename, artifact.content)
+            artifact.archived_paths.add(full_path)
+            append_log_line(
+                "debug_export.log",
+                f"{datetime.now()} batch {artifact.batch_id} v{artifact.version}: archived to '{full_path}'\n",
+            )
+        except Exception as e:
+            logger.warning("Could not archive export of batch %s", artifact.batch_id, exc_info=True)
+            append_log_line(
+                "export_error.log",
+                f"\n[ERROR SAVING LOCAL] batch {artifact.batch_id} -> '{target_dir}': {str(e)}\n{traceback.format_exc()}\n",
+            )
@@ -1,69 +1,88 @@
-from typing import List
-import pandas as pd
+from typing import Iterable
 import io
-from openpyxl.styles import Border, Font, Side
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Alignment, Border, Font, NamedStyle, Side
 from ..schemas import Invoice
 from sqlalchemy.orm import Session
 from ..models import Settings
 
-def generate_bankinter_excel(invoices: List[Invoice], db: Session) -> bytes:
+# Columnas del fichero de confirming de Bankinter (None = columna sin cabecera)
+BANKINTER_COLUMNS = [
+    "CIF", "NOMBRE", "EMAIL", "DIRECCION", "CP", "POBLACION", "PAIS",
+    "CUENTA", "IMPORTE", "FACTURA", "FECHA DE VENCIMIENTO", "FECHA DE APLAZAMIENTO",
+    None, None, "CUENTA CONFIRMING", None, None, None, None, None, "FORMA PAGO", None, None, None, "PREFIJO"
+]
+
+BANKINTER_SHEET_NAME = "CONFIRMING"
+
+
+def _bankinter_header_style() -> NamedStyle:
+    """Estilo con nombre de la cabecera (Calibri 11 centrado, sin bordes): se registra una vez en el libro."""
+    no_border = Border(left=Side(style=None), right=Side(style=None), top=Side(style=None), bottom=Side(style=None))
+    return NamedStyle(
+        name="bankinter_header",
+        font=Font(name='Calibri', size=11, bold=False),
+        border=no_border,
+        alignment=Alignment(horizontal="center", vertical="top"),
+    )
+
+
+def bankinter_row(inv: Invoice, payer_iban: str) -> list:
+    # Fila con cadenas vacías en las columnas en blanco
+    return [
+        inv.cif or "",                              # CIF
+        inv.nombre or "",                           # NOMBRE
+        inv.email or "",                            # EMAIL
+        inv.direccion or "",                        # DIRECCION
+        inv.cp or "",                               # CP
+        inv.poblacion or "",                        # POBLACION
+        "ES" if not inv.pais or inv.pais.upper() in ["ESPAÑA", "SPAIN", "ES"] else inv.pais, # PAIS
+        inv.cuenta or "",                           # CUENTA
+        inv.importe,                                # IMPORTE (Number)
+        inv.factura or "",                          # FACTURA
+        inv.fecha_vencimiento.strftime("%Y%m%d") if inv.fecha_vencimiento else "", # FECHA VTO
+        inv.fecha_aplazamiento.strftime("%Y%m%d") if inv.fecha_aplazamiento else "", # FECHA APLAZAMIENTO (Optional)
+        "", "",                                     # Empty x2
+        payer_iban,                                 # CUENTA CONFIRMING
+        "", "", "", "", "",                         # Empty x5
+        "T",                                        # FORMA PAGO
+        "ES",                                       # Residencia va en columna sin cabecera
+        "", "",                                     # Empty x2
+        "001"                                       # PREFIJO
+    ]
+
+
+def generate_bankinter_excel(invoices: Iterable[Invoice], db: Session) -> bytes:
+    """
+    Genera el fichero de confirming en modo write-only de openpyxl: las filas
+    se escriben en streaming (no se mantiene la hoja en memoria ni se recorre
+    después celda a celda). Sólo la cabecera lleva estilo con nombre; las
+    filas de datos usan el estilo por defecto (Calibri 11, sin bordes) y se
+    añaden como listas de valores, sin envolver cada celda.
+    `invoices` puede ser cualquier iterable, p. ej. una query con yield_per.
+    """
     # Fetch settings
     settings = db.query(Settings).first()
     payer_iban = settings.numero_cuenta_cargo if settings else ""
-    
-    columns = [
-        "CIF", "NOMBRE", "EMAIL", "DIRECCION", "CP", "POBLACION", "PAIS",
-        "CUENTA", "IMPORTE", "FACTURA", "FECHA DE VENCIMIENTO", "FECHA DE APLAZAMIENTO",
-        None, None, "CUENTA CONFIRMING", None, None, None, None, None, "FORMA PAGO", None, None, None, "PREFIJO"
-    ]
-    
-    rows = []
+
+    workbook = Workbook(write_only=True)
+    header_style = _bankinter_header_style()
+    workbook.add_named_style(header_style)
+
+    ws = workbook.create_sheet(BANKINTER_SHEET_NAME)
+    # Hide standard Excel gridlines
+    ws.sheet_view.showGridLines = False
+
+    def header_cell(title: str | None) -> WriteOnlyCell:
+        cell = WriteOnlyCell(ws, value=title or "")
+        cell.style = header_style.name
+        return cell
+
+    ws.append([header_cell(title) for title in BANKINTER_COLUMNS])
     for inv in invoices:
-        # Prepare row with empty strings for blank columns
-        row = [
-            inv.cif or "",                              # CIF
-            inv.nombre or "",                           # NOMBRE
-            inv.email or "",                            # EMAIL
-            inv.direccion or "",                        # DIRECCION
-            inv.cp or "",                               # CP
-            inv.poblacion or "",                        # POBLACION
-            "ES" if not inv.pais or inv.pais.upper() in ["ESPAÑA", "SPAIN", "ES"] else inv.pais, # PAIS
-            inv.cuenta or "",                           # CUENTA
-            inv.importe,                                # IMPORTE (Number)
-            inv.factura or "",                          # FACTURA
-            inv.fecha_vencimiento.strftime("%Y%m%d") if inv.fecha_vencimiento else "", # FECHA VTO
-            inv.fecha_aplazamiento.strftime("%Y%m%d") if inv.fecha_aplazamiento else "", # FECHA APLAZAMIENTO (Optional)
-            "", "",                                     # Empty x2
-            payer_iban,                                 # CUENTA CONFIRMING
-            "", "", "", "", "",                         # Empty x5
-            "T",                                        # FORMA PAGO
-            "ES",                                       # Residencia va en columna sin cabecera
-            "", "",                                     # Empty x2
-            "001"                                       # PREFIJO
-        ]
-        rows.append(row)
+        ws.append(bankinter_row(inv, payer_iban))
 
-    df = pd.DataFrame(rows, columns=columns)
-    
     output = io.BytesIO()
-    with pd.ExcelWriter(output, engine='openpyxl') as writer:
-        df.to_excel(writer, sheet_name='CONFIRMING', index=False)
-        ws = writer.sheets['CONFIRMING']
-        
-        # Hide standard Excel gridlines
-        ws.sheet_view.showGridLines = False
-        
-        no_border = Border(
-            left=Side(style=None), 
-            right=Side(style=None), 
-            top=Side(style=None), 
-            bottom=Side(style=None)
-        )
-        calibri_font = Font(name='Calibri', size=11, bold=False)
-        
-        for row in ws.iter_rows():
-            for cell in row:
-                cell.border = no_border
-                cell.font = calibri_font
-    
+    workbook.save(output)
     return output.getvalue()
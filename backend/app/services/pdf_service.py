@@ -2,9 +2,16 @@ from reportlab.lib import colors
 from reportlab.lib.pagesizes import A4
 from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
 from reportlab.lib.styles import getSampleStyleSheet
+from reportlab.pdfgen import canvas as pdf_canvas
+from typing import Iterable
 import io
 from datetime import datetime
 
+# A partir de este número de facturas la orden se dibuja directamente en el
+# canvas: el reparto en páginas de un Table de platypus crece muy mal con
+# miles de filas y además mantiene todas las celdas en memoria.
+LARGE_BATCH_PDF_ROWS = 1000
+
 def generate_batch_pdf(batch):
     buffer = io.BytesIO()
     doc = SimpleDocTemplate(buffer, pagesize=A4)
@@ -75,6 +82,129 @@ def generate_batch_pdf(batch):
     buffer.seek(0)
     return buffer.read()
 
+def _fit(text, limit: int) -> str:
+    text = str(text or "")
+    return text if len(text) <= limit else text[:limit - 1] + "…"
+
+
+def generate_large_batch_pdf(batch, invoices: Iterable) -> bytes:
+    """
+    Orden de confirming para remesas grandes, dibujada fila a fila en el canvas.
+    `invoices` puede ser un iterable en streaming (p. ej. query con yield_per):
+    sólo se mantiene la página en curso. Cada página repite la cabecera de la
+    tabla y cierra con su subtotal y el acumulado ("suma y sigue"); la última
+    lleva el TOTAL y las firmas. El coste es lineal en el número de facturas.
+    """
+    buffer = io.BytesIO()
+    page_width, page_height = A4
+    left, right, top, bottom = 42, page_width - 42, page_height - 48, 56
+    col_widths = [80, 200, 70, 80, 80]
+    col_x = [left]
+    for width in col_widths[:-1]:
+        col_x.append(col_x[-1] + width)
+    table_right = col_x[-1] + col_widths[-1]
+    row_height = 14
+    headers = ['Factura', 'Proveedor', 'CIF', 'Vencimiento', 'Importe']
+
+    c = pdf_canvas.Canvas(buffer, pagesize=A4, pageCompression=1)
+    c.setTitle(f"Orden de Confirming - Remesa #{batch.id}")
+
+    state = {"page": 0, "y": 0.0, "page_total": 0.0, "page_top": 0.0}
+
+    def draw_row(values, y, font="Helvetica", size=8):
+        c.setFont(font, size)
+        baseline = y - row_height + 4
+        for index, value in enumerate(values[:-1]):
+            c.drawString(col_x[index] + 3, baseline, value)
+        c.drawRightString(table_right - 3, baseline, values[-1])
+
+    def start_page():
+        state["page"] += 1
+        y = top
+        if state["page"] == 1:
+            batch_date = batch.created_at.strftime("%d/%m/%Y") if batch.created_at else "-"
+            payment_date = batch.payment_date.strftime("%d/%m/%Y") if batch.payment_date else "-"
+            c.setFont("Helvetica-Bold", 16)
+            c.drawString(left, y - 16, f"Orden de Confirming - Remesa #{batch.id}")
+            c.setFont("Helvetica", 10)
+            c.drawString(left, y - 40, f"Fecha de Creación: {batch_date}")
+            c.drawString(left, y - 54, f"Fecha de Pago: {payment_date}")
+            c.drawString(left, y - 68, f"Nombre Remesa: {batch.name or ''}")
+            y -= 88
+        else:
+            c.setFont("Helvetica", 8)
+            c.drawString(left, y - 8, f"Remesa #{batch.id} (continuación)")
+            y -= 18
+        c.setFillColor(colors.lightgrey)
+        c.rect(left, y - row_height, table_right - left, row_height, stroke=0, fill=1)
+        c.setFillColor(colors.black)
+        draw_row(headers, y, font="Helvetica-Bold")
+        state["page_top"] = y
+        state["y"] = y - row_height
+        state["page_total"] = 0.0
+
+    def close_grid():
+        # Rejilla de la página de una vez (líneas horizontales y verticales)
+        c.setLineWidth(0.5)
+        y = state["page_top"]
+        while y >= state["y"] - 0.01:
+            c.line(left, y, table_right, y)
+            y -= row_height
+        for x in col_x + [table_right]:
+            c.line(x, state["page_top"], x, state["y"])
+
+    def finish_page(running_total):
+        close_grid()
+        y = state["y"]
+        draw_row(['', '', '', 'Subtotal página', f"{state['page_total']:,.2f} €"], y, font="Helvetica-Bold")
+        draw_row(['', '', '', 'Suma y sigue', f"{running_total:,.2f} €"], y - row_height, font="Helvetica-Bold")
+        c.setFont("Helvetica", 8)
+        c.drawRightString(right, 28, f"Página {state['page']}")
+        c.showPage()
+
+    # Filas por página dejando sitio para subtotal y acumulado
+    reserved = 2 * row_height
+    total = 0.0
+    start_page()
+    for inv in invoices:
+        if state["y"] - row_height < bottom + reserved:
+            finish_page(total)
+            start_page()
+        amount = inv.importe or 0.0
+        draw_row([
+            _fit(inv.factura, 18),
+            _fit(inv.nombre, 30),
+            _fit(inv.cif, 14),
+            inv.fecha_vencimiento.strftime("%d/%m/%Y") if inv.fecha_vencimiento else "-",
+            f"{amount:,.2f} €",
+        ], state["y"])
+        state["y"] -= row_height
+        state["page_total"] += amount
+        total += amount
+
+    # Última página: subtotal, TOTAL y firmas (en página nueva si no caben)
+    if state["y"] - (reserved + row_height + 80) < bottom:
+        finish_page(total)
+        start_page()
+    close_grid()
+    y = state["y"]
+    draw_row(['', '', '', 'Subtotal página', f"{state['page_total']:,.2f} €"], y, font="Helvetica-Bold")
+    y -= row_height
+    c.setFillColor(colors.whitesmoke)
+    c.rect(left, y - row_height, table_right - left, row_height, stroke=0, fill=1)
+    c.setFillColor(colors.black)
+    draw_row(['', '', '', 'TOTAL', f"{total:,.2f} €"], y, font="Helvetica-Bold")
+    c.setLineWidth(2)
+    c.line(left, y - row_height, table_right, y - row_height)
+    c.setFont("Helvetica", 10)
+    c.drawString(left, y - row_height - 60, "Firma Responsable Financiero:")
+    c.drawString(left + 250, y - row_height - 60, "Firma Dirección:")
+    c.setFont("Helvetica", 8)
+    c.drawRightString(right, 28, f"Página {state['page']}")
+    c.showPage()
+    c.save()
+    return buffer.getvalue()
+
 def generate_monthly_report_pdf(stats):
     """
     stats = {
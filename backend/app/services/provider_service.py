@@ -1,7 +1,18 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy import func, or_
 from ..models import Provider
+from ..utils.upsert import dialect_insert
 from datetime import datetime
+from typing import Iterable, Iterator
+
+# Campos maestros que se rellenan desde las facturas de un lote
+PROVIDER_FIELDS = ('name', 'email', 'address', 'city', 'zip_code', 'country', 'phone', 'iban')
+
+# Campos que trae el maestro de proveedores (Excel de /providers/upload)
+MASTER_FIELDS = ('name', 'email', 'address', 'city', 'zip_code', 'iban', 'phone', 'country', 'swift')
+
+# Filas por sentencia (mantiene los parámetros por debajo del límite de SQLite)
+UPSERT_CHUNK_SIZE = 500
 
 def normalize_cif(cif: str) -> str:
     """Normaliza el CIF: strip, upper, sin espacios"""
@@ -11,10 +22,13 @@ def normalize_cif(cif: str) -> str:
 
 def upsert_providers_by_cif(db: Session, providers_data: list[dict]) -> dict:
     """
-    UPSERT de proveedores por CIF (compatible con PostgreSQL y SQLite).
+    UPSERT de proveedores por CIF con INSERT ... ON CONFLICT (cif) DO UPDATE
+    (compatible con PostgreSQL y SQLite).
     - Si el CIF no existe, lo crea.
-    - Si el CIF ya existe, actualiza sus datos básicos.
-    - Devuelve un dict {cif: Provider} para mapeo rápido.
+    - Si el CIF ya existe, actualiza sólo los datos básicos que llegan informados
+      y únicamente cuando cambian (sin reescribir filas ni updated_at en vano).
+    - Devuelve un dict {cif: Provider} con los proveedores creados o modificados,
+      obtenido del RETURNING de la propia sentencia.
     """
     # Deduplicar por CIF (quedarse con el último)
     seen = {}
@@ -22,56 +36,78 @@ def upsert_providers_by_cif(db: Session, providers_data: list[dict]) -> dict:
         cif = normalize_cif(pdata.get('cif'))
         if cif:
             seen[cif] = pdata
-    
+
     if not seen:
         return {}
-    
-    # Obtener proveedores existentes
-    existing_providers = db.query(Provider).filter(Provider.cif.in_(list(seen.keys()))).all()
-    existing_cifs = {p.cif for p in existing_providers}
-    
-    # Actualizar existentes y preparar nuevos
-    for cif, data in seen.items():
-        if cif in existing_cifs:
-            # Actualizar proveedor existente
-            provider = db.query(Provider).filter(Provider.cif == cif).first()
-            if provider:
-                if data.get('name'):
-                    provider.name = data['name']
-                if data.get('email'):
-                    provider.email = data['email']
-                if data.get('address'):
-                    provider.address = data['address']
-                if data.get('city'):
-                    provider.city = data['city']
-                if data.get('zip_code'):
-                    provider.zip_code = data['zip_code']
-                if data.get('country'):
-                    provider.country = data['country']
-                if data.get('phone'):
-                    provider.phone = data['phone']
-                if data.get('iban'):
-                    provider.iban = data['iban']
-                provider.updated_at = datetime.utcnow()
-        else:
-            # Crear nuevo proveedor
-            new_provider = Provider(
-                cif=cif,
-                name=data.get('name', ''),
-                email=data.get('email'),
-                address=data.get('address'),
-                city=data.get('city'),
-                zip_code=data.get('zip_code'),
-                country=data.get('country'),
-                phone=data.get('phone'),
-                iban=data.get('iban'),
-                updated_at=datetime.utcnow()
-            )
-            db.add(new_provider)
-    
-    db.flush()
-    
-    # Devolver diccionario de proveedores para mapeo
-    cifs = list(seen.keys())
-    providers = db.query(Provider).filter(Provider.cif.in_(cifs)).all()
-    return {p.cif: p for p in providers}
+
+    now = datetime.utcnow()
+    rows = [
+        {
+            'cif': cif,
+            'name': data.get('name', ''),
+            **{field: data.get(field) for field in PROVIDER_FIELDS if field != 'name'},
+            'updated_at': now,
+        }
+        for cif, data in seen.items()
+    ]
+
+    providers = {}
+    for start in range(0, len(rows), UPSERT_CHUNK_SIZE):
+        stmt = dialect_insert(db, Provider).values(rows[start:start + UPSERT_CHUNK_SIZE])
+        # Un valor vacío en el lote no pisa el dato maestro existente
+        new_values = {
+            field: func.coalesce(func.nullif(stmt.excluded[field], ''), getattr(Provider, field))
+            for field in PROVIDER_FIELDS
+        }
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[Provider.cif],
+            set_={**new_values, 'updated_at': stmt.excluded.updated_at},
+            where=or_(*(getattr(Provider, field).is_distinct_from(value) for field, value in new_values.items())),
+        ).returning(Provider)
+        for provider in db.scalars(stmt, execution_options={"populate_existing": True}):
+            providers[provider.cif] = provider
+
+    return providers
+
+
+def chunked(items: Iterable, size: int = UPSERT_CHUNK_SIZE) -> Iterator[list]:
+    """Agrupa un iterable en listas de `size` elementos sin materializarlo entero."""
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def upsert_provider_master(db: Session, rows: list[dict]) -> int:
+    """
+    UPSERT de un bloque del maestro de proveedores con un único
+    INSERT ... ON CONFLICT (cif) DO UPDATE. El maestro manda: sus campos
+    sustituyen a los guardados, salvo un nombre vacío, que conserva el actual.
+    Si el CIF se repite dentro del bloque gana la última fila. No hace commit.
+    Devuelve el nº de proveedores escritos.
+    """
+    seen = {row['cif']: row for row in rows if row.get('cif')}
+    if not seen:
+        return 0
+
+    now = datetime.utcnow()
+    values = [
+        {'cif': cif, **{field: row.get(field) for field in MASTER_FIELDS}, 'updated_at': now}
+        for cif, row in seen.items()
+    ]
+    # Misma sentencia para todos los bloques (se compila una vez) ejecutada en modo executemany
+    stmt = dialect_insert(db, Provider.__table__)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[Provider.cif],
+        set_={
+            **{field: stmt.excluded[field] for field in MASTER_FIELDS},
+            'name': func.coalesce(stmt.excluded.name, Provider.name),
+            'updated_at': stmt.excluded.updated_at,
+        },
+    )
+    db.execute(stmt, values)
+    return len(values)
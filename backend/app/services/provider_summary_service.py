@@ -0,0 +1,209 @@
+"""
+Resumen por proveedor (provider_summary): totales, nº de facturas, ticket
+medio, primer/último vencimiento, último pago, duplicados y los campos
+relativos a hoy (vencidas, próximos 30 días y siguiente vencimiento).
+
+Se mantiene en la misma transacción que crea o borra un lote: se recalculan
+las filas de los CIF del lote con un GROUP BY sobre sus facturas (índice de
+cif), bloqueando antes sus filas de providers para que dos lotes del mismo
+proveedor no se pisen. Los campos relativos a hoy caducan al cambiar de día:
+los renueva ProviderSummaryRefresher en segundo plano (y la ficha del
+proveedor si encuentra su fila atrasada).
+"""
+import logging
+import threading
+from datetime import date, datetime, timedelta
+from typing import Callable, Iterable
+
+from sqlalchemy import Date, DateTime, and_, case, delete, exists, func, literal, select, update
+from sqlalchemy.orm import Session
+
+from ..models import Batch, Invoice, Provider, ProviderSummary
+from ..utils.pagination import day_range
+from ..utils.upsert import dialect_insert
+from .duplicate_service import duplicate_occurrences_subquery
+
+logger = logging.getLogger(__name__)
+
+UPCOMING_DAYS = 30
+SUMMARY_CHUNK_SIZE = 500
+
+TIME_RELATIVE_FIELDS = ("next_due_date", "overdue_count", "upcoming_count", "upcoming_amount")
+
+
+def _time_relative_columns(today: date) -> dict:
+    today_start, upcoming_end = day_range(today, today + timedelta(days=UPCOMING_DAYS))
+    due = Invoice.fecha_vencimiento
+    upcoming = and_(due >= today_start, due < upcoming_end)
+    return {
+        "next_due_date": func.min(case((due >= today_start, due))),
+        "overdue_count": func.count(case((due < today_start, Invoice.id))),
+        "upcoming_count": func.count(case((upcoming, Invoice.id))),
+        "upcoming_amount": func.coalesce(func.sum(case((upcoming, Invoice.importe), else_=0.0)), 0.0),
+    }
+
+
+def _provider_filters(cifs: list[str] | None) -> list:
+    filters = [Invoice.cif.isnot(None), Invoice.cif != ""]
+    if cifs is not None:
+        filters.append(Invoice.cif.in_(cifs))
+    return filters
+
+
+def _summary_select(today: date, cifs: list[str] | None = None):
+    filters = _provider_filters(cifs)
+    occurrences = duplicate_occurrences_subquery(*filters)
+    columns = {
+        "cif": Invoice.cif,
+        "name": func.max(Invoice.nombre),
+        "invoice_count": func.count(Invoice.id),
+        "total_amount": func.coalesce(func.sum(Invoice.importe), 0.0),
+        "average_amount": func.coalesce(func.avg(Invoice.importe), 0.0),
+        "first_due_date": func.min(Invoice.fecha_vencimiento),
+        "last_due_date": func.max(Invoice.fecha_vencimiento),
+        "last_payment_date": func.max(Batch.payment_date),
+        "duplicate_count": func.count(case((occurrences.c.occurrences > 1, Invoice.id))),
+        **_time_relative_columns(today),
+        "as_of": literal(today, Date),
+        "updated_at": literal(datetime.utcnow(), DateTime),
+    }
+    statement = (
+        select(*(column.label(name) for name, column in columns.items()))
+        .select_from(Invoice)
+        .join(occurrences, occurrences.c.id == Invoice.id)
+        .outerjoin(Batch, Batch.id == Invoice.batch_id)
+        .where(*filters)
+        .group_by(Invoice.cif)
+    )
+    return list(columns), statement
+
+
+def _chunks(cifs: Iterable[str | None]) -> Iterable[list[str]]:
+    unique = sorted({cif for cif in cifs if cif})
+    for start in range(0, len(unique), SUMMARY_CHUNK_SIZE):
+        yield unique[start:start + SUMMARY_CHUNK_SIZE]
+
+
+def _lock_providers(db: Session, cifs: list[str]) -> None:
+    """
+    SELECT ... FOR UPDATE (en orden de CIF) sobre las fichas de los proveedores:
+    serializa los recálculos concurrentes del mismo CIF y hace que el siguiente
+    recálculo vea las facturas ya confirmadas por el otro. SQLite lo ignora.
+    """
+    db.execute(select(Provider.cif).where(Provider.cif.in_(cifs)).order_by(Provider.cif).with_for_update())
+
+
+def refresh_provider_summaries(db: Session, cifs: Iterable[str | None] | None = None, today: date | None = None) -> None:
+    """
+    Recalcula desde invoices las filas de los CIF indicados (o todas). Los
+    CIF que se han quedado sin facturas pierden su fila. No hace commit.
+    """
+    today = today or date.today()
+    if cifs is None:
+        columns, statement = _summary_select(today)
+        db.execute(delete(ProviderSummary))
+        db.execute(ProviderSummary.__table__.insert().from_select(columns, statement))
+        return
+
+    for chunk in _chunks(cifs):
+        _lock_providers(db, chunk)
+        columns, statement = _summary_select(today, chunk)
+        upsert = dialect_insert(db, ProviderSummary).from_select(columns, statement)
+        db.execute(
+            upsert.on_conflict_do_update(
+                index_elements=["cif"],
+                set_={column: upsert.excluded[column] for column in columns if column != "cif"},
+            )
+        )
+        db.execute(
+            delete(ProviderSummary)
+            .where(ProviderSummary.cif.in_(chunk), ~exists().where(Invoice.cif == ProviderSummary.cif))
+            .execution_options(synchronize_session=False)
+        )
+
+
+def batch_provider_cifs(db: Session, batch_id: int) -> list[str]:
+    """CIF distintos de las facturas de un lote (para recalcular su resumen al borrarlo)."""
+    return list(db.scalars(select(Invoice.cif).where(Invoice.batch_id == batch_id).distinct()))
+
+
+def stale_summary_cifs(db: Session, today: date | None = None) -> list[str]:
+    today = today or date.today()
+    return list(db.scalars(select(ProviderSummary.cif).where(ProviderSummary.as_of < today).order_by(ProviderSummary.cif)))
+
+
+def refresh_time_relative(db: Session, cifs: Iterable[str], today: date | None = None) -> int:
+    """
+    Recalcula sólo los campos relativos a hoy de los CIF indicados y los
+    marca con as_of = today. Devuelve el nº de filas actualizadas. No hace commit.
+    """
+    today = today or date.today()
+    columns = _time_relative_columns(today)
+    updated = 0
+    for chunk in _chunks(cifs):
+        _lock_providers(db, chunk)
+        rows = db.execute(
+            select(Invoice.cif, *(column.label(name) for name, column in columns.items()))
+            .where(*_provider_filters(chunk))
+            .group_by(Invoice.cif)
+        ).all()
+        if not rows:
+            continue
+        db.execute(
+            update(ProviderSummary),
+            [{"cif": row.cif, **{name: row._mapping[name] for name in TIME_RELATIVE_FIELDS}, "as_of": today} for row in rows],
+        )
+        updated += len(rows)
+    return updated
+
+
+class ProviderSummaryRefresher:
+    """
+    Hilo que, cada `interval_seconds`, renueva los campos relativos a hoy de
+    las filas con as_of atrasado (una transacción por bloque de CIF).
+    """
+
+    def __init__(self, session_factory: Callable[[], Session], interval_seconds: float = 900.0):
+        self.session_factory = session_factory
+        self.interval_seconds = interval_seconds
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self):
+        if self.interval_seconds <= 0 or (self._thread is not None and self._thread.is_alive()):
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="provider-summary-refresher", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float | None = 5.0):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def run_once(self, today: date | None = None) -> int:
+        db = self.session_factory()
+        try:
+            today = today or date.today()
+            refreshed = 0
+            for chunk in _chunks(stale_summary_cifs(db, today)):
+                refreshed += refresh_time_relative(db, chunk, today)
+                db.commit()
+            return refreshed
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def _run(self):
+        while True:
+            try:
+                refreshed = self.run_once()
+                if refreshed:
+                    logger.info("Provider summary: refreshed %s stale row(s)", refreshed)
+            except Exception:
+                logger.warning("Provider summary refresh failed", exc_info=True)
+            if self._stop.wait(self.interval_seconds):
+                return
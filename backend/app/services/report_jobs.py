@@ -0,0 +1,245 @@
+"""
+Trabajos de generación de informes en segundo plano.
+
+Los informes pesados (PDF y Excel) se renderizan en un pool de procesos
+acotado en lugar de en el worker de la API. Cada trabajo se identifica por
+una clave = hash(tipo, parámetros, versión de datos): si ya existe el
+artefacto en disco (y no ha caducado) el trabajo nace terminado, y si hay
+otro en curso con la misma clave se devuelve ése. Los artefactos se guardan
+en disco con escritura atómica y se purgan al superar el TTL.
+"""
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import BrokenExecutor, Executor, ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable
+
+from .export_cache import write_atomic
+
+logger = logging.getLogger(__name__)
+
+PENDING = "pending"
+DONE = "done"
+FAILED = "failed"
+
+
+def report_job_key(kind: str, params: dict, data_version: str) -> str:
+    payload = json.dumps({"kind": kind, "params": params, "version": data_version}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:32]
+
+
+@dataclass
+class StoredArtifact:
+    key: str
+    path: str
+    filename: str
+    media_type: str
+    created_at: float
+
+
+class ArtifactStore:
+    """Artefactos en disco (<clave>.bin + <clave>.json) con caducidad por antigüedad."""
+
+    def __init__(self, directory: str, ttl_seconds: float = 3600.0):
+        self.directory = directory
+        self.ttl_seconds = ttl_seconds
+        os.makedirs(directory, exist_ok=True)
+
+    def _paths(self, key: str) -> tuple[str, str]:
+        return os.path.join(self.directory, f"{key}.bin"), os.path.join(self.directory, f"{key}.json")
+
+    def get(self, key: str) -> StoredArtifact | None:
+        data_path, meta_path = self._paths(key)
+        try:
+            with open(meta_path, encoding="utf-8") as handle:
+                meta = json.load(handle)
+        except (OSError, ValueError):
+            return None
+        if time.time() - meta["created_at"] >= self.ttl_seconds or not os.path.exists(data_path):
+            self._remove(key)
+            return None
+        return StoredArtifact(key, data_path, meta["filename"], meta["media_type"], meta["created_at"])
+
+    def put(self, key: str, content: bytes, filename: str, media_type: str) -> StoredArtifact:
+        created_at = time.time()
+        data_path = write_atomic(self.directory, f"{key}.bin", content)
+        meta = {"filename": filename, "media_type": media_type, "created_at": created_at}
+        # Los metadatos se escriben después: un .json presente implica .bin completo
+        write_atomic(self.directory, f"{key}.json", json.dumps(meta).encode("utf-8"))
+        return StoredArtifact(key, data_path, filename, media_type, created_at)
+
+    def purge_expired(self) -> int:
+        removed = 0
+        now = time.time()
+        for name in os.listdir(self.directory):
+            if not name.endswith(".json"):
+                continue
+            key = name[:-5]
+            try:
+                with open(os.path.join(self.directory, name), encoding="utf-8") as handle:
+                    expired = now - json.load(handle)["created_at"] >= self.ttl_seconds
+            except (OSError, ValueError, KeyError):
+                expired = True
+            if expired:
+                self._remove(key)
+                removed += 1
+        return removed
+
+    def _remove(self, key: str):
+        for path in self._paths(key):
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+
+
+@dataclass
+class ReportJob:
+    id: str
+    kind: str
+    params: dict
+    key: str
+    status: str = PENDING
+    error: str | None = None
+    filename: str | None = None
+    created_at: float = field(default_factory=time.time)
+    finished_at: float | None = None
+    # Se activa al terminar (DONE o FAILED)
+    finished: threading.Event = field(default_factory=threading.Event, repr=False)
+
+    def as_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "params": self.params,
+            "status": self.status,
+            "error": self.error,
+            "filename": self.filename,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class ReportQueueFull(Exception):
+    pass
+
+
+class ReportJobManager:
+    """
+    Cola de trabajos sobre un executor acotado. `render(kind, params)` debe ser
+    una función de módulo (se envía al pool de procesos) que devuelve
+    (bytes, nombre de fichero, media type).
+    """
+
+    def __init__(
+        self,
+        render: Callable[[str, dict], tuple[bytes, str, str]],
+        store: ArtifactStore,
+        max_workers: int = 2,
+        max_pending: int = 16,
+        executor_factory: Callable[[], Executor] | None = None,
+        job_ttl_seconds: float = 3600.0,
+    ):
+        self.render = render
+        self.store = store
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.job_ttl_seconds = job_ttl_seconds
+        self._executor_factory = executor_factory or self._process_pool
+        self._executor: Executor | None = None
+        self._jobs: dict[str, ReportJob] = {}
+        self._inflight: dict[str, ReportJob] = {}
+        self._lock = threading.Lock()
+
+    def _process_pool(self) -> Executor:
+        # spawn: el proceso de la API tiene hilos y conexiones abiertas que no deben heredarse
+        return ProcessPoolExecutor(max_workers=self.max_workers, mp_context=multiprocessing.get_context("spawn"))
+
+    def submit(self, kind: str, params: dict, data_version: str) -> ReportJob:
+        key = report_job_key(kind, params, data_version)
+        with self._lock:
+            self._purge_jobs()
+            inflight = self._inflight.get(key)
+            if inflight is not None:
+                return inflight
+
+            job = ReportJob(uuid.uuid4().hex, kind, params, key)
+            artifact = self.store.get(key)
+            if artifact is not None:
+                job.status, job.filename, job.finished_at = DONE, artifact.filename, time.time()
+                job.finished.set()
+                self._jobs[job.id] = job
+                return job
+
+            if len(self._inflight) >= self.max_pending:
+                raise ReportQueueFull()
+            if self._executor is None:
+                self._executor = self._executor_factory()
+            self._jobs[job.id] = job
+            self._inflight[key] = job
+            future = self._executor.submit(self.render, kind, params)
+        future.add_done_callback(lambda done: self._finish(job, done))
+        return job
+
+    def get(self, job_id: str) -> ReportJob | None:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def artifact(self, job: ReportJob) -> StoredArtifact | None:
+        return self.store.get(job.key) if job.status == DONE else None
+
+    def wait(self, job: ReportJob, timeout: float | None = None) -> bool:
+        """Espera a que el trabajo termine (o falle). Devuelve False si vence el timeout."""
+        return job.finished.wait(timeout)
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def _finish(self, job: ReportJob, future):
+        try:
+            content, filename, media_type = future.result()
+            self.store.put(job.key, content, filename, media_type)
+            job.filename = filename
+            job.status = DONE
+        except Exception as e:
+            logger.warning("Report job %s (%s) failed", job.id, job.kind, exc_info=True)
+            if isinstance(e, BrokenExecutor):
+                # Un proceso murió: el pool queda inservible y se recrea en el siguiente submit
+                with self._lock:
+                    self._executor = None
+            job.error = str(e) or e.__class__.__name__
+            job.status = FAILED
+        job.finished_at = time.time()
+        with self._lock:
+            self._inflight.pop(job.key, None)
+        job.finished.set()
+
+    def _purge_jobs(self):
+        now = time.time()
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job.finished_at is not None and now - job.finished_at >= self.job_ttl_seconds
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+        self.store.purge_expired()
+
+
+def default_artifact_dir() -> str:
+    return os.getenv("REPORT_ARTIFACT_DIR") or os.path.join(tempfile.gettempdir(), "confirming-reports")
+
+
+def job_status_payload(job: ReportJob) -> dict[str, Any]:
+    payload = job.as_dict()
+    if job.status == DONE:
+        payload["download_url"] = f"/reports/jobs/{job.id}/download"
+    return payload
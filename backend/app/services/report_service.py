@@ -0,0 +1,124 @@
+"""
+Agregados del informe mensual de tesorería y versión de datos de los informes.
+
+Todo se resuelve con consultas agrupadas sobre los rollups diarios: a Python
+sólo llegan los KPIs, el top 5 de proveedores y como mucho cinco cubos
+semanales, así que el coste en memoria no depende del volumen del mes.
+"""
+import calendar
+import hashlib
+from datetime import date, timedelta
+
+from sqlalchemy import Integer, cast, extract, func
+from sqlalchemy.orm import Session
+
+from ..models import Batch, Invoice, InvoiceDailyProvider, InvoiceDailyStatus, Provider
+
+MONTH_NAMES = [
+    "", "Enero", "Febrero", "Marzo", "Abril", "Mayo", "Junio",
+    "Julio", "Agosto", "Septiembre", "Octubre", "Noviembre", "Diciembre"
+]
+
+
+def _week_index(column):
+    """Semana del mes (0 = días 1-7, 1 = días 8-14, ...)."""
+    return (cast(extract("day", column), Integer) - 1) // 7
+
+
+def monthly_report_stats(db: Session, year: int, month: int) -> dict:
+    _, last_day = calendar.monthrange(year, month)
+    start_date = date(year, month, 1)
+    end_date = date(year, month, last_day)
+
+    total_count, total_amount = (
+        db.query(
+            func.coalesce(func.sum(InvoiceDailyStatus.invoice_count), 0),
+            func.coalesce(func.sum(InvoiceDailyStatus.total_amount), 0.0),
+        )
+        .filter(InvoiceDailyStatus.due_date >= start_date, InvoiceDailyStatus.due_date <= end_date)
+        .one()
+    )
+
+    in_month = (InvoiceDailyProvider.due_date >= start_date, InvoiceDailyProvider.due_date <= end_date)
+    active_providers = (
+        db.query(func.count(func.distinct(InvoiceDailyProvider.cif))).filter(*in_month).scalar() or 0
+    )
+
+    # Top Providers (por CIF, mostrando el nombre)
+    provider_amount = func.sum(InvoiceDailyProvider.total_amount)
+    top_rows = (
+        db.query(InvoiceDailyProvider.cif, func.max(InvoiceDailyProvider.name), provider_amount)
+        .filter(*in_month)
+        .group_by(InvoiceDailyProvider.cif)
+        .order_by(provider_amount.desc(), InvoiceDailyProvider.cif)
+        .limit(5)
+        .all()
+    )
+    top_providers = [{"name": name or cif, "amount": float(amount or 0.0)} for cif, name, amount in top_rows]
+
+    # Weekly Breakdown: Semana 1-7, 8-14, ... (la última acaba a fin de mes)
+    week = _week_index(InvoiceDailyStatus.due_date).label("week")
+    week_amounts = dict(
+        db.query(week, func.sum(InvoiceDailyStatus.total_amount))
+        .filter(InvoiceDailyStatus.due_date >= start_date, InvoiceDailyStatus.due_date <= end_date)
+        .group_by(week)
+        .all()
+    )
+    weekly_breakdown = []
+    for index in range((last_day + 6) // 7):
+        week_start = start_date + timedelta(days=index * 7)
+        week_end = min(week_start + timedelta(days=6), end_date)
+        weekly_breakdown.append({
+            "week": f"Semana {week_start.day}-{week_end.day}",
+            "amount": float(week_amounts.get(index) or 0.0),
+        })
+
+    return {
+        "month": MONTH_NAMES[month],
+        "year": year,
+        "total_amount": float(total_amount),
+        "total_invoices": int(total_count),
+        "active_providers": int(active_providers),
+        "top_providers": top_providers,
+        "weekly_breakdown": weekly_breakdown,
+    }
+
+
+def report_data_version(db: Session, kind: str, params: dict) -> str:
+    """
+    Huella barata de los datos que usa cada informe (agregados, no filas): si
+    no cambia, un informe ya generado con los mismos parámetros sigue valiendo.
+    """
+    if kind == "monthly_pdf":
+        _, last_day = calendar.monthrange(params["year"], params["month"])
+        parts = db.query(
+            func.count(),
+            func.sum(InvoiceDailyProvider.invoice_count),
+            func.sum(InvoiceDailyProvider.total_amount),
+            func.max(InvoiceDailyProvider.name),
+        ).filter(
+            InvoiceDailyProvider.due_date >= date(params["year"], params["month"], 1),
+            InvoiceDailyProvider.due_date <= date(params["year"], params["month"], last_day),
+        ).one()
+    elif kind == "provider_excel":
+        parts = (
+            *db.query(func.count(Invoice.id), func.max(Invoice.id), func.sum(Invoice.importe))
+            .filter(Invoice.cif == params["cif"])
+            .one(),
+            db.query(Provider.updated_at).filter(Provider.cif == params["cif"]).scalar(),
+        )
+    elif kind == "batch_excel":
+        parts = db.query(Batch.created_at, Batch.invoice_count, Batch.total_amount).filter(
+            Batch.id == params["batch_id"]
+        ).first()
+    else:
+        # Dashboard: lotes por estado, proveedores y el día (la tesorería es relativa a hoy)
+        parts = (
+            date.today(),
+            *db.query(
+                Batch.status, func.count(Batch.id), func.max(Batch.id),
+                func.sum(Batch.invoice_count), func.sum(Batch.total_amount),
+            ).group_by(Batch.status).order_by(Batch.status).all(),
+            db.query(func.count(Provider.cif), func.max(Provider.updated_at)).one(),
+        )
+    return hashlib.sha256(repr(tuple(parts or ())).encode("utf-8")).hexdigest()[:16]
@@ -0,0 +1,226 @@
+"""
+Rollups diarios de facturas por día de vencimiento:
+- invoice_daily_status:   (due_date, status) -> nº facturas, importe
+- invoice_daily_provider: (due_date, cif)    -> nº facturas, importe (y la parte en ERROR)
+
+Se mantienen de forma incremental al crear y borrar lotes y se pueden
+reconstruir desde cero con rebuild_rollups. Las facturas sin vencimiento
+no tienen día y quedan fuera de los rollups.
+"""
+from collections import defaultdict
+from datetime import date
+from typing import Iterable
+
+from sqlalchemy import Date, case, delete, func, insert, select
+from sqlalchemy.orm import Session
+
+from ..models import Invoice, InvoiceDailyProvider, InvoiceDailyStatus, InvoiceStatus
+from ..utils.upsert import dialect_insert
+
+ROLLUP_CHUNK_SIZE = 500
+
+
+def _due_day(model=Invoice):
+    return func.date(model.fecha_vencimiento, type_=Date)
+
+
+def _upsert_deltas(
+    db: Session, model, key_columns: tuple[str, ...], rows: list[dict], additive: tuple[str, ...], sign: int = 1
+):
+    """
+    Suma los deltas de rows sobre las filas existentes (ON CONFLICT ... DO UPDATE SET x = x + excluded.x).
+    Al restar (sign < 0) borra las filas que se quedan sin facturas, sólo
+    entre los días tocados (prefijo due_date de la clave primaria).
+    """
+    for start in range(0, len(rows), ROLLUP_CHUNK_SIZE):
+        chunk = rows[start:start + ROLLUP_CHUNK_SIZE]
+        stmt = dialect_insert(db, model).values(chunk)
+        set_ = {column: getattr(model, column) + stmt.excluded[column] for column in additive}
+        if "name" in model.__table__.c:
+            set_["name"] = func.coalesce(stmt.excluded.name, model.name)
+        db.execute(stmt.on_conflict_do_update(index_elements=list(key_columns), set_=set_))
+
+        if sign < 0:
+            due_dates = sorted({row["due_date"] for row in chunk})
+            db.execute(delete(model).where(model.due_date.in_(due_dates), model.invoice_count <= 0))
+
+
+def _apply_deltas(db: Session, status_deltas: dict, provider_deltas: dict, sign: int = 1):
+    status_rows = [
+        {"due_date": due_date, "status": status, "invoice_count": sign * count, "total_amount": sign * amount}
+        for (due_date, status), (count, amount) in status_deltas.items()
+    ]
+    provider_rows = [
+        {
+            "due_date": due_date,
+            "cif": cif,
+            "name": name if sign > 0 else None,
+            "invoice_count": sign * count,
+            "total_amount": sign * amount,
+            "error_count": sign * error_count,
+            "error_amount": sign * error_amount,
+        }
+        for (due_date, cif), (count, amount, error_count, error_amount, name) in provider_deltas.items()
+    ]
+    if status_rows:
+        _upsert_deltas(db, InvoiceDailyStatus, ("due_date", "status"), status_rows, ("invoice_count", "total_amount"), sign)
+    if provider_rows:
+        _upsert_deltas(
+            db,
+            InvoiceDailyProvider,
+            ("due_date", "cif"),
+            provider_rows,
+            ("invoice_count", "total_amount", "error_count", "error_amount"),
+            sign,
+        )
+
+
+def add_invoices_to_rollups(db: Session, invoice_rows: Iterable[dict]) -> None:
+    """Suma a los rollups las filas de facturas recién insertadas (las de build_batch_rows)."""
+    status_deltas = defaultdict(lambda: [0, 0.0])
+    provider_deltas = defaultdict(lambda: [0, 0.0, 0, 0.0, None])
+    for row in invoice_rows:
+        due = row.get("fecha_vencimiento")
+        if due is None:
+            continue
+        due_date = due.date() if hasattr(due, "date") else due
+        status = InvoiceStatus(row.get("status") or InvoiceStatus.VALID)
+        amount = float(row.get("importe") or 0.0)
+
+        status_entry = status_deltas[(due_date, status)]
+        status_entry[0] += 1
+        status_entry[1] += amount
+
+        provider_entry = provider_deltas[(due_date, row.get("cif") or "")]
+        provider_entry[0] += 1
+        provider_entry[1] += amount
+        if status == InvoiceStatus.ERROR:
+            provider_entry[2] += 1
+            provider_entry[3] += amount
+        provider_entry[4] = row.get("nombre") or provider_entry[4]
+
+    _apply_deltas(db, status_deltas, provider_deltas)
+
+
+def remove_batch_from_rollups(db: Session, batch_id: int) -> None:
+    """Resta de los rollups la aportación de un lote (antes de borrarlo)."""
+    due_day = _due_day()
+    in_batch = (Invoice.batch_id == batch_id, Invoice.fecha_vencimiento.isnot(None))
+
+    status_deltas = {
+        (due_date, InvoiceStatus(status)): (count, float(amount or 0.0))
+        for due_date, status, count, amount in db.execute(
+            select(due_day, Invoice.status, func.count(Invoice.id), func.sum(Invoice.importe))
+            .where(*in_batch)
+            .group_by(due_day, Invoice.status)
+        )
+    }
+    is_error = Invoice.status == InvoiceStatus.ERROR
+    # NULL y '' comparten la fila '' del rollup (como en add_invoices_to_rollups y rebuild_rollups)
+    cif = func.coalesce(Invoice.cif, "")
+    provider_deltas = {
+        (due_date, provider_cif): (count, float(amount or 0.0), int(error_count or 0), float(error_amount or 0.0), None)
+        for due_date, provider_cif, count, amount, error_count, error_amount in db.execute(
+            select(
+                due_day,
+                cif,
+                func.count(Invoice.id),
+                func.sum(Invoice.importe),
+                func.sum(case((is_error, 1), else_=0)),
+                func.sum(case((is_error, Invoice.importe), else_=0.0)),
+            )
+            .where(*in_batch)
+            .group_by(due_day, cif)
+        )
+    }
+    _apply_deltas(db, status_deltas, provider_deltas, sign=-1)
+
+
+def rebuild_rollups(db: Session) -> None:
+    """Reconstruye ambos rollups desde invoices."""
+    db.execute(delete(InvoiceDailyStatus))
+    db.execute(delete(InvoiceDailyProvider))
+
+    due_day = _due_day()
+    dated = Invoice.fecha_vencimiento.isnot(None)
+    db.execute(
+        insert(InvoiceDailyStatus).from_select(
+            ["due_date", "status", "invoice_count", "total_amount"],
+            select(due_day, Invoice.status, func.count(Invoice.id), func.coalesce(func.sum(Invoice.importe), 0.0))
+            .where(dated)
+            .group_by(due_day, Invoice.status),
+        )
+    )
+
+    is_error = Invoice.status == InvoiceStatus.ERROR
+    cif = func.coalesce(Invoice.cif, "")
+    db.execute(
+        insert(InvoiceDailyProvider).from_select(
+            ["due_date", "cif", "name", "invoice_count", "total_amount", "error_count", "error_amount"],
+            select(
+                due_day,
+                cif,
+                func.max(Invoice.nombre),
+                func.count(Invoice.id),
+                func.coalesce(func.sum(Invoice.importe), 0.0),
+                func.sum(case((is_error, 1), else_=0)),
+                func.coalesce(func.sum(case((is_error, Invoice.importe), else_=0.0)), 0.0),
+            )
+            .where(dated)
+            .group_by(due_day, cif),
+        )
+    )
+
+
+def daily_due_totals(
+    db: Session,
+    start: date | None = None,
+    end: date | None = None,
+    exclude_statuses: Iterable[InvoiceStatus] = (),
+) -> list[tuple[date, int, float]]:
+    """(día, nº facturas, importe) por día de vencimiento en [start, end], ordenado por día."""
+    query = db.query(
+        InvoiceDailyStatus.due_date,
+        func.sum(InvoiceDailyStatus.invoice_count),
+        func.sum(InvoiceDailyStatus.total_amount),
+    )
+    if start is not None:
+        query = query.filter(InvoiceDailyStatus.due_date >= start)
+    if end is not None:
+        query = query.filter(InvoiceDailyStatus.due_date <= end)
+    excluded = list(exclude_statuses)
+    if excluded:
+        query = query.filter(InvoiceDailyStatus.status.notin_(excluded))
+    rows = query.group_by(InvoiceDailyStatus.due_date).order_by(InvoiceDailyStatus.due_date).all()
+    return [(due_date, int(count or 0), float(amount or 0.0)) for due_date, count, amount in rows]
+
+
+def find_rollup_drift(db: Session, tolerance: float = 0.005) -> list[dict]:
+    """Días cuyo rollup por estado no coincide con invoices (comprobación de consistencia)."""
+    due_day = _due_day()
+    actual = {
+        (due_date, InvoiceStatus(status)): (count, float(amount or 0.0))
+        for due_date, status, count, amount in db.execute(
+            select(due_day, Invoice.status, func.count(Invoice.id), func.sum(Invoice.importe))
+            .where(Invoice.fecha_vencimiento.isnot(None))
+            .group_by(due_day, Invoice.status)
+        )
+    }
+    stored = {
+        (row.due_date, InvoiceStatus(row.status)): (row.invoice_count, row.total_amount)
+        for row in db.query(InvoiceDailyStatus).all()
+    }
+    drift = []
+    for key in sorted(set(actual) | set(stored), key=lambda item: (item[0], item[1].value)):
+        actual_count, actual_amount = actual.get(key, (0, 0.0))
+        stored_count, stored_amount = stored.get(key, (0, 0.0))
+        if actual_count != stored_count or abs(actual_amount - stored_amount) > tolerance:
+            drift.append(
+                {
+                    "due_date": key[0].isoformat(),
+                    "status": key[1].value,
+                    "stored": {"invoice_count": stored_count, "total_amount": stored_amount},
+                    "actual": {"invoice_count": actual_count, "total_amount": actual_amount},
+                }
+            )
+    return drift
@@ -0,0 +1,317 @@
+"""
+Motor vectorizado del simulador de tesorería.
+
+Los vencimientos se cargan (ya limitados a la ventana del horizonte) en
+arrays de NumPy con el día expresado como desplazamiento respecto a hoy.
+Los cubos semanales salen de un único searchsorted + bincount y los
+desgloses por proveedor de una reducción agrupada por (cubo, proveedor).
+"""
+from datetime import date, timedelta
+
+import numpy as np
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from ..models import InvoiceDailyProvider, InvoiceStatus, Provider
+from .rollup_service import daily_due_totals
+
+
+def _day_offsets(days, today: date) -> np.ndarray:
+    return np.fromiter(((day - today).days for day in days), dtype=np.int64)
+
+
+def load_due_series(db: Session, today: date, start: date, end: date) -> dict:
+    """Serie diaria de vencimientos (sin ERROR) en [start, end] como arrays."""
+    rows = daily_due_totals(db, start, end, exclude_statuses=(InvoiceStatus.ERROR,))
+    return {
+        "day_offsets": _day_offsets((due_date for due_date, _count, _amount in rows), today),
+        "amounts": np.fromiter((amount for _day, _count, amount in rows), dtype=np.float64, count=len(rows)),
+    }
+
+
+def load_provider_series(db: Session, today: date, start: date, end: date) -> dict:
+    """
+    Importes por (día, proveedor) en [start, end] sin la parte en ERROR.
+    Las filas van ordenadas por (día, CIF) y cada CIF recibe un código entero.
+    """
+    rows = (
+        db.query(
+            InvoiceDailyProvider.due_date,
+            InvoiceDailyProvider.cif,
+            func.coalesce(Provider.name, InvoiceDailyProvider.name),
+            InvoiceDailyProvider.total_amount - InvoiceDailyProvider.error_amount,
+            InvoiceDailyProvider.invoice_count - InvoiceDailyProvider.error_count,
+        )
+        .outerjoin(Provider, Provider.cif == InvoiceDailyProvider.cif)
+        .filter(
+            InvoiceDailyProvider.due_date >= start,
+            InvoiceDailyProvider.due_date <= end,
+            InvoiceDailyProvider.invoice_count > InvoiceDailyProvider.error_count,
+        )
+        .order_by(InvoiceDailyProvider.due_date, InvoiceDailyProvider.cif)
+        .all()
+    )
+    cifs, codes = np.unique(np.array([row[1] for row in rows], dtype=object), return_inverse=True)
+    return {
+        "day_offsets": _day_offsets((row[0] for row in rows), today),
+        "codes": codes.astype(np.int64),
+        "amounts": np.fromiter((float(row[3] or 0.0) for row in rows), dtype=np.float64, count=len(rows)),
+        "counts": np.fromiter((int(row[4] or 0) for row in rows), dtype=np.int64, count=len(rows)),
+        "cifs": list(cifs),
+        "names": [row[2] for row in rows],
+    }
+
+
+def week_buckets(day_offsets: np.ndarray, horizon_weeks: int, shift_days: int = 0) -> np.ndarray:
+    """Índice de semana (0..horizon_weeks-1) de cada día desplazado; -1 si cae fuera del horizonte."""
+    shifted = day_offsets + shift_days
+    edges = np.arange(0, horizon_weeks * 7 + 1, 7)
+    buckets = np.searchsorted(edges, shifted, side="right") - 1
+    buckets[(shifted < 0) | (shifted >= horizon_weeks * 7)] = -1
+    return buckets
+
+
+def weekly_totals(day_offsets: np.ndarray, amounts: np.ndarray, horizon_weeks: int, shift_days: int = 0) -> np.ndarray:
+    """Suma de importes por semana del horizonte (bincount sobre los cubos)."""
+    buckets = week_buckets(day_offsets, horizon_weeks, shift_days)
+    inside = buckets >= 0
+    return np.bincount(buckets[inside], weights=amounts[inside], minlength=horizon_weeks)
+
+
+def top_providers_by_bucket(series: dict, buckets: np.ndarray, n_buckets: int, limit: int) -> list[list[dict]]:
+    """
+    Top `limit` proveedores por importe en cada cubo. Los empates se resuelven
+    por orden de aparición dentro del cubo y el nombre es el de la primera
+    fila vista, igual que el recorrido fila a fila.
+    """
+    n_providers = len(series["cifs"])
+    inside = buckets >= 0
+    if not n_providers or not inside.any():
+        return [[] for _ in range(n_buckets)]
+
+    rows = np.flatnonzero(inside)
+    keys = buckets[rows] * n_providers + series["codes"][rows]
+    size = n_buckets * n_providers
+    amounts = np.bincount(keys, weights=series["amounts"][rows], minlength=size).reshape(n_buckets, n_providers)
+    counts = np.bincount(keys, weights=series["counts"][rows], minlength=size).reshape(n_buckets, n_providers)
+    first_row = np.full(size, len(series["amounts"]), dtype=np.int64)
+    np.minimum.at(first_row, keys, rows)
+    first_row = first_row.reshape(n_buckets, n_providers)
+
+    result = []
+    for bucket in range(n_buckets):
+        present = np.flatnonzero(counts[bucket] > 0)
+        order = present[np.lexsort((first_row[bucket, present], -amounts[bucket, present]))][:limit]
+        result.append(
+            [
+                {
+                    "cif": series["cifs"][code] or None,
+                    "name": series["names"][first_row[bucket, code]] or "Proveedor sin nombre",
+                    "amount": float(amounts[bucket, code]),
+                    "invoices": int(counts[bucket, code]),
+                }
+                for code in order
+            ]
+        )
+    return result
+
+
+def delayed_weekly_totals(day_offsets: np.ndarray, amounts: np.ndarray, horizon_weeks: int, delays) -> np.ndarray:
+    """
+    Totales semanales para cada retraso de `delays` (matriz retrasos x semanas).
+    La serie se colapsa antes por día para que cada retraso sea barato.
+    """
+    first_day = int(day_offsets.min()) if day_offsets.size else 0
+    daily_amounts = np.bincount(day_offsets - first_day, weights=amounts)
+    days = np.arange(daily_amounts.size, dtype=np.int64) + first_day
+    return np.stack([weekly_totals(days, daily_amounts, horizon_weeks, int(delay)) for delay in delays])
+
+
+def parameter_axis(start: float, stop: float, step: float, lower: float, upper: float, max_points: int = 64) -> np.ndarray:
+    """Valores [start, stop] con paso `step`, recortados a [lower, upper] y a max_points."""
+    start = min(max(start, lower), upper)
+    stop = min(max(stop, start), upper)
+    if step <= 0 or stop == start:
+        return np.array([start], dtype=np.float64)
+    points = min(int(np.floor((stop - start) / step + 1e-9)) + 1, max_points)
+    return np.round(start + step * np.arange(points), 2)
+
+
+def evaluate_grid(
+    day_offsets: np.ndarray,
+    amounts: np.ndarray,
+    horizon_weeks: int,
+    delays: np.ndarray,
+    stresses: np.ndarray,
+) -> dict:
+    """
+    Evalúa todos los retrasos y estreses sobre los mismos cubos semanales. Las
+    series se devuelven factorizadas (una fila por retraso y por estrés): el
+    saldo de cualquier combinación, saldo inicial y reserva se obtiene con una
+    suma acumulada en el cliente.
+    """
+    scheduled = weekly_totals(day_offsets, amounts, horizon_weeks)
+    return {
+        "scheduled_amounts": scheduled,
+        "delayed_amounts": delayed_weekly_totals(day_offsets, amounts, horizon_weeks, delays),
+        "stressed_amounts": scheduled[None, :] * (1 + stresses[:, None] / 100),
+    }
+
+
+def monte_carlo_projection(
+    day_offsets: np.ndarray,
+    amounts: np.ndarray,
+    horizon_weeks: int,
+    opening_balance: float,
+    reserve_balance: float,
+    max_delay_days: int,
+    stress_pct: float,
+    scenarios: int,
+    seed: int,
+) -> dict:
+    """
+    Escenarios de saldo semanal muestreados como una matriz (escenarios x semanas):
+    - retraso de pago por escenario, uniforme en [0, max_delay_days]
+    - shock de importe por escenario y semana, multiplicador ~ N(1, stress_pct/100) (>= 0)
+    Los totales semanales de cada retraso posible se calculan una sola vez
+    sobre la serie diaria y cada escenario selecciona su fila.
+    """
+    rng = np.random.default_rng(seed)
+    delay_totals = delayed_weekly_totals(day_offsets, amounts, horizon_weeks, range(max_delay_days + 1))
+    delays = rng.integers(0, max_delay_days + 1, scenarios)
+    shocks = np.clip(rng.normal(1.0, stress_pct / 100, (scenarios, horizon_weeks)), 0.0, None)
+
+    balances = opening_balance - np.cumsum(delay_totals[delays] * shocks, axis=1)
+    p5, p50, p95 = np.percentile(balances, [5, 50, 95], axis=0)
+    negative = balances < 0
+    below_reserve = balances < reserve_balance
+
+    return {
+        "p5": p5,
+        "p50": p50,
+        "p95": p95,
+        "weekly_shortfall_probability": negative.mean(axis=0),
+        "weekly_reserve_breach_probability": below_reserve.mean(axis=0),
+        "shortfall_probability": float(negative.any(axis=1).mean()),
+        "reserve_breach_probability": float(below_reserve.any(axis=1).mean()),
+    }
+
+
+def daily_totals(day_offsets: np.ndarray, amounts: np.ndarray, horizon_days: int, shift_days: int = 0) -> np.ndarray:
+    """Importe por día del horizonte [0, horizon_days) con los vencimientos desplazados shift_days."""
+    shifted = day_offsets + shift_days
+    inside = (shifted >= 0) & (shifted < horizon_days)
+    return np.bincount(shifted[inside], weights=amounts[inside], minlength=horizon_days)
+
+
+def treasury_projection(
+    db: Session,
+    today: date,
+    opening_balance: float,
+    reserve_balance: float,
+    horizon_weeks: int,
+    payment_delay_days: int,
+    stress_pct: float,
+    due_series: dict | None = None,
+) -> dict:
+    """
+    Proyección semanal del simulador (escenarios base, retrasado y estresado),
+    top de proveedores por semana, exposición a 30 días y alertas. Los
+    parámetros llegan ya acotados; due_series permite reutilizar la serie si
+    el llamante ya la ha cargado (p. ej. para el modo Monte Carlo).
+    """
+    horizon_end = today + timedelta(days=horizon_weeks * 7 - 1)
+    next_30_days = today + timedelta(days=30)
+
+    # Vencimientos (sin ERROR) limitados en SQL a la ventana que puede caer
+    # dentro del horizonte con o sin retraso, cargados en arrays
+    if due_series is None:
+        due_series = load_due_series(db, today, today - timedelta(days=payment_delay_days), horizon_end)
+    provider_series = load_provider_series(db, today, today, max(horizon_end, next_30_days))
+
+    scheduled_amounts = weekly_totals(due_series["day_offsets"], due_series["amounts"], horizon_weeks)
+    delayed_amounts = weekly_totals(due_series["day_offsets"], due_series["amounts"], horizon_weeks, payment_delay_days)
+    weekly_providers = top_providers_by_bucket(
+        provider_series, week_buckets(provider_series["day_offsets"], horizon_weeks), horizon_weeks, limit=3
+    )
+
+    scheduled_balance = opening_balance
+    delayed_balance = opening_balance
+    stressed_balance = opening_balance
+    stress_multiplier = 1 + (stress_pct / 100)
+    weekly_projection = []
+
+    for index in range(horizon_weeks):
+        week_start = today + timedelta(days=index * 7)
+        week_end = week_start + timedelta(days=6)
+
+        scheduled_amount = float(scheduled_amounts[index])
+        delayed_amount = float(delayed_amounts[index])
+        stressed_amount = scheduled_amount * stress_multiplier
+        scheduled_balance -= scheduled_amount
+        delayed_balance -= delayed_amount
+        stressed_balance -= stressed_amount
+
+        weekly_projection.append(
+            {
+                "label": f"S{index + 1}",
+                "range": f"{week_start.strftime('%d/%m')} - {week_end.strftime('%d/%m')}",
+                "scheduled_amount": round(scheduled_amount, 2),
+                "delayed_amount": round(delayed_amount, 2),
+                "stressed_amount": round(stressed_amount, 2),
+                "scheduled_balance": round(scheduled_balance, 2),
+                "delayed_balance": round(delayed_balance, 2),
+                "stressed_balance": round(stressed_balance, 2),
+                "available_after_reserve": round(scheduled_balance - reserve_balance, 2),
+                "providers": weekly_providers[index],
+            }
+        )
+
+    exposure_days = provider_series["day_offsets"]
+    exposure_buckets = np.where((exposure_days >= 0) & (exposure_days <= 30), 0, -1)
+    top_exposures = top_providers_by_bucket(provider_series, exposure_buckets, 1, limit=5)[0]
+    upcoming_total = round(sum(item["amount"] for item in top_exposures), 2)
+
+    alerts = []
+    first_shortfall_week = next((week for week in weekly_projection if week["scheduled_balance"] < 0), None)
+    first_reserve_breach = next((week for week in weekly_projection if week["available_after_reserve"] < 0), None)
+    if first_shortfall_week:
+        alerts.append(
+            {
+                "type": "critical",
+                "message": f"El saldo cae por debajo de cero en {first_shortfall_week['range']}.",
+            }
+        )
+    if first_reserve_breach:
+        alerts.append(
+            {
+                "type": "warning",
+                "message": f"La reserva mínima se compromete en {first_reserve_breach['range']}.",
+            }
+        )
+    if top_exposures:
+        largest_exposure = top_exposures[0]
+        if upcoming_total and largest_exposure["amount"] / upcoming_total > 0.35:
+            alerts.append(
+                {
+                    "type": "info",
+                    "message": f"Alta concentración de pagos en {largest_exposure['name']} durante los próximos 30 días.",
+                }
+            )
+
+    return {
+        "opening_balance": opening_balance,
+        "reserve_balance": reserve_balance,
+        "payment_delay_days": payment_delay_days,
+        "stress_pct": stress_pct,
+        "weeks": weekly_projection,
+        "summary": {
+            "scheduled_total": round(sum(week["scheduled_amount"] for week in weekly_projection), 2),
+            "delayed_total": round(sum(week["delayed_amount"] for week in weekly_projection), 2),
+            "stressed_total": round(sum(week["stressed_amount"] for week in weekly_projection), 2),
+            "final_balance": round(weekly_projection[-1]["scheduled_balance"] if weekly_projection else opening_balance, 2),
+            "peak_week": max(weekly_projection, key=lambda week: week["scheduled_amount"], default=None),
+        },
+        "top_exposures": top_exposures,
+        "alerts": alerts,
+    }
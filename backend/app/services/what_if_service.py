@@ -0,0 +1,245 @@
+"""
+Sesiones "what-if" del simulador de tesorería.
+
+Una sesión guarda en memoria la proyección semanal ya agrupada (totales por
+semana e importes por proveedor y semana) junto con la semana actual de cada
+factura. Mover una factura o todo un proveedor a otra semana aplica deltas
+sobre los dos cubos afectados en lugar de recalcular la simulación.
+"""
+import heapq
+import threading
+import time
+import uuid
+from datetime import date, timedelta
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from ..models import Invoice, InvoiceStatus, Provider
+from ..utils.pagination import day_range
+
+
+class _Group:
+    """Facturas de un proveedor que están en la misma semana."""
+
+    __slots__ = ("week", "members")
+
+    def __init__(self, week: int):
+        self.week = week
+        self.members: set[int] = set()
+
+
+class WhatIfSession:
+    def __init__(
+        self,
+        today: date,
+        horizon_weeks: int,
+        opening_balance: float,
+        reserve_balance: float,
+        invoices: list[tuple[int, str | None, str | None, float, int]],
+    ):
+        self.today = today
+        self.horizon_weeks = horizon_weeks
+        self.opening_balance = opening_balance
+        self.reserve_balance = reserve_balance
+        self.lock = threading.Lock()
+
+        self.week_totals = [0.0] * horizon_weeks
+        # Por semana: cif -> [importe, nº facturas]
+        self.provider_weeks: list[dict[str, list]] = [{} for _ in range(horizon_weeks)]
+        self.provider_names: dict[str, str] = {}
+        # id factura -> (cif, importe) y su grupo (cif, semana) actual
+        self.invoices: dict[int, tuple[str, float]] = {}
+        self.invoice_groups: dict[int, _Group] = {}
+        self.groups: dict[tuple[str, int], _Group] = {}
+
+        for invoice_id, cif, name, amount, week in invoices:
+            key = cif or ""
+            self.provider_names.setdefault(key, name or "Proveedor sin nombre")
+            self.invoices[invoice_id] = (key, amount)
+            self._add_amount(key, week, amount, 1)
+            group = self._group(key, week)
+            group.members.add(invoice_id)
+            self.invoice_groups[invoice_id] = group
+
+    def _group(self, key: str, week: int) -> _Group:
+        group = self.groups.get((key, week))
+        if group is None:
+            group = self.groups[(key, week)] = _Group(week)
+        return group
+
+    def _add_amount(self, key: str, week: int, amount: float, count: int):
+        self.week_totals[week] += amount
+        entry = self.provider_weeks[week].setdefault(key, [0.0, 0])
+        entry[0] += amount
+        entry[1] += count
+        if entry[1] <= 0:
+            del self.provider_weeks[week][key]
+
+    def _check_week(self, week: int):
+        if not 0 <= week < self.horizon_weeks:
+            raise ValueError(f"La semana debe estar entre 0 y {self.horizon_weeks - 1}")
+
+    def move_invoice(self, invoice_id: int, to_week: int) -> list[int]:
+        """Mueve una factura a otra semana. Devuelve las semanas modificadas."""
+        self._check_week(to_week)
+        if invoice_id not in self.invoices:
+            raise KeyError(invoice_id)
+        key, amount = self.invoices[invoice_id]
+        group = self.invoice_groups[invoice_id]
+        from_week = group.week
+        if from_week == to_week:
+            return []
+
+        group.members.discard(invoice_id)
+        if not group.members:
+            del self.groups[(key, from_week)]
+        target = self._group(key, to_week)
+        target.members.add(invoice_id)
+        self.invoice_groups[invoice_id] = target
+
+        self._add_amount(key, from_week, -amount, -1)
+        self._add_amount(key, to_week, amount, 1)
+        return [from_week, to_week]
+
+    def move_provider(self, cif: str | None, from_week: int, to_week: int) -> list[int]:
+        """Mueve todas las facturas de un proveedor de una semana a otra."""
+        self._check_week(from_week)
+        self._check_week(to_week)
+        key = cif or ""
+        source = self.groups.pop((key, from_week), None)
+        if source is None:
+            raise KeyError(cif)
+        if from_week == to_week:
+            self.groups[(key, from_week)] = source
+            return []
+
+        amount, count = self.provider_weeks[from_week][key]
+        target = self.groups.get((key, to_week))
+        if target is None:
+            # Caso habitual: el grupo entero cambia de semana sin tocar sus facturas
+            source.week = to_week
+            self.groups[(key, to_week)] = source
+        else:
+            # Fusión del grupo pequeño en el grande (coste amortizado constante)
+            small, large = sorted((source, target), key=lambda group: len(group.members))
+            for invoice_id in small.members:
+                self.invoice_groups[invoice_id] = large
+            large.members |= small.members
+            large.week = to_week
+            self.groups[(key, to_week)] = large
+
+        self._add_amount(key, from_week, -amount, -count)
+        self._add_amount(key, to_week, amount, count)
+        return [from_week, to_week]
+
+    def top_providers(self, week: int, limit: int = 3) -> list[dict]:
+        ranked = heapq.nlargest(limit, self.provider_weeks[week].items(), key=lambda item: item[1][0])
+        return [
+            {
+                "cif": key or None,
+                "name": self.provider_names[key],
+                "amount": round(amount, 2),
+                "invoices": count,
+            }
+            for key, (amount, count) in ranked
+        ]
+
+    def projection(self, provider_weeks: list[int] | None = None) -> dict:
+        """
+        Saldo semana a semana (O(semanas)). El desglose por proveedor se incluye
+        sólo en las semanas indicadas (todas si provider_weeks es None).
+        """
+        detailed = set(range(self.horizon_weeks) if provider_weeks is None else provider_weeks)
+        balance = self.opening_balance
+        weeks = []
+        for index, amount in enumerate(self.week_totals):
+            week_start = self.today + timedelta(days=index * 7)
+            week_end = week_start + timedelta(days=6)
+            balance -= amount
+            week = {
+                "index": index,
+                "label": f"S{index + 1}",
+                "range": f"{week_start.strftime('%d/%m')} - {week_end.strftime('%d/%m')}",
+                "scheduled_amount": round(amount, 2),
+                "scheduled_balance": round(balance, 2),
+                "available_after_reserve": round(balance - self.reserve_balance, 2),
+            }
+            if index in detailed:
+                week["providers"] = self.top_providers(index)
+            weeks.append(week)
+        return {
+            "opening_balance": self.opening_balance,
+            "reserve_balance": self.reserve_balance,
+            "weeks": weeks,
+            "final_balance": round(balance, 2),
+        }
+
+
+def load_what_if_session(
+    db: Session, today: date, horizon_weeks: int, opening_balance: float, reserve_balance: float
+) -> WhatIfSession:
+    """Carga las facturas (sin ERROR) que vencen dentro del horizonte y las agrupa por semana."""
+    lower, upper = day_range(today, today + timedelta(days=horizon_weeks * 7 - 1))
+    rows = (
+        db.query(
+            Invoice.id,
+            Invoice.cif,
+            func.coalesce(Provider.name, Invoice.nombre),
+            Invoice.importe,
+            Invoice.fecha_vencimiento,
+        )
+        .outerjoin(Provider, Provider.cif == Invoice.cif)
+        .filter(
+            Invoice.fecha_vencimiento >= lower,
+            Invoice.fecha_vencimiento < upper,
+            Invoice.status != InvoiceStatus.ERROR,
+        )
+        .order_by(Invoice.fecha_vencimiento, Invoice.id)
+        .all()
+    )
+    invoices = [
+        (invoice_id, cif, name, float(amount or 0.0), (due.date() - today).days // 7)
+        for invoice_id, cif, name, amount, due in rows
+    ]
+    return WhatIfSession(today, horizon_weeks, opening_balance, reserve_balance, invoices)
+
+
+class WhatIfStore:
+    """Sesiones what-if en memoria con caducidad por inactividad."""
+
+    def __init__(self, ttl_seconds: float = 1800.0, max_entries: int = 64):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: dict[str, tuple[float, WhatIfSession]] = {}
+        self._lock = threading.Lock()
+
+    def _purge(self, now: float):
+        expired = [key for key, (seen, _session) in self._entries.items() if now - seen >= self.ttl_seconds]
+        for key in expired:
+            del self._entries[key]
+        while len(self._entries) >= self.max_entries:
+            oldest = min(self._entries, key=lambda key: self._entries[key][0])
+            del self._entries[oldest]
+
+    def add(self, session: WhatIfSession) -> str:
+        session_id = uuid.uuid4().hex
+        with self._lock:
+            now = time.monotonic()
+            self._purge(now)
+            self._entries[session_id] = (now, session)
+        return session_id
+
+    def get(self, session_id: str) -> WhatIfSession | None:
+        with self._lock:
+            now = time.monotonic()
+            entry = self._entries.get(session_id)
+            if entry is None or now - entry[0] >= self.ttl_seconds:
+                self._entries.pop(session_id, None)
+                return None
+            self._entries[session_id] = (now, entry[1])
+            return entry[1]
+
+    def remove(self, session_id: str) -> bool:
+        with self._lock:
+            return self._entries.pop(session_id, None) is not None
@@ -0,0 +1,75 @@
+import base64
+import json
+import time
+from datetime import date, datetime, time as dt_time, timedelta
+from typing import Any, Callable
+
+from fastapi import HTTPException
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+
+def encode_cursor(*values: Any) -> str:
+    """Serializa la clave de la última fila de una página en un cursor opaco."""
+    payload = [value.isoformat() if isinstance(value, datetime) else value for value in values]
+    return base64.urlsafe_b64encode(json.dumps(payload).encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor: str, *types: type) -> tuple:
+    """Recupera la clave de un cursor generado con encode_cursor (400 si no es válido)."""
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        if len(payload) != len(types):
+            raise ValueError("unexpected cursor length")
+        return tuple(
+            datetime.fromisoformat(value) if kind is datetime else kind(value)
+            for value, kind in zip(payload, types)
+        )
+    except (ValueError, TypeError, UnicodeError):
+        raise HTTPException(status_code=400, detail="Invalid pagination cursor")
+
+
+def day_range(start_date: date | None, end_date: date | None) -> tuple[datetime | None, datetime | None]:
+    """
+    Convierte un rango de fechas inclusivo en límites [inicio, fin) sobre
+    timestamps, para filtrar sin envolver la columna en func.date() y poder usar su índice.
+    """
+    lower = datetime.combine(start_date, dt_time.min) if start_date else None
+    upper = datetime.combine(end_date + timedelta(days=1), dt_time.min) if end_date else None
+    return lower, upper
+
+
+def estimate_table_rows(db: Session, table_name: str) -> int | None:
+    """Estimación del planner de PostgreSQL (pg_class.reltuples); None en otros motores."""
+    if db.get_bind().dialect.name != "postgresql":
+        return None
+    estimate = db.execute(
+        text("SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(:table_name)"),
+        {"table_name": table_name},
+    ).scalar()
+    if estimate is None or estimate < 0:
+        return None
+    return int(estimate)
+
+
+class TotalCache:
+    """Caché en memoria con TTL para los totales de listados paginados."""
+
+    def __init__(self, ttl_seconds: float = 30.0, max_entries: int = 256):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: dict[Any, tuple[float, int]] = {}
+
+    def get_or_compute(self, key: Any, compute: Callable[[], int]) -> int:
+        now = time.monotonic()
+        cached = self._entries.get(key)
+        if cached and now - cached[0] < self.ttl_seconds:
+            return cached[1]
+        value = compute()
+        if len(self._entries) >= self.max_entries:
+            self._entries.clear()
+        self._entries[key] = (now, value)
+        return value
+
+    def clear(self):
+        self._entries.clear()
@@ -0,0 +1,24 @@
+from datetime import date
+
+from sqlalchemy import String, cast, func
+from sqlalchemy.orm import Session
+
+
+def shift_months(day: date, months: int) -> date:
+    """Primer día del mes natural desplazado `months` meses respecto a `day`."""
+    month_index = day.year * 12 + (day.month - 1) + months
+    return date(month_index // 12, month_index % 12 + 1, 1)
+
+
+def month_key(db: Session, column):
+    """Expresión 'YYYY-MM' del mes natural de una columna fecha (PostgreSQL y SQLite)."""
+    if db.get_bind().dialect.name == "postgresql":
+        return func.to_char(column, "YYYY-MM")
+    return func.strftime("%Y-%m", column)
+
+
+def day_key(db: Session, column):
+    """Expresión 'YYYY-MM-DD' del día de una columna fecha (PostgreSQL y SQLite)."""
+    if db.get_bind().dialect.name == "postgresql":
+        return func.to_char(column, "YYYY-MM-DD")
+    return cast(func.date(column), String)
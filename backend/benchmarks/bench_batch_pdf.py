@@ -0,0 +1,86 @@
+"""
+Benchmark de la orden de confirming en PDF para remesas grandes.
+
+Compara el dibujo directo en canvas (generate_large_batch_pdf) con el Table
+de platypus (generate_batch_pdf). Cada medición corre en un proceso aparte
+para que el pico de memoria (RSS) de una no contamine a la siguiente; las
+facturas se generan al vuelo para que sólo cuente la memoria del render.
+
+Uso (desde backend/):
+    python -m benchmarks.bench_batch_pdf --sizes 1000 5000 10000 25000 50000 --legacy-max 5000
+"""
+import argparse
+import multiprocessing
+import os
+import resource
+import time
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+os.environ.setdefault("SECRET_KEY", "benchmark")
+
+from app.services.pdf_service import generate_batch_pdf, generate_large_batch_pdf  # noqa: E402
+
+
+def iter_invoices(rows: int):
+    base = datetime(2030, 1, 1)
+    for index in range(rows):
+        yield SimpleNamespace(
+            factura=f"F-{index:07d}",
+            nombre=f"Proveedor de servicios {index % 3000}",
+            cif=f"B{index % 3000:08d}",
+            fecha_vencimiento=base + timedelta(days=index % 90),
+            importe=round(100 + index * 0.37, 2),
+        )
+
+
+def _current_rss_kib() -> int:
+    with open("/proc/self/statm") as handle:
+        return int(handle.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") // 1024
+
+
+def _run(mode: str, rows: int, results):
+    batch = SimpleNamespace(id=1, name="Benchmark", created_at=datetime(2030, 1, 1), payment_date=datetime(2030, 2, 1))
+    if mode == "legacy":
+        # El Table necesita la lista completa (batch.invoices)
+        batch.invoices = list(iter_invoices(rows))
+    baseline = _current_rss_kib()
+    started = time.perf_counter()
+    if mode == "canvas":
+        content = generate_large_batch_pdf(batch, iter_invoices(rows))
+    else:
+        content = generate_batch_pdf(batch)
+    elapsed = time.perf_counter() - started
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    results.put((elapsed, max(peak - baseline, 0), len(content)))
+
+
+def measure(mode: str, rows: int):
+    context = multiprocessing.get_context("fork")
+    results = context.Queue()
+    process = context.Process(target=_run, args=(mode, rows, results))
+    process.start()
+    outcome = results.get()
+    process.join()
+    return outcome
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 5000, 10000, 25000, 50000])
+    parser.add_argument("--legacy-max", type=int, default=5000, help="tamaño máximo para el Table de platypus")
+    args = parser.parse_args()
+
+    print(f"{'mode':<8}{'rows':>8}{'time s':>10}{'us/row':>9}{'peak MiB':>10}{'pdf MiB':>9}")
+    for rows in args.sizes:
+        modes = ["canvas"] + (["legacy"] if rows <= args.legacy_max else [])
+        for mode in modes:
+            elapsed, peak_kib, size = measure(mode, rows)
+            print(
+                f"{mode:<8}{rows:>8}{elapsed:>10.2f}{elapsed / rows * 1e6:>9.0f}"
+                f"{peak_kib / 1024:>10.1f}{size / 2**20:>9.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
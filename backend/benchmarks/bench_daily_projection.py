@@ -0,0 +1,71 @@
+"""
+Benchmark de la proyección diaria a dos años sobre el rollup de vencimientos.
+
+Rellena invoice_daily_status en una SQLite en memoria con varios años de
+histórico (equivalente a millones de facturas ya agregadas por día) y mide
+GET /batches/treasury-simulator/daily llamado directamente.
+
+Uso (desde backend/):
+    python -m benchmarks.bench_daily_projection --years 6
+"""
+import argparse
+import os
+import time
+from datetime import date, timedelta
+
+import numpy as np
+
+os.environ.setdefault("SECRET_KEY", "benchmark")
+
+from sqlalchemy import create_engine, insert  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+from app.database import Base  # noqa: E402
+from app.models import InvoiceDailyStatus, InvoiceStatus  # noqa: E402
+from app.routers.batch_router import get_treasury_daily_projection  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--years", type=int, default=6)
+    parser.add_argument("--invoices-per-day", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+
+    rng = np.random.default_rng(11)
+    first_day = date.today() - timedelta(days=365 * (args.years - 2))
+    days = 365 * args.years
+    rows = []
+    for offset in range(days):
+        for status in (InvoiceStatus.VALID, InvoiceStatus.WARNING, InvoiceStatus.ERROR):
+            count = int(rng.poisson(args.invoices_per_day / 3))
+            rows.append(
+                {
+                    "due_date": first_day + timedelta(days=offset),
+                    "status": status,
+                    "invoice_count": count,
+                    "total_amount": float(count * rng.gamma(2.0, 900.0)),
+                }
+            )
+    db.execute(insert(InvoiceDailyStatus), rows)
+    db.commit()
+    invoices = sum(row["invoice_count"] for row in rows)
+
+    timings = []
+    for _ in range(args.repeat):
+        started = time.perf_counter()
+        get_treasury_daily_projection(
+            opening_balance=1e8, reserve_balance=1e6, horizon_days=730, payment_delay_days=15, stress_pct=10, db=db
+        )
+        timings.append(time.perf_counter() - started)
+
+    print(f"{args.years} years of history (~{invoices:,} invoices, {len(rows):,} rollup rows), 730-day horizon")
+    print(f"best {min(timings) * 1000:.1f} ms  median {sorted(timings)[len(timings) // 2] * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""
+Benchmark del modo Monte Carlo del simulador de tesorería.
+
+Uso (desde backend/):
+    python -m benchmarks.bench_monte_carlo
+    python -m benchmarks.bench_monte_carlo --scenarios 50000 --weeks 52 --max-delay 45
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+
+os.environ.setdefault("SECRET_KEY", "benchmark")
+
+from app.services.treasury_service import monte_carlo_projection  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--invoices", type=int, default=1_000_000)
+    parser.add_argument("--scenarios", type=int, default=10_000)
+    parser.add_argument("--weeks", type=int, default=52)
+    parser.add_argument("--max-delay", type=int, default=45)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(3)
+    day_offsets = np.sort(rng.integers(-args.max_delay, args.weeks * 7, args.invoices))
+    amounts = np.round(rng.gamma(2.0, 900.0, args.invoices), 2)
+    opening_balance = float(amounts.sum()) * 0.9
+
+    timings = []
+    for _ in range(args.repeat):
+        started = time.perf_counter()
+        result = monte_carlo_projection(
+            day_offsets, amounts, args.weeks, opening_balance, opening_balance * 0.1,
+            args.max_delay, 12.5, args.scenarios, seed=42,
+        )
+        timings.append(time.perf_counter() - started)
+
+    print(f"{args.scenarios:,} scenarios x {args.weeks} weeks over {args.invoices:,} invoices")
+    print(f"best {min(timings) * 1000:.1f} ms  median {sorted(timings)[len(timings) // 2] * 1000:.1f} ms")
+    print(f"shortfall probability {result['shortfall_probability']:.3f}")
+
+
+if __name__ == "__main__":
+    main()
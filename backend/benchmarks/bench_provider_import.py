@@ -0,0 +1,132 @@
+"""
+Benchmark de la importación del maestro de proveedores (POST /providers/upload).
+
+Genera un Excel de N proveedores con un par de filas de título antes de la
+cabecera, precarga la mitad de los CIF en una SQLite en memoria y mide la
+importación en streaming con UPSERT por bloques frente a la versión anterior
+(pandas leyendo el fichero dos veces + una consulta y un objeto ORM por fila).
+
+Uso (desde backend/):
+    python -m benchmarks.bench_provider_import --rows 30000
+    python -m benchmarks.bench_provider_import --skip-reference
+"""
+import argparse
+import io
+import os
+import time
+
+os.environ.setdefault("SECRET_KEY", "benchmark")
+
+import openpyxl  # noqa: E402
+import pandas as pd  # noqa: E402
+from fastapi import UploadFile  # noqa: E402
+from sqlalchemy import create_engine, insert  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+from app.database import Base  # noqa: E402
+from app.models import Provider  # noqa: E402
+from app.routers.providers_router import normalize_columns, upload_providers  # noqa: E402
+
+HEADERS = ["N.I.F.", "Nombre fiscal", "Domicilio", "Población", "Cód. Postal", "E-mail", "IBAN del banco", "Teléfono", "País"]
+
+
+def build_workbook(rows: int) -> bytes:
+    workbook = openpyxl.Workbook(write_only=True)
+    sheet = workbook.create_sheet()
+    sheet.append(["Maestro de proveedores"])
+    sheet.append([])
+    sheet.append(HEADERS)
+    for index in range(rows):
+        sheet.append([
+            f"B{index:08d}",
+            f"Proveedor {index} SL",
+            f"Calle {index}",
+            "Madrid",
+            28000 + index % 100,
+            f"proveedor{index}@example.com" if index % 5 else None,
+            "ES9121000418450200051332",
+            600000000 + index,
+            "España",
+        ])
+    buffer = io.BytesIO()
+    workbook.save(buffer)
+    return buffer.getvalue()
+
+
+def fresh_session(existing: int):
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine, autoflush=False)()
+    db.execute(insert(Provider), [{"cif": f"B{index:08d}", "name": f"Antiguo {index}"} for index in range(0, existing * 2, 2)])
+    db.commit()
+    return db
+
+
+def reference_import(content: bytes, db) -> int:
+    """Versión anterior: escaneo headerless con iterrows, relectura y una consulta por fila."""
+    df_scan = pd.read_excel(io.BytesIO(content), header=None, engine="openpyxl")
+    header_index = -1
+    for idx, row in df_scan.iterrows():
+        if any(str(val).upper().strip().replace(".", "") in ["CIF", "NIF"] for val in row.values):
+            header_index = idx
+            break
+    df = pd.read_excel(io.BytesIO(content), header=header_index, engine="openpyxl")
+    df.columns = [str(c).upper().strip() for c in df.columns]
+    col_map = normalize_columns(df.columns)
+    count = 0
+    for _idx, row in df.iterrows():
+        val_cif = row.get(col_map.get("CIF"))
+        if pd.isna(val_cif):
+            continue
+        cif = str(val_cif).strip()
+        provider = db.query(Provider).filter(Provider.cif == cif).first()
+        if not provider:
+            provider = Provider(cif=cif)
+            db.add(provider)
+
+        def get_s(key):
+            real_col = col_map.get(key)
+            if not real_col:
+                return None
+            val = row.get(real_col)
+            return str(val).strip() if pd.notna(val) else None
+
+        provider.name = get_s("NAME") or provider.name
+        provider.email = get_s("EMAIL")
+        provider.address = get_s("ADDRESS")
+        provider.city = get_s("CITY")
+        provider.zip_code = get_s("ZIP")
+        provider.iban = get_s("IBAN")
+        provider.phone = get_s("PHONE")
+        provider.country = get_s("COUNTRY")
+        count += 1
+    db.commit()
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=30_000)
+    parser.add_argument("--skip-reference", action="store_true")
+    args = parser.parse_args()
+
+    content = build_workbook(args.rows)
+    print(f"{args.rows:,} providers ({len(content) / 1024:.0f} KiB xlsx, {args.rows // 2:,} already stored)")
+
+    db = fresh_session(args.rows // 2)
+    started = time.perf_counter()
+    result = upload_providers(UploadFile(io.BytesIO(content), filename="maestro.xlsx"), db)
+    print(f"streaming + chunked upsert  {time.perf_counter() - started:8.2f} s  {result['message']}")
+    stored = db.query(Provider).count()
+
+    if args.skip_reference:
+        return
+    db = fresh_session(args.rows // 2)
+    started = time.perf_counter()
+    count = reference_import(content, db)
+    print(f"reference (per-row ORM)     {time.perf_counter() - started:8.2f} s  Processed {count} providers")
+    print("same provider count:", stored == db.query(Provider).count())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""
+Benchmark de GET /providers/{cif}/stats con proveedores muy grandes.
+
+Rellena una SQLite en memoria con un proveedor de N facturas (repartidas en
+remesas, con un % de duplicados) más ruido de otros proveedores, y mide el
+endpoint llamado directamente (lee provider_summary) frente al cálculo
+anterior (carga de todas las facturas del CIF + agrupación de duplicados en
+Python). Cuenta además las sentencias SQL que lanza cada variante y mide lo
+que cuesta recalcular la fila del proveedor (lo que se paga al crear o
+borrar uno de sus lotes).
+
+Uso (desde backend/):
+    python -m benchmarks.bench_provider_stats --invoices 50000
+"""
+import argparse
+import os
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+os.environ.setdefault("SECRET_KEY", "benchmark")
+
+from sqlalchemy import create_engine, event, func, insert  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+from app.database import Base  # noqa: E402
+from app.models import Batch, Invoice, InvoiceStatus, Provider  # noqa: E402
+from app.routers.providers_router import get_provider_stats  # noqa: E402
+from app.services.duplicate_service import summarize_duplicate_groups  # noqa: E402
+from app.services.provider_summary_service import refresh_provider_summaries  # noqa: E402
+
+CIF = "B00000001"
+
+
+def seed(db, n_invoices: int, noise: int, batch_size: int = 500, duplicate_ratio: float = 0.02):
+    rng = np.random.default_rng(5)
+    today = datetime.combine(datetime.now().date(), datetime.min.time())
+    n_batches = max(1, n_invoices // batch_size)
+    db.execute(
+        insert(Batch),
+        [
+            {
+                "name": f"Remesa {index}",
+                "created_at": today - timedelta(days=int(n_batches - index)),
+                "payment_date": today - timedelta(days=int(n_batches - index) - 5) if index % 3 else None,
+            }
+            for index in range(n_batches)
+        ],
+    )
+    batch_ids = [batch_id for (batch_id,) in db.query(Batch.id).order_by(Batch.id)]
+    db.add(Provider(cif=CIF, name="Proveedor grande SL", email="grande@example.com", iban="ES9121000418450200051332"))
+
+    offsets = rng.integers(-120, 120, n_invoices)
+    amounts = np.round(rng.gamma(2.0, 900.0, n_invoices), 2)
+    rows = []
+    for index in range(n_invoices):
+        # Un % de las facturas repite referencia, importe y vencimiento de la anterior
+        source = index - 1 if index and rng.random() < duplicate_ratio else index
+        rows.append(
+            {
+                "batch_id": batch_ids[index % len(batch_ids)],
+                "cif": CIF,
+                "nombre": "Proveedor grande SL",
+                "factura": f"F-{source:07d}",
+                "importe": float(amounts[source]),
+                "fecha_vencimiento": today + timedelta(days=int(offsets[source])),
+                "status": InvoiceStatus.VALID,
+            }
+        )
+    for index in range(noise):
+        rows.append(
+            {
+                "batch_id": batch_ids[index % len(batch_ids)],
+                "cif": f"B{index % 2000 + 2:08d}",
+                "factura": f"N-{index:07d}",
+                "importe": float(amounts[index % n_invoices]),
+                "fecha_vencimiento": today + timedelta(days=int(offsets[index % n_invoices])),
+                "status": InvoiceStatus.VALID,
+            }
+        )
+    for start in range(0, len(rows), 10_000):
+        db.execute(insert(Invoice), rows[start:start + 10_000])
+    db.commit()
+
+
+def reference_stats(cif: str, db) -> dict:
+    """Cálculo anterior: una consulta por métrica y todas las facturas del CIF en memoria."""
+    db.query(Provider).filter(Provider.cif == cif).first()
+    db.query(Invoice).filter(Invoice.cif == cif).order_by(Invoice.id.desc()).first()
+    provider_invoices = db.query(Invoice).filter(Invoice.cif == cif).order_by(Invoice.id.desc()).all()
+    total_amount, total_invoices, _avg = db.query(
+        func.sum(Invoice.importe), func.count(Invoice.id), func.avg(Invoice.importe)
+    ).filter(Invoice.cif == cif).first()
+    db.query(Batch).join(Invoice).filter(Invoice.cif == cif, Batch.payment_date.isnot(None)).order_by(
+        Batch.payment_date.desc()
+    ).first()
+    groups = summarize_duplicate_groups(provider_invoices)
+    db.query(Batch.created_at, func.sum(Invoice.importe), func.count(Invoice.id)).join(Invoice).filter(
+        Invoice.cif == cif, Batch.created_at >= datetime.utcnow() - timedelta(days=180)
+    ).group_by(Batch.created_at).all()
+    return {
+        "total_invoices": total_invoices,
+        "total_amount": total_amount,
+        "duplicate_invoices_count": sum(group["occurrences"] for group in groups),
+    }
+
+
+def measure(fn, db, repeat: int):
+    statements = []
+
+    def count_statement(*_args):
+        statements.append(1)
+
+    event.listen(db.get_bind(), "before_cursor_execute", count_statement)
+    timings = []
+    try:
+        for _ in range(repeat):
+            db.expunge_all()
+            started = time.perf_counter()
+            result = fn(CIF, db)
+            timings.append(time.perf_counter() - started)
+    finally:
+        event.remove(db.get_bind(), "before_cursor_execute", count_statement)
+    return result, sorted(timings)[len(timings) // 2], len(statements) // repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--invoices", type=int, default=50_000)
+    parser.add_argument("--noise", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+    seed(db, args.invoices, args.noise)
+    started = time.perf_counter()
+    refresh_provider_summaries(db, [CIF])
+    db.commit()
+    refresh_elapsed = time.perf_counter() - started
+
+    stats, elapsed, queries = measure(get_provider_stats, db, args.repeat)
+    reference, reference_elapsed, reference_queries = measure(reference_stats, db, args.repeat)
+
+    print(f"provider with {args.invoices:,} invoices ({args.noise:,} from other providers)")
+    print(f"summary refresh           {refresh_elapsed * 1000:8.1f} ms")
+    print(f"provider_summary   median {elapsed * 1000:8.1f} ms  {queries} statements")
+    print(f"reference          median {reference_elapsed * 1000:8.1f} ms  {reference_queries} statements")
+    print(
+        "same totals and duplicates:",
+        all(stats[key] == reference[key] or abs(stats[key] - reference[key]) < 1e-6 for key in reference),
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,6 @@
 from app.database import SessionLocal, engine, Base
 from app import models
+from app.services.rollup_service import rebuild_rollups
 from datetime import datetime, timedelta
 import random
 
@@ -67,6 +68,8 @@ def populate_db():
                     )
                     db.add(invoice)
 
+        db.flush()
+        rebuild_rollups(db)
         db.commit()
         print("Database population complete!")
     except Exception as e:
@@ -0,0 +1,36 @@
+"""
+Comprueba y reconstruye los agregados desnormalizados de batches
+(invoice_count, total_amount, issues_count) a partir de invoices.
+
+Uso:
+    python rebuild_batch_aggregates.py          # informa y corrige
+    python rebuild_batch_aggregates.py --check  # sólo informa (exit 1 si hay desajustes)
+"""
+import sys
+
+from app.database import SessionLocal
+from app.services.batch_service import find_inconsistent_batches, rebuild_batch_aggregates
+
+
+def main(check_only: bool = False) -> int:
+    db = SessionLocal()
+    try:
+        mismatches = find_inconsistent_batches(db)
+        for item in mismatches:
+            print(f"Batch #{item['batch_id']}: stored={item['stored']} actual={item['actual']}")
+        print(f"{len(mismatches)} batch(es) with inconsistent aggregates.")
+
+        if check_only:
+            return 1 if mismatches else 0
+
+        if mismatches:
+            rebuild_batch_aggregates(db, [item["batch_id"] for item in mismatches])
+            db.commit()
+            print("Aggregates rebuilt.")
+        return 0
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main(check_only="--check" in sys.argv[1:]))
@@ -0,0 +1,25 @@
+"""
+Reconstruye provider_summary (resumen por proveedor) a partir de invoices.
+
+Uso:
+    python rebuild_provider_summary.py
+"""
+import sys
+
+from app.database import SessionLocal
+from app.services.provider_summary_service import refresh_provider_summaries
+
+
+def main() -> int:
+    db = SessionLocal()
+    try:
+        refresh_provider_summaries(db)
+        db.commit()
+        print("Provider summary rebuilt.")
+        return 0
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
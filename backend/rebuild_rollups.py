@@ -0,0 +1,35 @@
+"""
+Comprueba y reconstruye los rollups diarios de facturas
+(invoice_daily_status, invoice_daily_provider) a partir de invoices.
+
+Uso:
+    python rebuild_rollups.py          # informa y reconstruye
+    python rebuild_rollups.py --check  # sólo informa (exit 1 si hay desajustes)
+"""
+import sys
+
+from app.database import SessionLocal
+from app.services.rollup_service import find_rollup_drift, rebuild_rollups
+
+
+def main(check_only: bool = False) -> int:
+    db = SessionLocal()
+    try:
+        drift = find_rollup_drift(db)
+        for item in drift:
+            print(f"{item['due_date']} {item['status']}: stored={item['stored']} actual={item['actual']}")
+        print(f"{len(drift)} day(s) with inconsistent rollups.")
+
+        if check_only:
+            return 1 if drift else 0
+
+        rebuild_rollups(db)
+        db.commit()
+        print("Rollups rebuilt.")
+        return 0
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main(check_only="--check" in sys.argv[1:]))
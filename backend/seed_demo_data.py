@@ -13,6 +13,7 @@ if database_url.startswith("sqlite:///"):
 from app.database import Base, SessionLocal, engine
 from app.models import Batch, BatchStatus, Invoice, InvoiceStatus, Provider, Settings, User
 from app.services.auth import get_password_hash
+from app.services.rollup_service import rebuild_rollups
 
 
 def seed_demo_data():
@@ -244,6 +245,8 @@ def seed_demo_data():
                 )
                 db.add(invoice)
 
+        db.flush()
+        rebuild_rollups(db)
         db.commit()
         print("Demo DB creada correctamente")
         print("Usuario: admin")
@@ -6,6 +6,7 @@ from sqlalchemy.orm import sessionmaker
 
 # Set required env vars before importing app
 os.environ["SECRET_KEY"] = "test_secret_key_for_testing_only_12345678901234567890"
+os.environ["PROVIDER_SUMMARY_REFRESH_SECONDS"] = "0"
 
 # Add backend to path
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,208 @@
+import pytest
+from datetime import date, datetime
+from fastapi import HTTPException
+
+from app.models import Batch, Invoice, Provider
+from app.routers.batch_router import BatchInput, create_batch, delete_batch, get_batch, list_batch_invoices, list_batches
+from app.schemas import BatchSummary, InvoiceCreate, PaginatedBatches
+from app.services.batch_service import find_inconsistent_batches, rebuild_batch_aggregates
+
+
+def _invoice(cif, factura, importe, **extra):
+    return InvoiceCreate(
+        cif=cif,
+        nombre=f"Proveedor {cif}",
+        factura=factura,
+        importe=importe,
+        fecha_vencimiento=datetime(2030, 1, 15),
+        **extra,
+    )
+
+
+def test_create_batch_bulk_inserts_invoices(test_db):
+    batch_in = BatchInput(
+        name="Remesa bulk",
+        invoices=[
+            _invoice(" b12345678 ", "F-1", 100.0),
+            _invoice("B12345678", "F-2", 50.5, phone="600000000"),
+            _invoice("A87654321", "F-3", 10.0, duplicate_status="FILE", duplicate_count=1),
+        ],
+    )
+
+    response = create_batch(batch_in, test_db)
+
+    assert response["name"] == "Remesa bulk"
+    assert response["status"] == "GENERATED"
+    assert response["total_amount"] == pytest.approx(160.5)
+    assert [inv["factura"] for inv in response["invoices"]] == ["F-1", "F-2", "F-3"]
+    assert all(inv["status"] == "VALID" for inv in response["invoices"])
+    assert response["invoices"][0]["cif"] == "B12345678"
+
+    stored = test_db.query(Invoice).order_by(Invoice.id).all()
+    assert [inv.id for inv in stored] == [inv["id"] for inv in response["invoices"]]
+    assert {inv.batch_id for inv in stored} == {response["id"]}
+
+    provider = test_db.query(Provider).filter(Provider.cif == "B12345678").one()
+    assert provider.phone == "600000000"
+    assert test_db.query(Provider).count() == 2
+
+
+def test_create_batch_applies_global_payment_date(test_db):
+    batch_in = BatchInput(
+        name="Remesa con vencimiento",
+        payment_date=date(2030, 3, 1),
+        invoices=[_invoice("B12345678", "F-1", 100.0)],
+    )
+
+    response = create_batch(batch_in, test_db)
+
+    invoice = test_db.query(Invoice).one()
+    assert invoice.fecha_vencimiento == datetime(2030, 3, 1)
+    assert response["invoices"][0]["fecha_vencimiento"] == datetime(2030, 3, 1)
+    assert test_db.query(Batch).one().payment_date == datetime(2030, 3, 1)
+
+
+def test_list_batches_returns_summaries_without_invoices(test_db):
+    create_batch(BatchInput(name="Primera", invoices=[_invoice("B12345678", "F-1", 100.0)]), test_db)
+    create_batch(
+        BatchInput(name="Segunda", invoices=[_invoice("B12345678", "F-2", 20.0), _invoice("A87654321", "F-3", 5.0)]),
+        test_db,
+    )
+    test_db.add(Batch(name="Vacia", created_at=datetime(2000, 1, 1)))
+    test_db.commit()
+
+    result = PaginatedBatches.model_validate(list_batches(skip=0, limit=10, db=test_db))
+
+    assert result.total == 3
+    by_name = {item.name: item for item in result.items}
+    assert by_name["Segunda"].invoice_count == 2
+    assert by_name["Segunda"].total_amount == pytest.approx(25.0)
+    assert by_name["Segunda"].status == "GENERATED"
+    assert by_name["Vacia"].invoice_count == 0
+    assert by_name["Vacia"].total_amount == 0.0
+    assert "invoices" not in result.model_dump()["items"][0]
+    assert result.items[0].name == "Segunda"
+
+
+def test_list_batches_keyset_pagination_and_date_range(test_db):
+    same_instant = datetime(2030, 5, 10, 12, 0)
+    test_db.add_all(
+        [Batch(name=f"Lote {day}", created_at=datetime(2030, 5, day, 9, 30)) for day in range(1, 6)]
+        + [Batch(name="Empate A", created_at=same_instant), Batch(name="Empate B", created_at=same_instant)]
+    )
+    test_db.commit()
+
+    seen = []
+    cursor = None
+    while True:
+        page = list_batches(limit=3, cursor=cursor, total_mode="none", db=test_db)
+        assert page["total"] is None
+        seen.extend(batch.name for batch in page["items"])
+        cursor = page["next_cursor"]
+        if not cursor:
+            break
+
+    assert seen == ["Empate B", "Empate A", "Lote 5", "Lote 4", "Lote 3", "Lote 2", "Lote 1"]
+
+    ranged = list_batches(start_date=date(2030, 5, 2), end_date=date(2030, 5, 4), db=test_db)
+    assert ranged["total"] == 3
+    assert [batch.name for batch in ranged["items"]] == ["Lote 4", "Lote 3", "Lote 2"]
+
+
+def test_batch_aggregates_follow_invoice_changes(test_db):
+    response = create_batch(
+        BatchInput(name="Agregados", invoices=[_invoice("B12345678", "F-1", 100.0), _invoice("B12345678", "F-2", 40.0)]),
+        test_db,
+    )
+    batch = test_db.get(Batch, response["id"])
+    assert (batch.invoice_count, batch.total_amount, batch.issues_count) == (2, 140.0, 0)
+
+    extra = Invoice(batch_id=batch.id, cif="A87654321", importe=10.0, status="ERROR")
+    test_db.add(extra)
+    test_db.commit()
+    test_db.refresh(batch)
+    assert (batch.invoice_count, batch.total_amount, batch.issues_count) == (3, 150.0, 1)
+
+    extra.importe = 25.0
+    extra.status = "VALID"
+    test_db.commit()
+    test_db.refresh(batch)
+    assert (batch.invoice_count, batch.total_amount, batch.issues_count) == (3, 165.0, 0)
+
+    test_db.delete(extra)
+    test_db.commit()
+    test_db.refresh(batch)
+    assert (batch.invoice_count, batch.total_amount, batch.issues_count) == (2, 140.0, 0)
+    assert find_inconsistent_batches(test_db) == []
+
+
+def test_rebuild_batch_aggregates_repairs_drift(test_db):
+    response = create_batch(BatchInput(name="Desalineado", invoices=[_invoice("B12345678", "F-1", 100.0)]), test_db)
+    test_db.query(Batch).update({Batch.invoice_count: 7, Batch.total_amount: 1.0})
+    test_db.commit()
+
+    mismatches = find_inconsistent_batches(test_db)
+    assert [item["batch_id"] for item in mismatches] == [response["id"]]
+    assert mismatches[0]["actual"]["invoice_count"] == 1
+
+    rebuild_batch_aggregates(test_db)
+    test_db.commit()
+    assert find_inconsistent_batches(test_db) == []
+
+
+def test_list_batch_invoices_pages_sorts_and_filters(test_db):
+    previous = create_batch(BatchInput(name="Historico", invoices=[_invoice("B12345678", "F-1", 100.0)]), test_db)
+    response = create_batch(
+        BatchInput(
+            name="Detalle",
+            invoices=[
+                _invoice("B12345678", "F-1", 100.0),
+                _invoice("B12345678", "F-2", 30.0),
+                _invoice("A87654321", "F-3", 75.0),
+                _invoice("A87654321", "F-4", 30.0),
+                _invoice("C11111111", "F-5", None),
+            ],
+        ),
+        test_db,
+    )
+    batch_id = response["id"]
+
+    header = get_batch(batch_id, test_db)
+    assert BatchSummary.model_validate(header).invoice_count == 5
+
+    facturas = []
+    cursor = None
+    while True:
+        page = list_batch_invoices(batch_id, limit=2, cursor=cursor, sort="importe", order="desc", db=test_db)
+        assert page["total"] == 5
+        facturas.extend(item.factura for item in page["items"])
+        cursor = page["next_cursor"]
+        if not cursor:
+            break
+    assert facturas == ["F-1", "F-3", "F-4", "F-2", "F-5"]
+
+    duplicates = list_batch_invoices(batch_id, duplicate=True, db=test_db)
+    assert [item.factura for item in duplicates["items"]] == ["F-1"]
+    assert duplicates["items"][0].is_duplicate is True
+    assert duplicates["total"] == 1
+
+    by_cif = list_batch_invoices(batch_id, cif="a876", duplicate=False, db=test_db)
+    assert [item.factura for item in by_cif["items"]] == ["F-3", "F-4"]
+    assert previous["id"] != batch_id
+
+
+def test_delete_batch_cascades_to_invoices(test_db):
+    kept = create_batch(BatchInput(name="Se queda", invoices=[_invoice("B12345678", "F-1", 10.0)]), test_db)
+    removed = create_batch(
+        BatchInput(name="Se borra", invoices=[_invoice("B12345678", "F-2", 20.0), _invoice("A87654321", "F-3", 5.0)]),
+        test_db,
+    )
+
+    delete_batch(removed["id"], test_db)
+
+    assert test_db.query(Batch).count() == 1
+    assert {inv.batch_id for inv in test_db.query(Invoice).all()} == {kept["id"]}
+
+    with pytest.raises(HTTPException) as exc_info:
+        delete_batch(removed["id"], test_db)
+    assert exc_info.value.status_code == 404
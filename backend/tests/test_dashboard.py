@@ -0,0 +1,73 @@
+import pytest
+from datetime import date, datetime, timedelta
+
+from app.models import Batch, Invoice
+from app.routers.batch_router import get_dashboard_stats
+from app.services.duplicate_service import summarize_duplicate_groups
+from app.services.provider_summary_service import refresh_provider_summaries
+from app.services.rollup_service import rebuild_rollups
+
+
+def _at(day: date) -> datetime:
+    return datetime.combine(day, datetime.min.time())
+
+
+@pytest.fixture
+def dashboard_data(test_db):
+    today = date.today()
+    batch = Batch(name="Actual", created_at=datetime.utcnow(), status="GENERATED")
+    old_batch = Batch(name="Antiguo", created_at=datetime.utcnow() - timedelta(days=400), status="GENERATED")
+    test_db.add_all([batch, old_batch])
+    test_db.flush()
+    test_db.add_all([
+        Invoice(batch_id=batch.id, cif="B12345678", factura="F 1", importe=100.0, fecha_vencimiento=_at(today), status="VALID"),
+        Invoice(batch_id=batch.id, cif="B12345678", factura="f1", importe=100.0, fecha_vencimiento=_at(today), status="WARNING"),
+        Invoice(batch_id=batch.id, cif="A87654321", factura="F-2", importe=40.0, fecha_vencimiento=_at(today + timedelta(days=7)), status="VALID"),
+        Invoice(batch_id=batch.id, cif="A87654321", factura="F-3", importe=10.0, fecha_vencimiento=_at(today + timedelta(days=27)), status="ERROR"),
+        Invoice(batch_id=old_batch.id, cif="A87654321", factura="F-4", importe=5.0, fecha_vencimiento=_at(today - timedelta(days=30)), status="VALID"),
+    ])
+    test_db.flush()
+    rebuild_rollups(test_db)
+    refresh_provider_summaries(test_db)
+    test_db.commit()
+    return test_db
+
+
+def test_dashboard_stats_kpis_and_buckets(dashboard_data):
+    stats = get_dashboard_stats(dashboard_data)
+
+    assert stats["processed_batches"] == 2
+    assert stats["total_amount"] == pytest.approx(255.0)
+    assert stats["issues_count"] == 2
+    assert stats["status_distribution"][0]["value"] == 3
+    assert [week["amount"] for week in stats["cash_flow_projection"]] == [200.0, 40.0, 0.0, 10.0]
+
+    months = stats["monthly_volume"]
+    assert len(months) == 6
+    assert months[-1]["full_date"] == date.today().strftime("%Y-%m")
+    assert months[-1]["amount"] == pytest.approx(250.0)
+    assert sum(month["amount"] for month in months) == pytest.approx(250.0)
+
+
+def test_dashboard_duplicates_match_python_grouping(dashboard_data):
+    stats = get_dashboard_stats(dashboard_data)
+
+    expected = sum(group["occurrences"] for group in summarize_duplicate_groups(dashboard_data.query(Invoice).all()))
+    assert expected == 2
+    assert stats["duplicate_invoices_count"] == expected
+
+
+def test_analytics_snapshot_loads_duplicates_once(dashboard_data):
+    from app.routers.reports_router import export_dashboard_excel
+    from app.services.analytics_service import build_analytics_snapshot
+
+    snapshot = build_analytics_snapshot(dashboard_data)
+
+    assert snapshot["duplicate_groups"] == summarize_duplicate_groups(dashboard_data.query(Invoice).all())
+    assert snapshot["stats"] == get_dashboard_stats(dashboard_data)
+    assert snapshot["treasury"]["weeks"][0]["scheduled_amount"] == 200.0
+    assert [provider["cif"] for provider in snapshot["top_providers"]] == ["B12345678", "A87654321"]
+    assert [batch["name"] for batch in snapshot["recent_batches"]] == ["Actual", "Antiguo"]
+
+    response = export_dashboard_excel(dashboard_data)
+    assert response.body[:2] == b"PK"
@@ -0,0 +1,90 @@
+import io
+from datetime import datetime
+
+import openpyxl
+
+from app.models import Batch, Invoice, Settings
+from app.services.export_service import BANKINTER_COLUMNS, generate_bankinter_excel
+
+
+def test_bankinter_excel_layout(test_db):
+    test_db.add(Settings(numero_cuenta_cargo="ES7600491500051234567892"))
+    batch = Batch(name="Export")
+    test_db.add(batch)
+    test_db.flush()
+    test_db.add_all([
+        Invoice(batch_id=batch.id, cif="B11111111", nombre="Uno", pais="España", importe=120.5,
+                factura="F-1", fecha_vencimiento=datetime(2030, 3, 5)),
+        Invoice(batch_id=batch.id, cif="B22222222", nombre="Dos", pais="PT", importe=80,
+                factura="F-2", fecha_vencimiento=datetime(2030, 3, 6)),
+    ])
+    test_db.commit()
+
+    query = test_db.query(Invoice).filter(Invoice.batch_id == batch.id).order_by(Invoice.id).yield_per(1)
+    content = generate_bankinter_excel(query, test_db)
+
+    ws = openpyxl.load_workbook(io.BytesIO(content)).active
+    rows = list(ws.iter_rows(values_only=True))
+    assert ws.title == "CONFIRMING"
+    assert ws.sheet_view.showGridLines is False
+    assert [value or None for value in rows[0]] == BANKINTER_COLUMNS
+    assert len(rows) == 3 and all(len(row) == 25 for row in rows)
+    assert rows[1][:12:] == ("B11111111", "Uno", None, None, None, None, "ES", None, 120.5, "F-1", "20300305", None)
+    assert rows[2][6] == "PT" and rows[2][8] == 80
+    assert rows[1][14] == "ES7600491500051234567892" and rows[1][20] == "T" and rows[1][24] == "001"
+
+    header, cell = ws["A1"], ws["I2"]
+    assert header.font.name == "Calibri" and header.alignment.horizontal == "center"
+    assert cell.font.name == "Calibri" and cell.border.left.style is None
+
+
+def test_export_is_cached_and_archived_in_background(test_db, tmp_path):
+    from app.routers.batch_router import export_archiver, export_batch, export_cache
+
+    export_cache.clear()
+    settings = Settings(numero_cuenta_cargo="ES7600491500051234567892", export_path=str(tmp_path))
+    batch = Batch(name="Cache", payment_date=datetime(2030, 3, 5))
+    test_db.add_all([settings, batch])
+    test_db.flush()
+    test_db.add(Invoice(batch_id=batch.id, cif="B11111111", nombre="Uno", importe=10.0,
+                        factura="F-1", fecha_vencimiento=datetime(2030, 3, 5)))
+    test_db.commit()
+
+    first = export_batch(batch.id, test_db)
+    second = export_batch(batch.id, test_db)
+    assert first.headers["X-Export-Cache"] == "MISS"
+    assert second.headers["X-Export-Cache"] == "HIT"
+    assert second.body == first.body
+
+    export_archiver.wait()
+    archived = list(tmp_path.iterdir())
+    assert [path.name for path in archived] == [first.headers["Content-Disposition"].split("filename=")[1]]
+    assert archived[0].read_bytes() == first.body
+
+    # Cambiar la cuenta de cargo cambia la versión del contenido
+    settings.numero_cuenta_cargo = "ES9121000418450200051332"
+    test_db.commit()
+    third = export_batch(batch.id, test_db)
+    assert third.headers["X-Export-Cache"] == "MISS"
+    assert third.headers["X-Export-Version"] != first.headers["X-Export-Version"]
+    export_archiver.wait()
+    assert archived[0].read_bytes() == third.body
+
+
+def test_large_batch_pdf_paginates_with_streamed_invoices():
+    import re
+    from types import SimpleNamespace
+
+    from app.services.pdf_service import generate_large_batch_pdf
+
+    batch = SimpleNamespace(id=7, name="Grande", created_at=datetime(2030, 1, 1), payment_date=None)
+    invoices = (
+        SimpleNamespace(factura=f"F-{index}", nombre=None if index == 3 else f"Proveedor {index}",
+                        cif="B11111111", fecha_vencimiento=None, importe=10.0)
+        for index in range(120)
+    )
+    content = generate_large_batch_pdf(batch, invoices)
+
+    assert content.startswith(b"%PDF")
+    # 43 filas en la primera página (lleva la cabecera de la remesa) y 48 en las siguientes
+    assert len(re.findall(rb"/Type /Page[^s]", content)) == 3
@@ -69,6 +69,40 @@ def test_upsert_providers_by_cif():
     
     db.close()
 
+def test_upsert_providers_only_updates_changed_rows():
+    """Test unitario: ON CONFLICT sólo reescribe proveedores con datos distintos"""
+    engine = create_engine("sqlite:///:memory:")
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine)
+    db = Session()
+
+    old_timestamp = datetime(2020, 1, 1)
+    db.add_all([
+        Provider(cif='B72546815', name='DISTRICOMPO SL', email='prov1@test.com', updated_at=old_timestamp),
+        Provider(cif='A12345678', name='OTRO PROVEEDOR SL', email='prov2@test.com', updated_at=old_timestamp),
+    ])
+    db.commit()
+
+    providers_map = upsert_providers_by_cif(db, [
+        {'cif': 'B72546815', 'name': 'DISTRICOMPO SL', 'email': 'prov1@test.com'},
+        {'cif': 'a12345678', 'name': '', 'email': 'nuevo@test.com'},
+        {'cif': 'C00000001', 'name': 'NUEVO SL'},
+    ])
+    db.commit()
+
+    assert set(providers_map) == {'A12345678', 'C00000001'}
+
+    unchanged = db.query(Provider).filter(Provider.cif == 'B72546815').one()
+    assert unchanged.updated_at == old_timestamp
+
+    updated = db.query(Provider).filter(Provider.cif == 'A12345678').one()
+    assert updated.email == 'nuevo@test.com'
+    assert updated.name == 'OTRO PROVEEDOR SL'
+    assert updated.updated_at > old_timestamp
+
+    assert db.query(Provider).count() == 3
+    db.close()
+
 def test_normalize_cif():
     """Test: Normalización de CIF"""
     assert normalize_cif(" b72546815 ") == "B72546815"
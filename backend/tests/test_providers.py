@@ -0,0 +1,219 @@
+import io
+from datetime import date, datetime, timedelta
+
+import openpyxl
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import event
+
+from app.models import Batch, Invoice, Provider, ProviderSummary
+from app.routers.batch_router import BatchInput, create_batch, delete_batch
+from app.routers.providers_router import get_provider_invoices, get_provider_stats, list_provider_invoices, list_providers
+from app.schemas import InvoiceCreate
+from app.services.provider_summary_service import ProviderSummaryRefresher, refresh_provider_summaries
+from app.routers.reports_router import export_provider_excel
+
+
+def _seed(db):
+    first = Batch(name="Enero", payment_date=datetime(2030, 1, 31))
+    second = Batch(name="Febrero")
+    db.add_all([first, second])
+    db.flush()
+    due = datetime(2030, 1, 10)
+    db.add_all([
+        Invoice(batch_id=first.id, cif="B1", nombre="Uno", factura="F 1", importe=100.0, fecha_vencimiento=due),
+        Invoice(batch_id=second.id, cif="B1", nombre="Uno", factura="f1", importe=100.0, fecha_vencimiento=due),
+        Invoice(batch_id=second.id, cif="B1", nombre="Uno", factura="F-2", importe=50.0, fecha_vencimiento=due + timedelta(days=5)),
+        Invoice(batch_id=second.id, cif="B1", nombre="Uno", factura="F-3", importe=75.0, fecha_vencimiento=None),
+        Invoice(batch_id=first.id, cif="B2", nombre="Dos", factura="F 1", importe=100.0, fecha_vencimiento=due),
+    ])
+    db.commit()
+    return first, second
+
+
+def test_provider_invoices_join_batches_and_flag_duplicates(test_db):
+    first, _second = _seed(test_db)
+
+    items = get_provider_invoices("B1", test_db)
+
+    assert [item["factura"] for item in items] == ["F-3", "F-2", "f1", "F 1"]
+    assert [item["duplicate_status"] for item in items] == [None, None, "HISTORICAL", "HISTORICAL"]
+    assert (items[-1]["batch_name"], items[-1]["payment_date"]) == ("Enero", first.payment_date)
+
+
+def test_provider_invoices_keyset_pages(test_db):
+    _seed(test_db)
+
+    page = list_provider_invoices("B1", limit=3, sort="fecha_vencimiento", order="asc", db=test_db)
+    assert page["total"] == 4
+    rest = list_provider_invoices("B1", limit=3, cursor=page["next_cursor"], sort="fecha_vencimiento", order="asc", db=test_db)
+    assert rest["next_cursor"] is None
+    facturas = [item["factura"] for item in page["items"] + rest["items"]]
+    assert facturas == ["F-3", "F 1", "f1", "F-2"]
+
+    upcoming = list_provider_invoices("B1", sort="fecha_vencimiento", order="asc", due_from=date(2030, 1, 11), db=test_db)
+    assert [item["factura"] for item in upcoming["items"]] == ["F-2"]
+
+
+def test_provider_excel_streams_rows(test_db):
+    _seed(test_db)
+
+    response = export_provider_excel("B1", test_db)
+    rows = list(openpyxl.load_workbook(io.BytesIO(response.body)).active.iter_rows(values_only=True))
+
+    assert rows[0] == ("Nº Factura", "Importe (€)", "Vencimiento", "Remesa", "Estado")
+    assert rows[1][:3] == ("F-3", 75, "-")
+    assert rows[-1][2:] == ("10/01/2030", "#1", "VALID")
+
+
+def test_provider_stats_read_provider_summary(test_db):
+    today = datetime.combine(date.today(), datetime.min.time())
+    paid = Batch(name="Pagada", payment_date=today - timedelta(days=10))
+    open_batch = Batch(name="Abierta")
+    test_db.add_all([paid, open_batch, Provider(cif="B1", name="Uno SL", email="uno@example.com")])
+    test_db.flush()
+    test_db.add_all([
+        Invoice(batch_id=paid.id, cif="B1", factura="A", importe=100.0, fecha_vencimiento=today - timedelta(days=3)),
+        Invoice(batch_id=open_batch.id, cif="B1", factura="A", importe=100.0, fecha_vencimiento=today - timedelta(days=3)),
+        Invoice(batch_id=open_batch.id, cif="B1", factura="B", importe=40.0, fecha_vencimiento=today + timedelta(days=5)),
+        Invoice(batch_id=open_batch.id, cif="B1", factura="C", importe=60.0, fecha_vencimiento=today + timedelta(days=45)),
+        Invoice(batch_id=open_batch.id, cif="B1", factura="D", importe=20.0, fecha_vencimiento=None),
+        Invoice(batch_id=paid.id, cif="B2", factura="B", importe=40.0, fecha_vencimiento=today + timedelta(days=1)),
+    ])
+    test_db.flush()
+    refresh_provider_summaries(test_db)
+    test_db.commit()
+
+    statements = []
+    listener = lambda *args: statements.append(args[2])  # noqa: E731
+    event.listen(test_db.get_bind(), "before_cursor_execute", listener)
+    try:
+        stats = get_provider_stats("B1", test_db)
+    finally:
+        event.remove(test_db.get_bind(), "before_cursor_execute", listener)
+
+    # ficha, resumen, grupos de duplicados y volumen mensual
+    assert len(statements) == 4
+    assert stats["name"] == "Uno SL"
+    assert (stats["total_invoices"], stats["total_amount"], stats["average_amount"]) == (5, 320.0, 64.0)
+    assert stats["last_payment_date"] == (today - timedelta(days=10)).strftime("%Y-%m-%d")
+    assert stats["next_due_date"] == (today + timedelta(days=5)).strftime("%Y-%m-%d")
+    assert (stats["upcoming_invoices_count"], stats["upcoming_due_amount"]) == (1, 40.0)
+    assert stats["overdue_invoices_count"] == 2
+    assert stats["duplicate_invoices_count"] == 2
+    assert stats["duplicate_groups"][0]["batch_ids"] == [paid.id, open_batch.id]
+    assert stats["monthly_volume"][-1] == {"label": today.strftime("%b"), "amount": 320.0, "invoices": 5}
+
+
+def test_provider_summary_follows_batches_and_day_changes(test_db):
+    today = date.today()
+
+    def invoice(factura, importe, days):
+        due = datetime.combine(today + timedelta(days=days), datetime.min.time())
+        return InvoiceCreate(cif="B1", nombre="Uno", factura=factura, importe=importe, fecha_vencimiento=due)
+
+    first = create_batch(BatchInput(name="L1", invoices=[invoice("A", 100.0, 2), invoice("B", 50.0, 40)]), test_db)
+    second = create_batch(BatchInput(name="L2", invoices=[invoice("A", 100.0, 2)]), test_db)
+
+    summary = test_db.get(ProviderSummary, "B1")
+    assert (summary.invoice_count, summary.total_amount, summary.duplicate_count) == (3, 250.0, 2)
+    assert (summary.upcoming_count, summary.overdue_count, summary.as_of) == (2, 0, today)
+
+    delete_batch(second["id"], test_db)
+    test_db.expire_all()
+    summary = test_db.get(ProviderSummary, "B1")
+    assert (summary.invoice_count, summary.total_amount, summary.duplicate_count) == (2, 150.0, 0)
+
+    # Diez días después la primera factura está vencida y la segunda entra en la ventana de 30 días
+    refresher = ProviderSummaryRefresher(lambda: test_db, interval_seconds=0)
+    test_db.close = lambda: None
+    assert refresher.run_once(today + timedelta(days=10)) == 1
+    test_db.expire_all()
+    summary = test_db.get(ProviderSummary, "B1")
+    assert (summary.overdue_count, summary.upcoming_count, summary.upcoming_amount) == (1, 1, 50.0)
+    assert summary.as_of == today + timedelta(days=10)
+
+    delete_batch(first["id"], test_db)
+    assert test_db.get(ProviderSummary, "B1") is None
+
+
+def test_provider_master_upload_streams_and_upserts(test_db, monkeypatch):
+    import importlib
+
+    from fastapi import UploadFile
+
+    providers_router = importlib.import_module("app.routers.providers_router")
+    provider_service = importlib.import_module("app.services.provider_service")
+    monkeypatch.setattr(providers_router, "chunked", lambda items: provider_service.chunked(items, 2))
+    test_db.add(Provider(cif="B1", name="Nombre previo", email="old@example.com"))
+    test_db.commit()
+
+    workbook = openpyxl.Workbook()
+    sheet = workbook.active
+    sheet.append(["Maestro de proveedores"])
+    sheet.append([])
+    sheet.append(["N.I.F.", "Nombre fiscal", "E-mail", "Cód. Postal"])
+    sheet.append(["B1", None, "new@example.com", 28001])
+    sheet.append([None, "Sin CIF", None, None])
+    sheet.append(["B2", "Dos SL", None, "08001"])
+    sheet.append(["B2", "Dos SL (bis)", None, None])
+    buffer = io.BytesIO()
+    workbook.save(buffer)
+    buffer.seek(0)
+
+    result = providers_router.upload_providers(UploadFile(buffer, filename="maestro.xlsx"), test_db)
+
+    assert result["message"] == "Processed 3 providers"
+    assert (result["errors"], result["error_count"]) == ([], 0)
+    test_db.expire_all()
+    first, second = test_db.get(Provider, "B1"), test_db.get(Provider, "B2")
+    assert (first.name, first.email, first.zip_code) == ("Nombre previo", "new@example.com", "28001")
+    assert (second.name, second.zip_code) == ("Dos SL (bis)", None)
+
+
+
+def _directory(db, if_none_match=None, **params):
+    import json
+
+    from starlette.requests import Request
+
+    headers = [(b"if-none-match", if_none_match.encode())] if if_none_match else []
+    defaults = {"skip": 0, "limit": 10000, "after": None, "fields": None, "q": None, "country": None, "city": None, "missing_iban": False}
+    response = list_providers(Request({"type": "http", "headers": headers}), **{**defaults, **params}, db=db)
+    return response, json.loads(response.body) if response.body else None
+
+
+def test_provider_directory_projection_filters_and_etag(test_db):
+    test_db.add_all([
+        Provider(cif="B1", name="Uno SL", country="España", iban="ES91"),
+        Provider(cif="B2", name="Dos SL", country="Francia"),
+        Provider(cif="B3", name="Tres SL", country="españa", iban=""),
+    ])
+    test_db.commit()
+
+    response, rows = _directory(test_db, fields="name,country", limit=2)
+    assert response.status_code == 200
+    assert rows == [
+        {"cif": "B1", "name": "Uno SL", "country": "España"},
+        {"cif": "B2", "name": "Dos SL", "country": "Francia"},
+    ]
+    assert response.headers["X-Next-Cursor"] == "B2"
+
+    _response, rows = _directory(test_db, country="ESPAÑA", missing_iban=True)
+    assert [row["cif"] for row in rows] == ["B3"]
+    assert "updated_at" in rows[0]
+    _response, rows = _directory(test_db, q="dos")
+    assert [row["cif"] for row in rows] == ["B2"]
+    with pytest.raises(HTTPException) as error:
+        _directory(test_db, fields="cif,password")
+    assert error.value.status_code == 400
+
+    etag = response.headers["ETag"]
+    cached, _rows = _directory(test_db, if_none_match=etag, fields="name,country", limit=2)
+    assert (cached.status_code, cached.body, cached.headers["ETag"]) == (304, b"", etag)
+
+    test_db.get(Provider, "B2").name = "Dos SA"
+    test_db.commit()
+    changed, rows = _directory(test_db, if_none_match=etag, fields="name,country", limit=2)
+    assert changed.status_code == 200
+    assert rows[1]["name"] == "Dos SA"
@@ -0,0 +1,127 @@
+import importlib
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import pytest
+from fastapi import HTTPException
+
+from app.models import Batch, Invoice
+from app.schemas import ReportJobCreate
+from app.services.report_jobs import DONE, FAILED, ArtifactStore, ReportJobManager
+
+# app.routers re-exporta el APIRouter con el mismo nombre que el módulo
+reports_router = importlib.import_module("app.routers.reports_router")
+
+
+def _manager(tmp_path, render, ttl_seconds=60.0):
+    return ReportJobManager(
+        render,
+        ArtifactStore(str(tmp_path), ttl_seconds=ttl_seconds),
+        executor_factory=lambda: ThreadPoolExecutor(max_workers=1),
+    )
+
+
+def test_jobs_are_deduplicated_by_params_and_data_version(tmp_path):
+    calls = []
+
+    def render(kind, params):
+        calls.append((kind, params))
+        time.sleep(0.05)
+        return b"contenido", "informe.pdf", "application/pdf"
+
+    manager = _manager(tmp_path, render)
+    first = manager.submit("monthly_pdf", {"month": 3, "year": 2030}, "v1")
+    # Mientras está en curso se devuelve el mismo trabajo
+    assert manager.submit("monthly_pdf", {"year": 2030, "month": 3}, "v1") is first
+    assert manager.wait(first, timeout=5)
+    assert first.status == DONE
+    assert open(manager.artifact(first).path, "rb").read() == b"contenido"
+
+    # Terminado: un trabajo nuevo sale ya hecho desde el almacén
+    cached = manager.submit("monthly_pdf", {"month": 3, "year": 2030}, "v1")
+    assert cached.id != first.id and cached.status == DONE
+    # Otra versión de datos vuelve a renderizar
+    changed = manager.submit("monthly_pdf", {"month": 3, "year": 2030}, "v2")
+    assert manager.wait(changed, timeout=5)
+    assert len(calls) == 2
+
+
+def test_failed_and_expired_artifacts(tmp_path):
+    def render(kind, params):
+        raise ValueError("sin datos")
+
+    manager = _manager(tmp_path, render)
+    job = manager.submit("batch_excel", {"batch_id": 1}, "v1")
+    assert manager.wait(job, timeout=5)
+    assert (job.status, job.error) == (FAILED, "sin datos")
+
+    store = ArtifactStore(str(tmp_path / "store"), ttl_seconds=0)
+    store.put("clave", b"x", "a.xlsx", "application/octet-stream")
+    assert store.get("clave") is None
+    assert list((tmp_path / "store").iterdir()) == []
+
+
+def test_report_job_endpoints(test_db, tmp_path, monkeypatch):
+    batch = Batch(name="Informe")
+    test_db.add(batch)
+    test_db.flush()
+    test_db.add(Invoice(batch_id=batch.id, cif="B1", nombre="Uno", factura="F-1", importe=5.0,
+                        fecha_vencimiento=datetime(2030, 3, 5)))
+    test_db.commit()
+
+    # Render en hilo con la sesión de test (en producción: proceso con su propia sesión)
+    def render(kind, params):
+        response = reports_router.REPORT_RENDERERS[kind](test_db, params)
+        filename = response.headers["content-disposition"].split("filename=", 1)[1]
+        return response.body, filename, response.media_type
+
+    monkeypatch.setattr(reports_router, "report_jobs", _manager(tmp_path, render))
+
+    with pytest.raises(ValueError):
+        ReportJobCreate(kind="batch_excel")
+
+    submitted = reports_router.submit_report_job(ReportJobCreate(kind="batch_excel", batch_id=batch.id), test_db)
+    job = reports_router.report_jobs.get(submitted["id"])
+    assert reports_router.report_jobs.wait(job, timeout=10)
+
+    status = reports_router.get_report_job(job.id)
+    assert status["status"] == DONE
+    assert status["download_url"] == f"/reports/jobs/{job.id}/download"
+    download = reports_router.download_report_job(job.id)
+    assert download.filename.startswith(f"Remesa_{batch.id}_")
+
+    with pytest.raises(HTTPException) as missing:
+        reports_router.get_report_job("no-existe")
+    assert missing.value.status_code == 404
+
+    for payload in (ReportJobCreate(kind="batch_excel", batch_id=batch.id + 1), ReportJobCreate(kind="provider_excel", cif="X9")):
+        with pytest.raises(HTTPException) as unknown:
+            reports_router.submit_report_job(payload, test_db)
+        assert unknown.value.status_code == 404
+
+
+def test_report_job_events_end_with_timeout(tmp_path, monkeypatch):
+    import asyncio
+    import threading
+
+    release = threading.Event()
+
+    def render(kind, params):
+        release.wait(5)
+        return b"contenido", "informe.pdf", "application/pdf"
+
+    monkeypatch.setattr(reports_router, "report_jobs", _manager(tmp_path, render))
+    monkeypatch.setattr(reports_router, "REPORT_STREAM_TIMEOUT", 0.1)
+    job = reports_router.report_jobs.submit("monthly_pdf", {"month": 3, "year": 2030}, "v1")
+
+    async def collect():
+        response = await reports_router.stream_report_job(job.id)
+        return [chunk async for chunk in response.body_iterator]
+
+    try:
+        chunks = asyncio.run(collect())
+    finally:
+        release.set()
+    assert len(chunks) == 2
+    assert chunks[1].startswith("event: timeout\n") and '"status": "pending"' in chunks[1]
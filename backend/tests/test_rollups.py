@@ -0,0 +1,233 @@
+import pytest
+from datetime import date, datetime, timedelta
+
+from app.models import InvoiceDailyProvider, InvoiceDailyStatus
+from app.routers.batch_router import (
+    BatchInput,
+    create_batch,
+    delete_batch,
+    get_treasury_daily_projection,
+    get_treasury_simulator,
+    get_treasury_simulator_grid,
+)
+from app.schemas import InvoiceCreate
+from app.services.rollup_service import daily_due_totals, find_rollup_drift, rebuild_rollups
+
+
+def _invoice(cif, factura, importe, due):
+    return InvoiceCreate(
+        cif=cif,
+        nombre=f"Proveedor {cif}",
+        factura=factura,
+        importe=importe,
+        fecha_vencimiento=datetime.combine(due, datetime.min.time()),
+    )
+
+
+def _snapshot(db):
+    statuses = sorted(
+        (row.due_date, row.status, row.invoice_count, round(row.total_amount, 2))
+        for row in db.query(InvoiceDailyStatus).all()
+    )
+    providers = sorted(
+        (row.due_date, row.cif, row.invoice_count, round(row.total_amount, 2))
+        for row in db.query(InvoiceDailyProvider).all()
+    )
+    return statuses, providers
+
+
+def test_rollups_follow_batch_create_and_delete(test_db):
+    today = date.today()
+    first = create_batch(
+        BatchInput(
+            name="Lote 1",
+            invoices=[
+                _invoice("B12345678", "F-1", 100.0, today),
+                _invoice("B12345678", "F-2", 50.0, today),
+                _invoice("A87654321", "F-3", 25.0, today + timedelta(days=3)),
+                # Sin CIF: NULL y '' van a la misma fila '' del rollup
+                _invoice(None, "F-5", 10.0, today + timedelta(days=5)),
+                _invoice("", "F-6", 5.0, today + timedelta(days=5)),
+            ],
+        ),
+        test_db,
+    )
+    second = create_batch(
+        BatchInput(name="Lote 2", invoices=[_invoice("B12345678", "F-4", 10.0, today)]),
+        test_db,
+    )
+
+    assert daily_due_totals(test_db, today, today + timedelta(days=7)) == [
+        (today, 3, 160.0),
+        (today + timedelta(days=3), 1, 25.0),
+        (today + timedelta(days=5), 2, 15.0),
+    ]
+    provider_row = test_db.get(InvoiceDailyProvider, (today, "B12345678"))
+    assert (provider_row.invoice_count, provider_row.total_amount) == (3, 160.0)
+    no_cif_row = test_db.get(InvoiceDailyProvider, (today + timedelta(days=5), ""))
+    assert (no_cif_row.invoice_count, no_cif_row.total_amount) == (2, 15.0)
+    assert find_rollup_drift(test_db) == []
+
+    delete_batch(first["id"], test_db)
+
+    assert daily_due_totals(test_db) == [(today, 1, 10.0)]
+    assert test_db.get(InvoiceDailyProvider, (today + timedelta(days=3), "A87654321")) is None
+    assert test_db.get(InvoiceDailyProvider, (today + timedelta(days=5), "")) is None
+    assert find_rollup_drift(test_db) == []
+
+    incremental = _snapshot(test_db)
+    rebuild_rollups(test_db)
+    assert _snapshot(test_db) == incremental
+
+    delete_batch(second["id"], test_db)
+    assert test_db.query(InvoiceDailyStatus).count() == 0
+    assert test_db.query(InvoiceDailyProvider).count() == 0
+
+
+def test_treasury_simulator_reads_rollups(test_db):
+    today = date.today()
+    create_batch(
+        BatchInput(
+            name="Tesorería",
+            invoices=[
+                _invoice("B12345678", "F-1", 1000.0, today),
+                _invoice("A87654321", "F-2", 400.0, today + timedelta(days=8)),
+                _invoice("A87654321", "F-3", 50.0, today - timedelta(days=2)),
+            ],
+        ),
+        test_db,
+    )
+
+    result = get_treasury_simulator(
+        opening_balance=2000, reserve_balance=500, horizon_weeks=4, payment_delay_days=3, stress_pct=10, db=test_db
+    )
+
+    weeks = result["weeks"]
+    assert [week["scheduled_amount"] for week in weeks] == [1000.0, 400.0, 0.0, 0.0]
+    # Con 3 días de retraso el vencido hace 2 días cae en la primera semana
+    assert [week["delayed_amount"] for week in weeks] == [1050.0, 400.0, 0.0, 0.0]
+    assert weeks[0]["stressed_amount"] == pytest.approx(1100.0)
+    assert weeks[0]["providers"] == [
+        {"cif": "B12345678", "name": "Proveedor B12345678", "amount": 1000.0, "invoices": 1}
+    ]
+    assert [item["cif"] for item in result["top_exposures"]] == ["B12345678", "A87654321"]
+    assert result["summary"]["final_balance"] == 600.0
+
+
+def test_treasury_simulator_monte_carlo_mode(test_db):
+    today = date.today()
+    create_batch(
+        BatchInput(name="MC", invoices=[_invoice("B12345678", f"F-{day}", 300.0, today + timedelta(days=day)) for day in range(0, 70, 5)]),
+        test_db,
+    )
+
+    result = get_treasury_simulator(
+        opening_balance=3000, reserve_balance=1000, horizon_weeks=52, payment_delay_days=10, stress_pct=20,
+        monte_carlo=True, scenarios=1000, seed=7, db=test_db,
+    )
+
+    bands = result["monte_carlo"]
+    assert len(result["weeks"]) == 52 and len(bands["weeks"]) == 52
+    assert bands["seed"] == 7 and bands["scenarios"] == 1000
+    assert 0.0 < bands["shortfall_probability"] <= 1.0
+    assert all(week["p5_balance"] <= week["p50_balance"] <= week["p95_balance"] for week in bands["weeks"])
+    assert "monte_carlo" not in get_treasury_simulator(db=test_db)
+
+
+def test_treasury_simulator_rejects_negative_seed(client):
+    from app.main import app
+    from app.routers.auth_router import get_current_user
+
+    app.dependency_overrides[get_current_user] = lambda: None
+    response = client.get("/batches/treasury-simulator", params={"monte_carlo": True, "seed": -1})
+    assert response.status_code == 422
+
+
+def test_treasury_grid_matches_single_simulations(test_db):
+    today = date.today()
+    create_batch(
+        BatchInput(name="Grid", invoices=[_invoice("B12345678", f"F-{day}", 250.0 + day, today + timedelta(days=day)) for day in range(-10, 60, 4)]),
+        test_db,
+    )
+
+    grid = get_treasury_simulator_grid(
+        horizon_weeks=8, delay_min=0, delay_max=10, delay_step=5, stress_min=0, stress_max=20, stress_step=10, db=test_db,
+    )
+
+    assert grid["axes"] == {
+        "payment_delay_days": [0, 5, 10],
+        "stress_pct": [0.0, 10.0, 20.0],
+    }
+    for delay_index, delay in enumerate(grid["axes"]["payment_delay_days"]):
+        for stress_index, stress in enumerate(grid["axes"]["stress_pct"]):
+            single = get_treasury_simulator(
+                opening_balance=5000, reserve_balance=0, horizon_weeks=8, payment_delay_days=delay, stress_pct=stress, db=test_db,
+            )
+            assert grid["scheduled_amounts"] == [week["scheduled_amount"] for week in single["weeks"]]
+            assert grid["delayed_amounts"][delay_index] == [week["delayed_amount"] for week in single["weeks"]]
+            assert grid["stressed_amounts"][stress_index] == [week["stressed_amount"] for week in single["weeks"]]
+            assert [week["providers"] for week in grid["weeks"]] == [week["providers"] for week in single["weeks"]]
+
+
+def test_treasury_daily_projection_uses_day_buckets(test_db):
+    today = date.today()
+    create_batch(
+        BatchInput(
+            name="Diario",
+            invoices=[
+                _invoice("B12345678", "F-1", 100.0, today + timedelta(days=1)),
+                _invoice("B12345678", "F-2", 200.0, today + timedelta(days=400)),
+                _invoice("A87654321", "F-3", 50.0, today - timedelta(days=2)),
+                _invoice("A87654321", "F-4", 999.0, today + timedelta(days=800)),
+            ],
+        ),
+        test_db,
+    )
+
+    result = get_treasury_daily_projection(
+        opening_balance=320, reserve_balance=100, horizon_days=5000, payment_delay_days=3, stress_pct=0, db=test_db
+    )
+
+    assert len(result["dates"]) == 730 and result["dates"][0] == today.isoformat()
+    assert result["scheduled_amounts"][1] == 100.0 and result["scheduled_amounts"][400] == 200.0
+    # El vencido hace 2 días entra al día 1 con 3 días de retraso
+    assert result["delayed_amounts"][1] == 50.0 and result["delayed_amounts"][4] == 100.0
+    assert result["summary"]["scheduled_total"] == 300.0
+    assert result["summary"]["final_balance"] == 20.0
+    assert result["summary"]["first_shortfall_date"] is None
+    assert result["summary"]["first_reserve_breach_date"] == (today + timedelta(days=400)).isoformat()
+
+
+def test_monthly_report_stats_aggregate_in_sql(test_db):
+    from app.services.report_service import monthly_report_stats
+
+    create_batch(
+        BatchInput(
+            name="Marzo",
+            invoices=[
+                _invoice("B1", "F-1", 100.0, date(2030, 3, 1)),
+                _invoice("B1", "F-2", 50.0, date(2030, 3, 8)),
+                _invoice("B2", "F-3", 200.0, date(2030, 3, 14)),
+                _invoice("B3", "F-4", 10.0, date(2030, 3, 31)),
+                _invoice("B4", "F-5", 999.0, date(2030, 4, 1)),
+            ],
+        ),
+        test_db,
+    )
+
+    stats = monthly_report_stats(test_db, 2030, 3)
+
+    assert (stats["month"], stats["total_invoices"], stats["total_amount"]) == ("Marzo", 4, 360.0)
+    assert stats["active_providers"] == 3
+    assert stats["top_providers"] == [
+        {"name": "Proveedor B2", "amount": 200.0},
+        {"name": "Proveedor B1", "amount": 150.0},
+        {"name": "Proveedor B3", "amount": 10.0},
+    ]
+    assert stats["weekly_breakdown"] == [
+        {"week": "Semana 1-7", "amount": 100.0},
+        {"week": "Semana 8-14", "amount": 250.0},
+        {"week": "Semana 15-21", "amount": 0.0},
+        {"week": "Semana 22-28", "amount": 0.0},
+        {"week": "Semana 29-31", "amount": 10.0},
+    ]
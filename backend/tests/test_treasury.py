@@ -0,0 +1,54 @@
+import numpy as np
+
+from app.services.treasury_service import monte_carlo_projection, top_providers_by_bucket, week_buckets, weekly_totals
+
+
+def _series():
+    return {
+        "day_offsets": np.array([-3, 0, 0, 6, 7, 8, 13, 14], dtype=np.int64),
+        "codes": np.array([0, 1, 0, 2, 1, 2, 0, 1], dtype=np.int64),
+        "amounts": np.array([5.0, 10.0, 10.0, 4.0, 1.0, 1.0, 2.0, 99.0]),
+        "counts": np.array([1, 1, 2, 1, 1, 1, 1, 1], dtype=np.int64),
+        "cifs": ["A1", "B2", ""],
+        "names": ["A pre", "B", "A", "Sin CIF", "B", "Otro", "A", "B"],
+    }
+
+
+def test_weekly_totals_with_and_without_delay():
+    series = _series()
+
+    assert week_buckets(series["day_offsets"], 2).tolist() == [-1, 0, 0, 0, 1, 1, 1, -1]
+    assert weekly_totals(series["day_offsets"], series["amounts"], 2).tolist() == [24.0, 4.0]
+    assert weekly_totals(series["day_offsets"], series["amounts"], 2, shift_days=3).tolist() == [25.0, 6.0]
+
+
+def test_top_providers_breaks_ties_by_first_appearance():
+    series = _series()
+    buckets = week_buckets(series["day_offsets"], 2)
+
+    first_week, second_week = top_providers_by_bucket(series, buckets, 2, limit=3)
+
+    # B2 y A1 empatan a 10: gana el que aparece antes en la semana
+    assert [(item["cif"], item["name"], item["amount"], item["invoices"]) for item in first_week] == [
+        ("B2", "B", 10.0, 1),
+        ("A1", "A", 10.0, 2),
+        (None, "Sin CIF", 4.0, 1),
+    ]
+    assert [item["cif"] for item in second_week] == ["A1", "B2", None]
+    assert top_providers_by_bucket(series, np.full(8, -1), 1, limit=5) == [[]]
+
+
+def test_monte_carlo_projection_is_seeded_and_bounded():
+    day_offsets = np.arange(0, 28, dtype=np.int64)
+    amounts = np.full(28, 100.0)
+
+    first = monte_carlo_projection(day_offsets, amounts, 4, 2500.0, 500.0, 7, 20.0, 2000, seed=1)
+    second = monte_carlo_projection(day_offsets, amounts, 4, 2500.0, 500.0, 7, 20.0, 2000, seed=1)
+
+    assert np.array_equal(first["p50"], second["p50"])
+    assert np.all(first["p5"] <= first["p50"]) and np.all(first["p50"] <= first["p95"])
+    # Sin shock ni retraso el saldo final es determinista: 2500 - 2800 < 0
+    flat = monte_carlo_projection(day_offsets, amounts, 4, 2500.0, 500.0, 0, 0.0, 500, seed=1)
+    assert flat["p50"].tolist() == [1800.0, 1100.0, 400.0, -300.0]
+    assert flat["shortfall_probability"] == 1.0
+    assert flat["weekly_reserve_breach_probability"].tolist() == [0.0, 0.0, 1.0, 1.0]
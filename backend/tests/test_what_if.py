@@ -0,0 +1,90 @@
+import pytest
+from datetime import date, datetime, timedelta
+from fastapi import HTTPException
+
+from app.models import Invoice
+from app.routers.batch_router import (
+    BatchInput,
+    create_batch,
+    create_what_if_session,
+    delete_what_if_session,
+    get_treasury_simulator,
+    get_what_if_session,
+    move_what_if,
+)
+from app.schemas import InvoiceCreate, WhatIfMove, WhatIfSessionCreate
+
+
+def _invoice(cif, factura, importe, due):
+    return InvoiceCreate(
+        cif=cif,
+        nombre=f"Proveedor {cif}",
+        factura=factura,
+        importe=importe,
+        fecha_vencimiento=datetime.combine(due, datetime.min.time()),
+    )
+
+
+@pytest.fixture
+def what_if(test_db):
+    today = date.today()
+    create_batch(
+        BatchInput(
+            name="What-if",
+            invoices=[
+                _invoice("B12345678", "F-1", 100.0, today),
+                _invoice("B12345678", "F-2", 50.0, today + timedelta(days=1)),
+                _invoice("A87654321", "F-3", 30.0, today + timedelta(days=2)),
+                _invoice("A87654321", "F-4", 20.0, today + timedelta(days=8)),
+            ],
+        ),
+        test_db,
+    )
+    session = create_what_if_session(WhatIfSessionCreate(opening_balance=1000, reserve_balance=900, horizon_weeks=4), test_db)
+    return test_db, session
+
+
+def test_what_if_session_matches_simulator(what_if):
+    db, session = what_if
+    simulator = get_treasury_simulator(opening_balance=1000, reserve_balance=900, horizon_weeks=4, db=db)
+
+    for week, expected in zip(session["weeks"], simulator["weeks"]):
+        assert week["scheduled_amount"] == expected["scheduled_amount"]
+        assert week["scheduled_balance"] == expected["scheduled_balance"]
+        assert week["providers"] == expected["providers"]
+
+
+def test_what_if_moves_apply_deltas(what_if):
+    db, session = what_if
+    session_id = session["session_id"]
+    invoice_id = db.query(Invoice.id).filter(Invoice.factura == "F-1").scalar()
+
+    moved = move_what_if(session_id, WhatIfMove(invoice_id=invoice_id, to_week=2))
+    assert moved["changed_weeks"] == [0, 2]
+    assert [week["scheduled_amount"] for week in moved["weeks"]] == [80.0, 20.0, 100.0, 0.0]
+    assert "providers" not in moved["weeks"][1]
+    assert moved["weeks"][2]["providers"] == [{"cif": "B12345678", "name": "Proveedor B12345678", "amount": 100.0, "invoices": 1}]
+
+    # Todo el proveedor de la semana 0 a la 2: se fusiona con la factura ya movida
+    moved = move_what_if(session_id, WhatIfMove(cif="B12345678", from_week=0, to_week=2))
+    assert [week["scheduled_amount"] for week in moved["weeks"]] == [30.0, 20.0, 150.0, 0.0]
+    assert moved["weeks"][2]["providers"][0]["invoices"] == 2
+
+    # Y la factura sigue localizable tras la fusión
+    moved = move_what_if(session_id, WhatIfMove(invoice_id=invoice_id, to_week=3))
+    assert [week["scheduled_amount"] for week in moved["weeks"]] == [30.0, 20.0, 50.0, 100.0]
+    assert moved["final_balance"] == 800.0
+
+    full = get_what_if_session(session_id)
+    assert [week["providers"][0]["amount"] if week["providers"] else 0 for week in full["weeks"]] == [30.0, 20.0, 50.0, 100.0]
+
+    with pytest.raises(HTTPException) as exc:
+        move_what_if(session_id, WhatIfMove(cif="B12345678", from_week=0, to_week=1))
+    assert exc.value.status_code == 404
+    with pytest.raises(HTTPException) as exc:
+        move_what_if(session_id, WhatIfMove(invoice_id=invoice_id, to_week=9))
+    assert exc.value.status_code == 400
+
+    delete_what_if_session(session_id)
+    with pytest.raises(HTTPException):
+        get_what_if_session(session_id)
@@ -1,5 +1,6 @@
 import { X, Calendar, FileText, Mail } from 'lucide-react'
 import { useState } from 'react'
+import { useInfiniteQuery } from '@tanstack/react-query'
 import axios from 'axios'
 import { useNavigate } from 'react-router-dom'
 
@@ -13,6 +14,13 @@ interface InvoiceType {
     factura: string
     status: string
     validation_message?: string
+    is_duplicate?: boolean
+}
+
+interface InvoicePage {
+    items: InvoiceType[]
+    total: number
+    next_cursor?: string | null
 }
 
 interface BatchType {
@@ -22,7 +30,7 @@ interface BatchType {
     payment_date?: string
     status: string
     total_amount?: number
-    invoices: InvoiceType[]
+    invoice_count?: number
 }
 
 interface BatchDetailsModalProps {
@@ -34,12 +42,38 @@ interface BatchDetailsModalProps {
 
 export function BatchDetailsModal({ isOpen, onClose, batch, loading }: BatchDetailsModalProps) {
     const [notifying, setNotifying] = useState(false)
+    const [statusFilter, setStatusFilter] = useState('')
     const navigate = useNavigate()
 
+    // Invoices are paged from the server (keyset cursor) instead of shipped with the batch
+    const {
+        data: invoicePages,
+        isLoading: loadingInvoices,
+        fetchNextPage,
+        hasNextPage,
+        isFetchingNextPage,
+    } = useInfiniteQuery({
+        queryKey: ['batch-invoices', batch?.id, statusFilter],
+        queryFn: async ({ pageParam }) => {
+            const params = new URLSearchParams()
+            params.append('limit', '100')
+            if (pageParam) params.append('cursor', pageParam)
+            if (statusFilter) params.append('status', statusFilter)
+            const token = localStorage.getItem('auth_token')
+            const res = await axios.get(`${API_URL}/batches/${batch?.id}/invoices?${params.toString()}`, {
+                headers: { 'Authorization': `Bearer ${token}` }
+            })
+            return res.data as InvoicePage
+        },
+        initialPageParam: '',
+        getNextPageParam: (lastPage) => lastPage.next_cursor || undefined,
+        enabled: isOpen && !!batch?.id,
+    })
+
     if (!isOpen) return null
 
-    // Calculate total always from invoices to ensure accuracy
-    const calculatedTotal = batch?.invoices?.reduce((sum, inv) => sum + (inv.importe || 0), 0) || 0
+    const invoices = invoicePages?.pages.flatMap(page => page.items) || []
+    const filteredTotal = invoicePages?.pages[0]?.total ?? 0
 
     const handleNotify = async () => {
         if (!batch) return
@@ -100,7 +134,7 @@ export function BatchDetailsModal({ isOpen, onClose, batch, loading }: BatchDeta
                                 <div className="bg-slate-50 dark:bg-slate-800/50 p-4 rounded-lg border border-slate-100 dark:border-slate-800">
                                     <div className="text-xs font-medium text-slate-500 dark:text-slate-400 mb-1">IMPORTE TOTAL</div>
                                     <div className="text-lg font-bold text-slate-900 dark:text-white">
-                                        {new Intl.NumberFormat('es-ES', { style: 'currency', currency: 'EUR' }).format(calculatedTotal)}
+                                        {new Intl.NumberFormat('es-ES', { style: 'currency', currency: 'EUR' }).format(batch.total_amount || 0)}
                                     </div>
                                 </div>
                                 <div className="bg-slate-50 dark:bg-slate-800/50 p-4 rounded-lg border border-slate-100 dark:border-slate-800">
@@ -116,11 +150,28 @@ export function BatchDetailsModal({ isOpen, onClose, batch, loading }: BatchDeta
                                 <div className="bg-slate-50 dark:bg-slate-800/50 p-4 rounded-lg border border-slate-100 dark:border-slate-800">
                                     <div className="text-xs font-medium text-slate-500 dark:text-slate-400 mb-1">TOTAL FACTURAS</div>
                                     <div className="text-lg font-bold text-slate-900 dark:text-white">
-                                        {batch.invoices?.length || 0}
+                                        {batch.invoice_count || 0}
                                     </div>
                                 </div>
                             </div>
 
+                            {/* Invoices Filter */}
+                            <div className="flex items-center justify-between">
+                                <select
+                                    value={statusFilter}
+                                    onChange={(e) => setStatusFilter(e.target.value)}
+                                    className="px-3 py-2 text-sm rounded-lg border border-slate-200 dark:border-slate-700 bg-white dark:bg-slate-900 text-slate-700 dark:text-slate-300"
+                                >
+                                    <option value="">Todos los estados</option>
+                                    <option value="VALID">Válidas</option>
+                                    <option value="WARNING">Avisos</option>
+                                    <option value="ERROR">Errores</option>
+                                </select>
+                                <span className="text-xs text-slate-500 dark:text-slate-400">
+                                    Mostrando {invoices.length} de {filteredTotal}
+                                </span>
+                            </div>
+
                             {/* Invoices Table */}
                             <div className="border border-slate-200 dark:border-slate-800 rounded-lg overflow-hidden">
                                 <table className="w-full text-sm text-left">
@@ -134,7 +185,7 @@ export function BatchDetailsModal({ isOpen, onClose, batch, loading }: BatchDeta
                                         </tr>
                                     </thead>
                                     <tbody className="divide-y divide-slate-100 dark:divide-slate-800 bg-white dark:bg-slate-900">
-                                        {batch.invoices?.map((inv, idx) => (
+                                        {invoices.map((inv, idx) => (
                                             <tr key={idx} className="hover:bg-slate-50 dark:hover:bg-slate-800/50">
                                                 <td className="px-4 py-3 font-medium text-slate-900 dark:text-slate-100">
                                                     <button
@@ -168,7 +219,23 @@ export function BatchDetailsModal({ isOpen, onClose, batch, loading }: BatchDeta
                                         ))}
                                     </tbody>
                                 </table>
+                                {loadingInvoices && (
+                                    <div className="flex items-center justify-center py-6">
+                                        <div className="animate-spin rounded-full h-6 w-6 border-b-2 border-blue-600"></div>
+                                    </div>
+                                )}
                             </div>
+                            {hasNextPage && (
+                                <div className="flex justify-center">
+                                    <button
+                                        onClick={() => fetchNextPage()}
+                                        disabled={isFetchingNextPage}
+                                        className="px-4 py-2 text-sm font-medium text-blue-600 dark:text-blue-400 hover:bg-blue-50 dark:hover:bg-slate-800 rounded-lg transition-colors disabled:opacity-50"
+                                    >
+                                        {isFetchingNextPage ? 'Cargando...' : 'Cargar más facturas'}
+                                    </button>
+                                </div>
+                            )}
                         </div>
                     ) : (
                         <div className="text-center py-12 text-slate-500">
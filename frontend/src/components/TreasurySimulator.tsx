@@ -1,4 +1,4 @@
-import { useState, type ComponentType } from 'react'
+import { useMemo, useState, type ComponentType } from 'react'
 import { useQuery } from '@tanstack/react-query'
 import axios from 'axios'
 import { AlertTriangle, BanknoteArrowDown, PiggyBank, ShieldAlert, TrendingDown } from 'lucide-react'
@@ -6,6 +6,13 @@ import { Area, AreaChart, Bar, BarChart, CartesianGrid, Legend, ResponsiveContai
 
 const API_URL = import.meta.env.VITE_API_URL || 'http://localhost:8000'
 
+interface TreasuryProvider {
+  cif?: string | null
+  name: string
+  amount: number
+  invoices: number
+}
+
 interface TreasuryWeek {
   label: string
   range: string
@@ -16,7 +23,7 @@ interface TreasuryWeek {
   delayed_balance: number
   stressed_balance: number
   available_after_reserve: number
-  providers: { cif?: string; name: string; amount: number; invoices: number }[]
+  providers: TreasuryProvider[]
 }
 
 interface TreasuryResponse {
@@ -32,10 +39,100 @@ interface TreasuryResponse {
     final_balance: number
     peak_week?: TreasuryWeek | null
   }
-  top_exposures: { cif?: string; name: string; amount: number; invoices: number }[]
+  top_exposures: TreasuryProvider[]
   alerts: { type: 'critical' | 'warning' | 'info'; message: string }[]
 }
 
+// Respuesta compacta de /batches/treasury-simulator/grid: series semanales
+// factorizadas por retraso y estrés, evaluadas en el servidor una sola vez
+interface TreasuryGridResponse {
+  horizon_weeks: number
+  axes: { payment_delay_days: number[]; stress_pct: number[] }
+  weeks: { label: string; range: string; providers: TreasuryProvider[] }[]
+  top_exposures: TreasuryProvider[]
+  scheduled_amounts: number[]
+  delayed_amounts: number[][]
+  stressed_amounts: number[][]
+}
+
+const round2 = (value: number) => Math.round(value * 100) / 100
+
+const nearestIndex = (values: number[], target: number) =>
+  values.reduce((best, value, index) => (Math.abs(value - target) < Math.abs(values[best] - target) ? index : best), 0)
+
+// Reconstruye localmente la misma respuesta que /batches/treasury-simulator
+function buildScenario(
+  grid: TreasuryGridResponse,
+  openingBalance: number,
+  reserveBalance: number,
+  paymentDelayDays: number,
+  stressPct: number,
+): TreasuryResponse {
+  const delayIndex = nearestIndex(grid.axes.payment_delay_days, paymentDelayDays)
+  const stressIndex = nearestIndex(grid.axes.stress_pct, stressPct)
+  let scheduledBalance = openingBalance
+  let delayedBalance = openingBalance
+  let stressedBalance = openingBalance
+
+  const weeks: TreasuryWeek[] = grid.weeks.map((week, index) => {
+    const scheduledAmount = grid.scheduled_amounts[index]
+    const delayedAmount = grid.delayed_amounts[delayIndex][index]
+    const stressedAmount = grid.stressed_amounts[stressIndex][index]
+    scheduledBalance -= scheduledAmount
+    delayedBalance -= delayedAmount
+    stressedBalance -= stressedAmount
+    return {
+      ...week,
+      scheduled_amount: scheduledAmount,
+      delayed_amount: delayedAmount,
+      stressed_amount: stressedAmount,
+      scheduled_balance: round2(scheduledBalance),
+      delayed_balance: round2(delayedBalance),
+      stressed_balance: round2(stressedBalance),
+      available_after_reserve: round2(scheduledBalance - reserveBalance),
+    }
+  })
+
+  const alerts: TreasuryResponse['alerts'] = []
+  const firstShortfall = weeks.find((week) => week.scheduled_balance < 0)
+  const firstReserveBreach = weeks.find((week) => week.available_after_reserve < 0)
+  if (firstShortfall) {
+    alerts.push({ type: 'critical', message: `El saldo cae por debajo de cero en ${firstShortfall.range}.` })
+  }
+  if (firstReserveBreach) {
+    alerts.push({ type: 'warning', message: `La reserva mínima se compromete en ${firstReserveBreach.range}.` })
+  }
+  const upcomingTotal = grid.top_exposures.reduce((total, provider) => total + provider.amount, 0)
+  const largestExposure = grid.top_exposures[0]
+  if (largestExposure && upcomingTotal && largestExposure.amount / upcomingTotal > 0.35) {
+    alerts.push({
+      type: 'info',
+      message: `Alta concentración de pagos en ${largestExposure.name} durante los próximos 30 días.`,
+    })
+  }
+
+  const sum = (values: number[]) => round2(values.reduce((total, value) => total + value, 0))
+  return {
+    opening_balance: openingBalance,
+    reserve_balance: reserveBalance,
+    payment_delay_days: grid.axes.payment_delay_days[delayIndex],
+    stress_pct: grid.axes.stress_pct[stressIndex],
+    weeks,
+    summary: {
+      scheduled_total: sum(weeks.map((week) => week.scheduled_amount)),
+      delayed_total: sum(weeks.map((week) => week.delayed_amount)),
+      stressed_total: sum(weeks.map((week) => week.stressed_amount)),
+      final_balance: weeks.length ? weeks[weeks.length - 1].scheduled_balance : openingBalance,
+      peak_week: weeks.reduce<TreasuryWeek | null>(
+        (peak, week) => (!peak || week.scheduled_amount > peak.scheduled_amount ? week : peak),
+        null,
+      ),
+    },
+    top_exposures: grid.top_exposures,
+    alerts,
+  }
+}
+
 const formatCurrency = (value: number) =>
   new Intl.NumberFormat('es-ES', { style: 'currency', currency: 'EUR', maximumFractionDigits: 0 }).format(value)
 
@@ -46,24 +143,36 @@ export default function TreasurySimulator() {
   const [reserveBalance, setReserveBalance] = useState(45000)
   const [paymentDelayDays, setPaymentDelayDays] = useState(5)
   const [horizonWeeks, setHorizonWeeks] = useState(8)
+  const [stressPct, setStressPct] = useState(12.5)
 
-  const { data, isLoading, isError } = useQuery({
-    queryKey: ['treasury-simulator', openingBalance, reserveBalance, paymentDelayDays, horizonWeeks],
+  // La rejilla sólo depende del horizonte: retraso, estrés, reserva y saldo
+  // inicial se recalculan en el navegador sin volver al servidor
+  const { data: grid, isLoading, isError } = useQuery({
+    queryKey: ['treasury-simulator-grid', horizonWeeks],
     queryFn: async () => {
       const token = localStorage.getItem('auth_token')
-      const response = await axios.get<TreasuryResponse>(`${API_URL}/batches/treasury-simulator`, {
+      const response = await axios.get<TreasuryGridResponse>(`${API_URL}/batches/treasury-simulator/grid`, {
         headers: { Authorization: `Bearer ${token}` },
         params: {
-          opening_balance: openingBalance,
-          reserve_balance: reserveBalance,
-          payment_delay_days: paymentDelayDays,
           horizon_weeks: horizonWeeks,
+          delay_min: 0,
+          delay_max: 45,
+          delay_step: 1,
+          stress_min: 0,
+          stress_max: 50,
+          stress_step: 2.5,
         },
       })
       return response.data
     },
+    staleTime: 60_000,
   })
 
+  const data = useMemo(
+    () => (grid ? buildScenario(grid, openingBalance, reserveBalance, paymentDelayDays, stressPct) : undefined),
+    [grid, openingBalance, reserveBalance, paymentDelayDays, stressPct],
+  )
+
   return (
     <section className="bg-white dark:bg-slate-900 rounded-2xl shadow-sm border border-slate-200 dark:border-slate-800 p-6 space-y-6">
       <div className="flex flex-col xl:flex-row xl:items-end xl:justify-between gap-4">
@@ -75,7 +184,7 @@ export default function TreasurySimulator() {
           </p>
         </div>
 
-        <div className="grid grid-cols-2 lg:grid-cols-4 gap-3 w-full xl:w-auto">
+        <div className="grid grid-cols-2 lg:grid-cols-5 gap-3 w-full xl:w-auto">
           <label className="space-y-1">
             <span className="text-xs font-medium text-slate-500 dark:text-slate-400">Saldo inicial</span>
             <input
@@ -105,6 +214,18 @@ export default function TreasurySimulator() {
               className="w-full rounded-xl border border-slate-200 dark:border-slate-700 bg-slate-50 dark:bg-slate-950 px-3 py-2 text-sm"
             />
           </label>
+          <label className="space-y-1">
+            <span className="text-xs font-medium text-slate-500 dark:text-slate-400">Estres ({stressPct}%)</span>
+            <input
+              type="range"
+              min={0}
+              max={50}
+              step={2.5}
+              value={stressPct}
+              onChange={(event) => setStressPct(Number(event.target.value))}
+              className="w-full accent-orange-500"
+            />
+          </label>
           <label className="space-y-1">
             <span className="text-xs font-medium text-slate-500 dark:text-slate-400">Horizonte</span>
             <select
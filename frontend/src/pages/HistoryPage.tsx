@@ -17,7 +17,7 @@ interface Batch {
     status: string
     uploaded_to_bank?: boolean
     total_amount?: number
-    invoices: { id: number }[]
+    invoice_count: number
 }
 
 interface ImportLog {
@@ -1,5 +1,5 @@
 import { useNavigate, useParams } from 'react-router-dom'
-import { useQuery } from '@tanstack/react-query'
+import { useInfiniteQuery, useQuery } from '@tanstack/react-query'
 import axios from 'axios'
 import type { ComponentType } from 'react'
 import {
@@ -85,6 +85,12 @@ interface ProviderInvoice {
   duplicate_message?: string
 }
 
+interface ProviderInvoicePage {
+  items: ProviderInvoice[]
+  total?: number
+  next_cursor?: string | null
+}
+
 const formatCurrency = (amount: number) =>
   new Intl.NumberFormat('es-ES', { style: 'currency', currency: 'EUR', maximumFractionDigits: 0 }).format(amount)
 
@@ -106,15 +112,45 @@ export default function ProviderDetailsPage() {
     },
   })
 
-  const { data: invoices, isLoading: loadingInvoices } = useQuery({
+  // El histórico se pagina en servidor (cursor keyset) en lugar de traer todas las facturas
+  const {
+    data: invoicePages,
+    isLoading: loadingInvoices,
+    fetchNextPage,
+    hasNextPage,
+    isFetchingNextPage,
+  } = useInfiniteQuery({
     queryKey: ['provider', cif, 'invoices'],
     enabled: !!cif,
+    queryFn: async ({ pageParam }) => {
+      const params = new URLSearchParams()
+      params.append('limit', '50')
+      if (pageParam) params.append('cursor', pageParam)
+      const token = localStorage.getItem('auth_token')
+      const res = await axios.get(`${API_URL}/providers/${cif}/invoices/page?${params.toString()}`, {
+        headers: { Authorization: `Bearer ${token}` },
+      })
+      return res.data as ProviderInvoicePage
+    },
+    initialPageParam: '',
+    getNextPageParam: (lastPage) => lastPage.next_cursor || undefined,
+  })
+
+  const { data: upcomingInvoices } = useQuery({
+    queryKey: ['provider', cif, 'invoices', 'upcoming'],
+    enabled: !!cif,
     queryFn: async () => {
+      const params = new URLSearchParams({
+        sort: 'fecha_vencimiento',
+        order: 'asc',
+        due_from: new Date().toISOString().slice(0, 10),
+        limit: '5',
+      })
       const token = localStorage.getItem('auth_token')
-      const res = await axios.get(`${API_URL}/providers/${cif}/invoices`, {
+      const res = await axios.get(`${API_URL}/providers/${cif}/invoices/page?${params.toString()}`, {
         headers: { Authorization: `Bearer ${token}` },
       })
-      return res.data as ProviderInvoice[]
+      return (res.data as ProviderInvoicePage).items
     },
   })
 
@@ -126,11 +162,7 @@ export default function ProviderDetailsPage() {
     return <div className="p-8 text-center text-slate-500 dark:text-slate-400">Proveedor no encontrado</div>
   }
 
-  const today = new Date()
-  const upcomingInvoices = (invoices || [])
-    .filter((invoice) => invoice.fecha_vencimiento && new Date(invoice.fecha_vencimiento) >= today)
-    .sort((left, right) => new Date(left.fecha_vencimiento || 0).getTime() - new Date(right.fecha_vencimiento || 0).getTime())
-    .slice(0, 5)
+  const invoices = invoicePages?.pages.flatMap((page) => page.items) || []
 
   return (
     <div className="space-y-8 animate-in fade-in duration-500">
@@ -272,7 +304,7 @@ export default function ProviderDetailsPage() {
           <h3 className="text-lg font-bold text-slate-900 dark:text-white">Proximos vencimientos</h3>
           <p className="text-sm text-slate-500 dark:text-slate-400 mt-1 mb-5">Las siguientes facturas te ayudan a anticipar riesgo y tesoreria.</p>
           <div className="space-y-3">
-            {upcomingInvoices.length ? upcomingInvoices.map((invoice) => (
+            {upcomingInvoices?.length ? upcomingInvoices.map((invoice) => (
               <div key={invoice.id} className="rounded-2xl border border-slate-200 dark:border-slate-800 p-4 bg-slate-50 dark:bg-slate-950/40">
                 <div className="flex items-start justify-between gap-4">
                   <div>
@@ -309,7 +341,7 @@ export default function ProviderDetailsPage() {
             <tbody className="divide-y divide-slate-100 dark:divide-slate-800">
               {loadingInvoices ? (
                 <tr><td colSpan={6} className="p-6 text-center text-slate-500 dark:text-slate-400">Cargando...</td></tr>
-              ) : invoices?.map((invoice) => (
+              ) : invoices.map((invoice) => (
                 <tr key={invoice.id} className="hover:bg-slate-50 dark:hover:bg-slate-800/50 transition-colors align-top">
                   <td className="px-6 py-4 font-medium text-slate-900 dark:text-slate-100">{invoice.factura || 'Sin referencia'}</td>
                   <td className="px-6 py-4 font-mono text-slate-600 dark:text-slate-300">{formatCurrency(invoice.importe)}</td>
@@ -344,6 +376,17 @@ export default function ProviderDetailsPage() {
             </tbody>
           </table>
         </div>
+        {hasNextPage && (
+          <div className="flex justify-center p-4 border-t border-slate-200 dark:border-slate-800">
+            <button
+              onClick={() => fetchNextPage()}
+              disabled={isFetchingNextPage}
+              className="px-4 py-2 text-sm font-medium text-blue-600 dark:text-blue-400 hover:bg-blue-50 dark:hover:bg-slate-800 rounded-lg transition-colors disabled:opacity-50"
+            >
+              {isFetchingNextPage ? 'Cargando...' : 'Cargar más facturas'}
+            </button>
+          </div>
+        )}
       </div>
     </div>
   )
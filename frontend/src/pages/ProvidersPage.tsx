@@ -21,6 +21,8 @@ interface Provider {
     swift?: string
 }
 
+const PROVIDER_FIELDS: (keyof Provider)[] = ['cif', 'name', 'email', 'address', 'city', 'zip_code', 'iban', 'phone', 'country', 'swift']
+
 export default function ProvidersPage() {
     const queryClient = useQueryClient()
     const [uploadError, setUploadError] = useState<string | null>(null)
@@ -45,7 +47,9 @@ export default function ProvidersPage() {
         queryKey: ['providers'],
         queryFn: async () => {
             const token = localStorage.getItem('auth_token')
+            // Sólo las columnas de la tabla; el navegador revalida con el ETag (304 si no hay cambios)
             const { data } = await axios.get(`${API_URL}/providers/`, {
+                params: { fields: PROVIDER_FIELDS.join(',') },
                 headers: { 'Authorization': `Bearer ${token}` }
             })
             return data